@@ -10,5 +10,19 @@ echo "🔍 Vérification des variables d'environnement..."
 echo "REDIS_HOST=${REDIS_HOST}"
 echo "REDIS_PORT=${REDIS_PORT}"
 
-echo "🚀 Démarrage de l'application..."
-exec uvicorn src.main:app --host 0.0.0.0 --port 8000 --reload
\ No newline at end of file
+if [ -n "${PROMETHEUS_MULTIPROC_DIR}" ]; then
+  # Métriques multiprocessus : on repart d'un répertoire vide, les fichiers
+  # des workers d'une exécution précédente fausseraient les agrégats
+  echo "📊 Réinitialisation de ${PROMETHEUS_MULTIPROC_DIR}..."
+  mkdir -p "${PROMETHEUS_MULTIPROC_DIR}"
+  rm -f "${PROMETHEUS_MULTIPROC_DIR}"/*.db
+fi
+
+if [ "${APP_ENV}" = "production" ]; then
+  # gunicorn + workers uvicorn (uvloop, httptools), réglages dans gunicorn.conf.py
+  echo "🚀 Démarrage de l'application (production)..."
+  exec gunicorn src.main:app -c gunicorn.conf.py
+fi
+
+echo "🚀 Démarrage de l'application (développement)..."
+exec uvicorn src.main:app --host 0.0.0.0 --port "${PORT:-8000}" --reload
\ No newline at end of file
@@ -0,0 +1,59 @@
+# gunicorn.conf.py
+# Configuration du serveur de production (APP_ENV=production dans entrypoint.sh),
+# entièrement pilotée par l'environnement : la même image sert en dev et en prod.
+import multiprocessing
+import os
+
+
+def _workers() -> int:
+    """WEB_CONCURRENCY si défini, sinon WORKERS_PER_CORE workers par cœur (borné par MAX_WORKERS)"""
+    explicit = int(os.getenv("WEB_CONCURRENCY") or 0)
+    if explicit > 0:
+        return explicit
+    per_core = float(os.getenv("WORKERS_PER_CORE", "1"))
+    workers = max(2, int(per_core * multiprocessing.cpu_count()))
+    max_workers = int(os.getenv("MAX_WORKERS") or 0)
+    return min(workers, max_workers) if max_workers > 0 else workers
+
+
+bind = f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', '8000')}"
+workers = _workers()
+worker_class = "src.server.ProductionWorker"
+
+# Import de l'application dans le maître avant le fork : démarrage plus rapide des
+# workers et erreurs d'import détectées au lancement. Les connexions (Redis, HTTP)
+# sont ouvertes par le lifespan de chaque worker, jamais avant le fork.
+preload_app = os.getenv("PRELOAD_APP", "1").lower() in ("1", "true", "yes")
+
+# Connexions : file d'attente du socket d'écoute et keep-alive HTTP
+backlog = int(os.getenv("BACKLOG", "2048"))
+keepalive = int(os.getenv("KEEP_ALIVE", "5"))
+
+# SIGTERM : arrêt gracieux pendant GRACEFUL_TIMEOUT secondes, puis SIGKILL
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+timeout = int(os.getenv("WORKER_TIMEOUT", "60"))
+
+# Recyclage périodique des workers (0 : désactivé), avec gigue pour éviter les redémarrages simultanés
+max_requests = int(os.getenv("MAX_REQUESTS", "0"))
+max_requests_jitter = int(os.getenv("MAX_REQUESTS_JITTER", "0"))
+
+loglevel = os.getenv("LOG_LEVEL", "info")
+accesslog = "-" if os.getenv("ACCESS_LOG", "0").lower() in ("1", "true", "yes") else None
+errorlog = "-"
+
+
+def on_starting(server):
+    """Métriques multiprocessus : on repart d'un répertoire vide à chaque lancement"""
+    path = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    if not path:
+        return
+    os.makedirs(path, exist_ok=True)
+    for name in os.listdir(path):
+        if name.endswith(".db"):
+            os.remove(os.path.join(path, name))
+
+
+def child_exit(server, worker):
+    """Retire les jauges d'un worker arrêté (y compris tué) de la vue Prometheus agrégée"""
+    from src.monitoring import mark_worker_dead
+    mark_worker_dead(worker.pid)
@@ -0,0 +1,195 @@
+# src/cache/codec.py
+import json
+import logging
+import os
+import struct
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional, Set, Union
+
+try:
+    import orjson
+except ImportError:  # dépendance optionnelle
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # dépendance optionnelle
+    msgpack = None
+
+logger = logging.getLogger(__name__)
+
+
+class Codec(ABC):
+    """Sérialisation d'une valeur de cache ; le premier octet stocké identifie le codec.
+
+    Les versions ne doivent jamais être réattribuées : une valeur écrite par un
+    ancien worker doit rester lisible pendant un déploiement progressif.
+    """
+
+    name: str = ""
+    version: int = 0
+
+    @abstractmethod
+    def dumps(self, payload: Dict[str, Any]) -> bytes:
+        """Sérialise la valeur (sans l'octet de version)"""
+
+    @abstractmethod
+    def loads(self, body: bytes) -> Dict[str, Any]:
+        """Désérialise une valeur écrite par dumps"""
+
+
+class JsonCodec(Codec):
+    name = "json"
+    version = 1
+
+    def dumps(self, payload: Dict[str, Any]) -> bytes:
+        return json.dumps(payload, separators=(",", ":")).encode("utf-8")
+
+    def loads(self, body: bytes) -> Dict[str, Any]:
+        return json.loads(body)
+
+
+class OrjsonCodec(Codec):
+    name = "orjson"
+    version = 2
+
+    def dumps(self, payload: Dict[str, Any]) -> bytes:
+        return orjson.dumps(payload)
+
+    def loads(self, body: bytes) -> Dict[str, Any]:
+        return orjson.loads(body)
+
+
+class MsgpackCodec(Codec):
+    name = "msgpack"
+    version = 3
+
+    def dumps(self, payload: Dict[str, Any]) -> bytes:
+        return msgpack.packb(payload, use_bin_type=True)
+
+    def loads(self, body: bytes) -> Dict[str, Any]:
+        return msgpack.unpackb(body, raw=False)
+
+
+class StructCodec(Codec):
+    """Disposition fixe d'une entrée météo : champs numériques en binaire, textes préfixés par leur longueur.
+
+    Ne s'applique qu'aux entrées de WeatherService ; toute autre valeur lève
+    ValueError et est encodée par le codec de repli.
+    """
+
+    name = "struct"
+    version = 4
+
+    # fetched_at, soft_ttl, hard_ttl, delta, température, ressenti, humidité, vent, direction
+    _HEADER = struct.Struct("<dIIfddddd")
+    _TEXT_FIELDS = ("city", "weather_description", "source", "timestamp")
+
+    def dumps(self, payload: Dict[str, Any]) -> bytes:
+        try:
+            data = payload["data"]
+            header = self._HEADER.pack(
+                payload["fetched_at"],
+                payload["soft_ttl"],
+                payload["hard_ttl"],
+                payload.get("delta", 0.0),
+                data["temperature"]["current"],
+                data["temperature"]["feels_like"],
+                data["humidity"],
+                data["wind_speed"],
+                data["wind_direction"],
+            )
+            texts = [data[field].encode("utf-8") for field in self._TEXT_FIELDS]
+        except (KeyError, TypeError, AttributeError, struct.error) as e:
+            raise ValueError(f"Valeur non compatible avec le codec struct: {str(e)}")
+        if (len(data) != len(self._TEXT_FIELDS) + 4 or len(data["temperature"]) != 2
+                or any(len(t) > 0xFFFF for t in texts)):
+            raise ValueError("Valeur non compatible avec le codec struct")
+        return header + b"".join(struct.pack("<H", len(t)) + t for t in texts)
+
+    def loads(self, body: bytes) -> Dict[str, Any]:
+        (fetched_at, soft_ttl, hard_ttl, delta,
+         current, feels_like, humidity, wind_speed, wind_direction) = self._HEADER.unpack_from(body)
+        offset = self._HEADER.size
+        texts = []
+        for _ in self._TEXT_FIELDS:
+            (length,) = struct.unpack_from("<H", body, offset)
+            offset += 2
+            texts.append(body[offset:offset + length].decode("utf-8"))
+            offset += length
+        city, description, source, timestamp = texts
+        return {
+            "data": {
+                "city": city,
+                "temperature": {"current": current, "feels_like": feels_like},
+                "humidity": humidity,
+                "wind_speed": wind_speed,
+                "wind_direction": wind_direction,
+                "weather_description": description,
+                "source": source,
+                "timestamp": timestamp,
+            },
+            "fetched_at": fetched_at,
+            "soft_ttl": soft_ttl,
+            "hard_ttl": hard_ttl,
+            "delta": delta,
+        }
+
+
+_FALLBACK = JsonCodec()
+CODECS: Dict[str, Codec] = {codec.name: codec for codec in (
+    _FALLBACK,
+    OrjsonCodec() if orjson is not None else None,
+    MsgpackCodec() if msgpack is not None else None,
+    StructCodec(),
+) if codec is not None}
+_BY_VERSION: Dict[int, Codec] = {codec.version: codec for codec in CODECS.values()}
+# Codecs indisponibles déjà signalés : get_codec est appelé à chaque écriture
+_missing_reported: Set[str] = set()
+
+
+def get_codec(name: Optional[str] = None) -> Codec:
+    """Codec choisi par CACHE_CODEC (json, orjson, msgpack, struct), json si indisponible"""
+    name = name or os.getenv("CACHE_CODEC", "struct")
+    codec = CODECS.get(name)
+    if codec is None:
+        if name not in _missing_reported:
+            _missing_reported.add(name)
+            logger.warning(f"Codec de cache indisponible: {name}, repli sur json")
+        return _FALLBACK
+    return codec
+
+
+def encode(payload: Dict[str, Any], codec: Optional[Codec] = None) -> bytes:
+    codec = codec or get_codec()
+    try:
+        body = codec.dumps(payload)
+    except ValueError:
+        codec = CODECS.get("orjson", _FALLBACK)
+        body = codec.dumps(payload)
+    return bytes((codec.version,)) + body
+
+
+def _default(value: Any) -> Any:
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    raise TypeError(f"Type non sérialisable en JSON: {type(value).__name__}")
+
+
+def json_bytes(value: Any) -> bytes:
+    """Sérialise une valeur en JSON compact (orjson si disponible), datetime au format ISO 8601"""
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, default=_default, separators=(",", ":")).encode("utf-8")
+
+
+def decode(raw: Union[bytes, str]) -> Dict[str, Any]:
+    """Décode une valeur écrite par encode ; le JSON texte sans octet de version (ancien format) reste lu"""
+    if isinstance(raw, str):
+        return json.loads(raw)
+    if raw[:1] in (b"{", b"["):
+        return json.loads(raw)
+    codec = _BY_VERSION.get(raw[0])
+    if codec is None:
+        raise ValueError(f"Version de codec inconnue: {raw[0]}")
+    return codec.loads(raw[1:])
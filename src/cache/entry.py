@@ -0,0 +1,78 @@
+# src/cache/entry.py
+import json
+import math
+import random
+import time
+from dataclasses import dataclass, field, fields
+from typing import Any, Dict, Optional, Union
+
+from . import codec as cache_codec
+
+
+# Champs calculés à la lecture, jamais écrits dans Redis
+_MEMO_FIELDS = ("value", "body", "etag")
+
+
+@dataclass
+class CacheEntry:
+    """Entrée de cache avec TTL doux (fraîcheur) et TTL dur (expiration Redis).
+
+    Entre les deux, la valeur est servie périmée pendant qu'un rafraîchissement
+    tourne en arrière-plan.
+    """
+    data: Dict[str, Any]
+    fetched_at: float
+    soft_ttl: int
+    hard_ttl: int
+    delta: float = 0.0  # durée du dernier calcul amont, en secondes
+    # Objet reconstruit depuis data, corps JSON de la réponse et son ETag,
+    # mémorisés tant que l'entrée reste dans le cache L1 (non sérialisés)
+    value: Any = field(default=None, repr=False, compare=False)
+    body: Optional[bytes] = field(default=None, repr=False, compare=False)
+    etag: Optional[str] = field(default=None, repr=False, compare=False)
+
+    def is_fresh(self, now: Optional[float] = None) -> bool:
+        now = time.time() if now is None else now
+        return now < self.fetched_at + self.soft_ttl
+
+    def remaining_ttl(self, now: Optional[float] = None) -> float:
+        """Durée restante avant l'expiration dure de l'entrée"""
+        now = time.time() if now is None else now
+        return self.fetched_at + self.hard_ttl - now
+
+    def should_refresh_early(self, now: Optional[float] = None, beta: float = 1.0) -> bool:
+        """Rafraîchissement anticipé probabiliste (XFetch).
+
+        La probabilité augmente à l'approche du TTL doux et avec le coût du calcul,
+        ce qui désynchronise les expirations entre villes.
+        """
+        if beta <= 0 or self.delta <= 0:
+            return False
+        now = time.time() if now is None else now
+        jitter = -self.delta * beta * math.log(1.0 - random.random())
+        return now + jitter >= self.fetched_at + self.soft_ttl
+
+    def _payload(self) -> Dict[str, Any]:
+        return {f.name: getattr(self, f.name) for f in fields(self) if f.name not in _MEMO_FIELDS}
+
+    def to_json(self) -> str:
+        return json.dumps(self._payload())
+
+    def encode(self, codec: Optional[cache_codec.Codec] = None) -> bytes:
+        """Encode l'entrée avec le codec de cache (octet de version en tête)"""
+        return cache_codec.encode(self._payload(), codec)
+
+    @classmethod
+    def decode(cls, raw: Union[bytes, str]) -> "CacheEntry":
+        return cls._from_payload(cache_codec.decode(raw))
+
+    @classmethod
+    def from_json(cls, raw: str) -> "CacheEntry":
+        return cls._from_payload(json.loads(raw))
+
+    @classmethod
+    def _from_payload(cls, payload: Dict[str, Any]) -> "CacheEntry":
+        if "data" not in payload:
+            # Ancien format (WeatherData brut) : considéré comme périmé
+            return cls(data=payload, fetched_at=0.0, soft_ttl=0, hard_ttl=0)
+        return cls(**payload)
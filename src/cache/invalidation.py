@@ -0,0 +1,126 @@
+# src/cache/invalidation.py
+import asyncio
+import logging
+import os
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field, asdict
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional
+
+from ..config.redis import get_redis
+from .local_cache import local_cache, publish_invalidation
+
+logger = logging.getLogger(__name__)
+
+# Espaces de noms invalidables ; les autres (geo:, lock:, ratelimit:, quota:...) sont internes
+NAMESPACES = {"weather": "weather:", "cache": "cache:"}
+
+# Index des clés météo par fournisseur ayant contribué à la mesure
+PROVIDER_INDEX_PREFIX = "index:provider:"
+
+
+def provider_index_key(provider: str) -> str:
+    return f"{PROVIDER_INDEX_PREFIX}{provider}"
+
+
+@dataclass
+class InvalidationJob:
+    """Progression d'une invalidation, consultable pendant son exécution"""
+    mode: str
+    target: str
+    job_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    status: str = "running"  # running, done, failed
+    scanned: int = 0
+    deleted: int = 0
+    batches: int = 0
+    started_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+    error: Optional[str] = None
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+class Invalidator:
+    """Suppression non bloquante de clés Redis : SCAN incrémental puis UNLINK par lots.
+
+    UNLINK libère la mémoire dans un thread de Redis ; chaque lot rend la
+    main à la boucle d'événements, ce qui laisse passer les requêtes.
+    Les dernières invalidations sont conservées pour le suivi de leur progression.
+    """
+
+    def __init__(self, batch_size: Optional[int] = None, max_jobs: int = 100):
+        self.batch_size = batch_size or int(os.getenv("CACHE_INVALIDATION_BATCH", "500"))
+        self.max_jobs = max_jobs
+        self._jobs: "OrderedDict[str, InvalidationJob]" = OrderedDict()
+        self._tasks = set()
+
+    def get_job(self, job_id: str) -> Optional[InvalidationJob]:
+        return self._jobs.get(job_id)
+
+    def _track(self, job: InvalidationJob) -> InvalidationJob:
+        self._jobs[job.job_id] = job
+        while len(self._jobs) > self.max_jobs:
+            self._jobs.popitem(last=False)
+        return job
+
+    async def run(self, job: InvalidationJob, work: Callable[[InvalidationJob], Awaitable[None]],
+                  wait: bool = True) -> InvalidationJob:
+        """Exécute l'invalidation ; si wait est faux, la lance en arrière-plan et rend la main"""
+        self._track(job)
+        if wait:
+            await self._execute(job, work)
+            return job
+        task = asyncio.ensure_future(self._execute(job, work))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    async def _execute(self, job: InvalidationJob, work: Callable[[InvalidationJob], Awaitable[None]]) -> None:
+        try:
+            await work(job)
+            job.status = "done"
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+            logger.error(f"❌ Échec de l'invalidation {job.job_id} ({job.mode} {job.target}): {str(e)}")
+        finally:
+            job.finished_at = time.time()
+        logger.info(
+            f"🧹 Invalidation {job.mode} {job.target}: {job.deleted} clés supprimées "
+            f"sur {job.scanned} parcourues en {job.batches} lots"
+        )
+
+    async def unlink_pattern(self, job: InvalidationJob, pattern: str) -> None:
+        """Supprime les clés correspondant au motif par SCAN + UNLINK, lot par lot"""
+        local_cache.delete_matching(pattern)
+        redis = await get_redis()
+        cursor = 0
+        while True:
+            cursor, keys = await redis.scan(cursor=cursor, match=pattern, count=self.batch_size)
+            job.scanned += len(keys)
+            if keys:
+                job.deleted += await redis.unlink(*keys)
+                job.batches += 1
+            if not cursor:
+                break
+        await publish_invalidation(pattern)
+
+    async def unlink_keys(self, job: InvalidationJob, keys: Iterable[str]) -> None:
+        """Supprime une liste de clés connues par lots d'UNLINK"""
+        keys = list(keys)
+        redis = await get_redis()
+        for start in range(0, len(keys), self.batch_size):
+            batch: List[str] = keys[start:start + self.batch_size]
+            job.scanned += len(batch)
+            job.deleted += await redis.unlink(*batch)
+            job.batches += 1
+            for key in batch:
+                local_cache.delete(key)
+            # Un message par lot, pas par clé : les workers ne reçoivent qu'une notification par UNLINK
+            await publish_invalidation(*batch)
+
+
+# Instance unique : le suivi des invalidations est propre à chaque worker
+invalidator = Invalidator()
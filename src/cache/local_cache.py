@@ -0,0 +1,226 @@
+# src/cache/local_cache.py
+import asyncio
+import fnmatch
+import json
+import logging
+import os
+import sys
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+from ..config.redis import get_redis
+from ..monitoring import register_process_collector
+
+logger = logging.getLogger(__name__)
+
+# Canal Redis de pub/sub pour l'invalidation entre workers
+INVALIDATION_CHANNEL = "cache:invalidate"
+
+
+class LocalCache:
+    """Cache L1 en mémoire du processus : éviction LRU, TTL par entrée, plafond mémoire.
+
+    Les tailles sont estimées par l'appelant (longueur de la valeur sérialisée
+    en général) ; à défaut, sys.getsizeof sert d'approximation.
+    """
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 16 * 1024 * 1024, default_ttl: float = 30.0):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self._data: "OrderedDict[str, Tuple[Any, float, int]]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @classmethod
+    def from_env(cls) -> "LocalCache":
+        return cls(
+            max_entries=int(os.getenv("L1_CACHE_MAX_ENTRIES", "1024")),
+            max_bytes=int(os.getenv("L1_CACHE_MAX_BYTES", str(16 * 1024 * 1024))),
+            default_ttl=float(os.getenv("L1_CACHE_TTL", "30")),
+        )
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    def get(self, key: str) -> Optional[Any]:
+        item = self._data.get(key)
+        if item is None:
+            self.misses += 1
+            return None
+        value, expires_at, _ = item
+        if expires_at <= time.monotonic():
+            self._remove(key)
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def peek(self, key: str) -> Optional[Any]:
+        """Lit une entrée non expirée sans modifier l'ordre LRU ni les statistiques"""
+        item = self._data.get(key)
+        if item is None or item[1] <= time.monotonic():
+            return None
+        return item[0]
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None, size: Optional[int] = None) -> None:
+        ttl = self.default_ttl if ttl is None else min(ttl, self.default_ttl)
+        if ttl <= 0 or self.max_entries <= 0:
+            return
+        size = sys.getsizeof(value) if size is None else size
+        if size > self.max_bytes:
+            return
+        if key in self._data:
+            self._remove(key)
+        self._data[key] = (value, time.monotonic() + ttl, size)
+        self._bytes += size
+        while len(self._data) > self.max_entries or self._bytes > self.max_bytes:
+            oldest = next(iter(self._data))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def delete(self, key: str) -> bool:
+        if key in self._data:
+            self._remove(key)
+            return True
+        return False
+
+    def delete_matching(self, pattern: str) -> int:
+        """Supprime les clés correspondant à un motif glob (même syntaxe que SCAN MATCH)"""
+        keys = [key for key in self._data if fnmatch.fnmatchcase(key, pattern)]
+        for key in keys:
+            self._remove(key)
+        return len(keys)
+
+    def clear(self) -> None:
+        self._data.clear()
+        self._bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._data),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+    def _remove(self, key: str) -> None:
+        _, _, size = self._data.pop(key)
+        self._bytes -= size
+
+
+class LocalCacheCollector:
+    """Expose les compteurs du cache L1 au format Prometheus"""
+
+    def __init__(self, cache: LocalCache):
+        self._cache = cache
+
+    def collect(self):
+        stats = self._cache.stats()
+        for name in ("hits", "misses", "evictions", "expirations"):
+            counter = CounterMetricFamily(f"l1_cache_{name}", f"Cache L1 : nombre de {name}")
+            counter.add_metric([], stats[name])
+            yield counter
+        entries = GaugeMetricFamily("l1_cache_entries", "Cache L1 : nombre d'entrées")
+        entries.add_metric([], stats["entries"])
+        yield entries
+        size = GaugeMetricFamily("l1_cache_bytes", "Cache L1 : taille estimée en octets")
+        size.add_metric([], stats["bytes"])
+        yield size
+
+
+# Instance unique partagée par le chemin météo et le contrôleur de cache
+local_cache = LocalCache.from_env()
+register_process_collector(LocalCacheCollector(local_cache))
+
+pubsub_enabled = os.getenv("L1_CACHE_PUBSUB", "0").lower() in ("1", "true", "yes")
+
+
+# Identifiant du worker (pid, id), pour ignorer ses propres messages d'invalidation
+_origin: Optional[Tuple[int, str]] = None
+
+
+def _worker_origin() -> str:
+    """Identifiant du processus courant, recalculé après un fork.
+
+    Avec preload_app, le module est importé dans le maître gunicorn : un
+    identifiant calculé à l'import serait hérité par tous les workers, qui
+    ignoreraient alors les invalidations les uns des autres.
+    """
+    global _origin
+    pid = os.getpid()
+    if _origin is None or _origin[0] != pid:
+        _origin = (pid, f"{pid}-{uuid.uuid4().hex}")
+    return _origin[1]
+
+
+async def publish_invalidation(*keys: str) -> None:
+    """Demande aux autres workers d'oublier leur copie L1 des clés (ou des clés d'un motif glob)
+
+    Plusieurs clés partent dans un seul message, sous forme de liste JSON ; une clé
+    seule est publiée telle quelle (les clés commencent par leur espace de noms, jamais par "[").
+    """
+    if not pubsub_enabled or not keys:
+        return
+    try:
+        redis = await get_redis()
+        payload = keys[0] if len(keys) == 1 else json.dumps(keys)
+        await redis.publish(INVALIDATION_CHANNEL, f"{_worker_origin()}:{payload}")
+    except Exception as e:
+        logger.warning(f"Publication de l'invalidation impossible pour {keys[0]} ({len(keys)} clés): {str(e)}")
+
+
+def _apply_invalidation(cache: LocalCache, key: str) -> None:
+    if key == "*":
+        cache.clear()
+    elif any(c in key for c in "*?["):
+        cache.delete_matching(key)
+    else:
+        cache.delete(key)
+
+
+async def listen_invalidations(cache: LocalCache = local_cache, retry_delay: float = 1.0) -> None:
+    """Écoute le canal d'invalidation et purge le cache L1 (tâche de fond du lifespan)"""
+    cleared = False
+    while True:
+        try:
+            redis = await get_redis()
+            pubsub = redis.pubsub()
+            await pubsub.subscribe(INVALIDATION_CHANNEL)
+            cleared = False
+            try:
+                async for message in pubsub.listen():
+                    if message.get("type") != "message":
+                        continue
+                    origin, _, payload = message["data"].partition(":")
+                    if origin == _worker_origin():
+                        continue
+                    for key in json.loads(payload) if payload.startswith("[") else [payload]:
+                        _apply_invalidation(cache, key)
+            finally:
+                await pubsub.aclose()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Invalidations manquées : purge une fois par coupure, pas à chaque nouvelle tentative ;
+            # pendant la coupure, le TTL court du L1 borne l'incohérence
+            logger.warning(f"Écoute des invalidations interrompue: {str(e)}")
+            if not cleared:
+                cache.clear()
+                cleared = True
+            await asyncio.sleep(retry_delay)
@@ -0,0 +1,63 @@
+# src/cache/singleflight.py
+import asyncio
+import uuid
+from typing import Awaitable, Callable, Dict, TypeVar
+
+from redis.asyncio import Redis
+
+T = TypeVar("T")
+
+# Libère le verrou uniquement s'il appartient encore au détenteur
+_RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+class SingleFlight:
+    """Coalesce les appels concurrents portant sur la même clé dans le processus.
+
+    Le premier appelant lance la tâche, les suivants attendent le même résultat
+    (ou la même exception) au lieu de relancer leur propre appel.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._inflight
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+
+            def _forget(done: asyncio.Task, key: str = key):
+                if self._inflight.get(key) is done:
+                    del self._inflight[key]
+
+            task.add_done_callback(_forget)
+        # shield : l'annulation d'un appelant n'annule pas la tâche partagée
+        return await asyncio.shield(task)
+
+
+class RedisLock:
+    """Verrou Redis court (SET NX PX) partagé entre les workers uvicorn."""
+
+    def __init__(self, redis: Redis, key: str, ttl_ms: int):
+        self._redis = redis
+        self.key = key
+        self.ttl_ms = ttl_ms
+        self._token = uuid.uuid4().hex
+
+    async def acquire(self) -> bool:
+        return bool(await self._redis.set(self.key, self._token, nx=True, px=self.ttl_ms))
+
+    async def release(self) -> None:
+        await self._redis.eval(_RELEASE_SCRIPT, 1, self.key, self._token)
@@ -0,0 +1,74 @@
+# src/config/http_client.py
+import os
+import logging
+from typing import Dict
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:  # pragma: no cover - dépend de l'installation de httpx[http2]
+    HTTP2_AVAILABLE = False
+
+# Fournisseurs connus : HTTP/2 uniquement là où l'endpoint est servi en HTTPS
+PROVIDERS = {
+    "open-meteo": {"http2": True},
+    "openweathermap": {"http2": True},
+    "weatherapi": {"http2": False},
+}
+
+# Un pool de connexions longue durée par fournisseur
+_clients: Dict[str, httpx.AsyncClient] = {}
+
+
+def _setting(provider: str, name: str, default: str) -> str:
+    """Lit un réglage HTTP_<FOURNISSEUR>_<NOM>, puis HTTP_<NOM>, puis la valeur par défaut."""
+    prefix = provider.upper().replace("-", "_")
+    return os.getenv(f"HTTP_{prefix}_{name}", os.getenv(f"HTTP_{name}", default))
+
+
+def _build_client(provider: str) -> httpx.AsyncClient:
+    """Construit un client httpx avec keep-alive et limites de pool configurables."""
+    limits = httpx.Limits(
+        max_connections=int(_setting(provider, "MAX_CONNECTIONS", "100")),
+        max_keepalive_connections=int(_setting(provider, "MAX_KEEPALIVE", "20")),
+        keepalive_expiry=float(_setting(provider, "KEEPALIVE_EXPIRY", "30")),
+    )
+    timeout = httpx.Timeout(
+        float(_setting(provider, "TIMEOUT", "10")),
+        connect=float(_setting(provider, "CONNECT_TIMEOUT", "5")),
+    )
+    default_http2 = "1" if PROVIDERS.get(provider, {}).get("http2") else "0"
+    http2 = _setting(provider, "HTTP2", default_http2).lower() in ("1", "true", "yes")
+    if http2 and not HTTP2_AVAILABLE:
+        logger.warning(f"HTTP/2 demandé pour {provider} mais le paquet h2 est absent, repli sur HTTP/1.1")
+        http2 = False
+    return httpx.AsyncClient(limits=limits, timeout=timeout, http2=http2)
+
+
+def init_http_clients() -> Dict[str, httpx.AsyncClient]:
+    """Crée les pools de connexions de tous les fournisseurs connus."""
+    for provider in PROVIDERS:
+        get_http_client(provider)
+    logger.info(f"🔌 Pools HTTP initialisés pour: {', '.join(_clients)}")
+    return _clients
+
+
+def get_http_client(provider: str) -> httpx.AsyncClient:
+    """Retourne le client du fournisseur ou en crée un nouveau."""
+    client = _clients.get(provider)
+    if client is None or client.is_closed:
+        client = _build_client(provider)
+        _clients[provider] = client
+    return client
+
+
+async def close_http_clients():
+    """Ferme tous les pools de connexions."""
+    for provider, client in list(_clients.items()):
+        await client.aclose()
+        del _clients[provider]
+    logger.info("Pools HTTP fermés avec succès")
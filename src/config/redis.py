@@ -1,46 +1,141 @@
 # src/config/redis.py
 import os
-from redis.asyncio import Redis
+from typing import Dict
+from redis.asyncio import BlockingConnectionPool, Redis
+from redis.backoff import ExponentialBackoff
+from redis.exceptions import ConnectionError, TimeoutError
+from redis.retry import Retry
+from prometheus_client.core import GaugeMetricFamily
+from ..monitoring import register_process_collector
 import logging
 
 logger = logging.getLogger(__name__)
 
-# Variable globale pour stocker l'instance Redis
-_redis = None
-
-async def init_redis() -> Redis:
-    """Initialise et retourne une connexion Redis."""
-    global _redis
-    if _redis is None:
-        try:
-            redis_url = os.getenv("REDIS_URL", "redis://redis:6379/0")
-            logger.info(f"🔌 Tentative de connexion à Redis sur {redis_url}")
-            _redis = Redis.from_url(
-                redis_url,
-                encoding="utf-8",
-                decode_responses=True,
-                socket_connect_timeout=5,
-                socket_keepalive=True
-            )
-            # Tester la connexion
-            await _redis.ping()
-            logger.info("✅ Connecté à Redis avec succès")
-        except Exception as e:
-            logger.error(f"❌ Échec de la connexion à Redis: {str(e)}")
-            _redis = None
-            raise
-    return _redis
-
-async def get_redis() -> Redis:
+# Clients partagés par le processus, un par mode de décodage ("text" et "binary")
+_clients: Dict[str, Redis] = {}
+
+
+def _pool_settings() -> dict:
+    """Réglages du pool lus dans l'environnement"""
+    return {
+        "max_connections": int(os.getenv("REDIS_MAX_CONNECTIONS", "50")),
+        # Attente maximale d'une connexion libre quand le pool est saturé
+        "timeout": float(os.getenv("REDIS_POOL_TIMEOUT", "2")),
+        "socket_timeout": float(os.getenv("REDIS_SOCKET_TIMEOUT", "2")),
+        "socket_connect_timeout": float(os.getenv("REDIS_CONNECT_TIMEOUT", "2")),
+        "socket_keepalive": True,
+        # PING avant réutilisation d'une connexion inactive depuis plus de N secondes
+        "health_check_interval": float(os.getenv("REDIS_HEALTH_CHECK_INTERVAL", "30")),
+        # Reconnexion transparente : nouvelle tentative avec backoff exponentiel
+        "retry": Retry(
+            ExponentialBackoff(
+                cap=float(os.getenv("REDIS_RETRY_BACKOFF_CAP_MS", "1000")) / 1000,
+                base=float(os.getenv("REDIS_RETRY_BACKOFF_BASE_MS", "50")) / 1000,
+            ),
+            int(os.getenv("REDIS_RETRY_ATTEMPTS", "3")),
+        ),
+        "retry_on_error": [ConnectionError, TimeoutError],
+    }
+
+
+def _create_client(binary: bool) -> Redis:
+    redis_url = os.getenv("REDIS_URL", "redis://redis:6379/0")
+    pool = BlockingConnectionPool.from_url(
+        redis_url,
+        encoding="utf-8",
+        decode_responses=not binary,
+        **_pool_settings()
+    )
+    return Redis(connection_pool=pool)
+
+
+async def init_redis(binary: bool = False) -> Redis:
+    """Initialise et retourne une connexion Redis.
+
+    Le client binaire (binary=True) ne décode pas les réponses : il sert aux
+    valeurs de cache encodées par src.cache.codec. Les connexions sont ouvertes
+    à la demande par le pool : une coupure de Redis n'invalide pas le client.
+    """
+    mode = "binary" if binary else "text"
+    if mode not in _clients:
+        _clients[mode] = _create_client(binary)
+    return _clients[mode]
+
+
+async def get_redis(binary: bool = False) -> Redis:
     """Retourne l'instance Redis existante ou en crée une nouvelle."""
-    if _redis is None:
-        return await init_redis()
-    return _redis
+    client = _clients.get("binary" if binary else "text")
+    if client is None:
+        return await init_redis(binary)
+    return client
+
+
+async def check_redis() -> bool:
+    """Vérifie la connexion au démarrage ; un échec n'empêche pas l'application de démarrer"""
+    try:
+        redis = await get_redis()
+        logger.info(f"🔌 Tentative de connexion à Redis sur {os.getenv('REDIS_URL', 'redis://redis:6379/0')}")
+        await redis.ping()
+        logger.info("✅ Connecté à Redis avec succès")
+        return True
+    except Exception as e:
+        logger.error(f"❌ Échec de la connexion à Redis: {str(e)}")
+        return False
+
 
 async def close_redis():
-    """Ferme la connexion Redis."""
-    global _redis
-    if _redis is not None:
-        await _redis.aclose()
-        _redis = None
-        logger.info("Connexion Redis fermée avec succès")
\ No newline at end of file
+    """Ferme les connexions Redis (arrêt de l'application)."""
+    clients = list(_clients.values())
+    _clients.clear()
+    for client in clients:
+        await client.aclose()
+        await client.connection_pool.disconnect()
+    if clients:
+        logger.info("Connexion Redis fermée avec succès")
+
+
+# Attributs privés du pool de redis-py lus par le collecteur, faute d'API publique ;
+# un test échoue si une montée de version de redis les fait disparaître
+POOL_IN_USE_ATTR = "_in_use_connections"
+POOL_IDLE_ATTR = "_available_connections"
+
+
+class RedisPoolCollector:
+    """Expose l'occupation des pools de connexions Redis au format Prometheus"""
+
+    def __init__(self):
+        self._warned = False
+
+    def _connections(self, pool, attr: str) -> int:
+        connections = getattr(pool, attr, None)
+        if connections is None:
+            if not self._warned:
+                self._warned = True
+                logger.warning(f"Pool Redis sans attribut {attr} : métriques d'occupation à zéro")
+            return 0
+        return len(connections)
+
+    def collect(self):
+        connections = GaugeMetricFamily(
+            "redis_pool_connections", "Pool Redis : connexions par état", labels=["pool", "state"]
+        )
+        capacity = GaugeMetricFamily(
+            "redis_pool_max_connections", "Pool Redis : nombre maximal de connexions", labels=["pool"]
+        )
+        saturation = GaugeMetricFamily(
+            "redis_pool_saturation", "Pool Redis : part des connexions en cours d'utilisation", labels=["pool"]
+        )
+        for mode, client in list(_clients.items()):
+            pool = client.connection_pool
+            in_use = self._connections(pool, POOL_IN_USE_ATTR)
+            idle = self._connections(pool, POOL_IDLE_ATTR)
+            connections.add_metric([mode, "in_use"], in_use)
+            connections.add_metric([mode, "idle"], idle)
+            capacity.add_metric([mode], pool.max_connections)
+            saturation.add_metric([mode], in_use / pool.max_connections if pool.max_connections else 0)
+        yield connections
+        yield capacity
+        yield saturation
+
+
+register_process_collector(RedisPoolCollector())
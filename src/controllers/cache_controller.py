@@ -1,11 +1,116 @@
 # src/controllers/cache_controller.py
 from fastapi import APIRouter, HTTPException, status
 from src.config.redis import get_redis
+from src.cache.local_cache import local_cache, publish_invalidation
+from src.models.cache_models import CacheBulkKeys, CacheBulkSetRequest
+from src.monitoring import SamplingFilter
 import json
 import logging
+import time
+from typing import Optional
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
+# Chemin chaud : messages INFO/DEBUG échantillonnés, avertissements et erreurs toujours journalisés
+logger.addFilter(SamplingFilter.from_env("CACHE_LOG_SAMPLE_RATE", "0.01"))
+
+def _l1_ttl(pttl: Optional[int]) -> Optional[float]:
+    """TTL du cache L1 borné par l'expiration Redis restante (PTTL, en ms) ; -1 : sans expiration"""
+    if pttl is None or pttl < 0:
+        return None
+    return pttl / 1000
+
+@router.post("/cache/bulk/get")
+async def bulk_get_cache(request: CacheBulkKeys):
+    """Récupérer plusieurs valeurs du cache (cache L1 puis MGET et PTTL Redis en un aller-retour)"""
+    started = time.perf_counter()
+    results = {}
+    missing = []
+    for key in request.keys:
+        cached = local_cache.get(f"cache:{key}")
+        if cached is not None:
+            results[key] = cached
+        else:
+            missing.append(key)
+    try:
+        if missing:
+            redis = await get_redis()
+            async with redis.pipeline(transaction=False) as pipe:
+                pipe.mget([f"cache:{key}" for key in missing])
+                for key in missing:
+                    pipe.pttl(f"cache:{key}")
+                values, *pttls = await pipe.execute()
+            missing_after = []
+            for key, value, pttl in zip(missing, values, pttls):
+                if value is None:
+                    missing_after.append(key)
+                    continue
+                try:
+                    result = json.loads(value)
+                    local_cache.set(f"cache:{key}", result, ttl=_l1_ttl(pttl), size=len(value))
+                except json.JSONDecodeError:
+                    result = value
+                results[key] = result
+            missing = missing_after
+    except Exception as e:
+        logger.error(f"Erreur lors de la lecture groupée du cache: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Erreur lors de la lecture du cache: {str(e)}"
+        )
+    logger.info("Lecture groupée du cache", extra={
+        "keys": len(request.keys), "found": len(results), "duration_ms": (time.perf_counter() - started) * 1000
+    })
+    return {"results": results, "missing": missing}
+
+@router.post("/cache/bulk/set")
+async def bulk_set_cache(request: CacheBulkSetRequest):
+    """Définir plusieurs valeurs dans le cache, avec un TTL par clé, en un seul pipeline Redis"""
+    started = time.perf_counter()
+    try:
+        serialized = [(item, json.dumps(item.value)) for item in request.items]
+        redis = await get_redis()
+        async with redis.pipeline(transaction=False) as pipe:
+            for item, value_str in serialized:
+                pipe.set(f"cache:{item.key}", value_str, ex=item.ttl)
+            await pipe.execute()
+    except Exception as e:
+        logger.error(f"Erreur lors de l'écriture groupée dans Redis: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Erreur lors de l'écriture dans le cache: {str(e)}"
+        )
+    for item, value_str in serialized:
+        local_cache.set(f"cache:{item.key}", item.value, ttl=item.ttl, size=len(value_str))
+        await publish_invalidation(f"cache:{item.key}")
+    logger.info("Écriture groupée dans le cache", extra={
+        "keys": len(serialized), "duration_ms": (time.perf_counter() - started) * 1000
+    })
+    return {"status": "success", "keys": [item.key for item in request.items]}
+
+@router.post("/cache/bulk/delete")
+async def bulk_delete_cache(request: CacheBulkKeys):
+    """Supprimer plusieurs clés du cache en un seul pipeline Redis"""
+    started = time.perf_counter()
+    try:
+        redis = await get_redis()
+        async with redis.pipeline(transaction=False) as pipe:
+            for key in request.keys:
+                pipe.unlink(f"cache:{key}")
+            counts = await pipe.execute()
+    except Exception as e:
+        logger.error(f"Erreur lors de la suppression groupée dans Redis: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Erreur lors de la suppression dans le cache: {str(e)}"
+        )
+    for key in request.keys:
+        local_cache.delete(f"cache:{key}")
+        await publish_invalidation(f"cache:{key}")
+    logger.info("Suppression groupée dans le cache", extra={
+        "keys": len(request.keys), "duration_ms": (time.perf_counter() - started) * 1000
+    })
+    return {"deleted": {key: bool(count) for key, count in zip(request.keys, counts)}}
 
 @router.post("/cache/{key}")
 async def set_cache(key: str, value: dict):
@@ -14,9 +119,12 @@ async def set_cache(key: str, value: dict):
         redis = await get_redis()
         logger.info(f"Tentative d'écriture dans Redis pour la clé: cache:{key}")
         value_str = json.dumps(value)
-        logger.info(f"Valeur sérialisée: {value_str}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Valeur sérialisée: {value_str}")
         await redis.set(f"cache:{key}", value_str)
         logger.info("Écriture réussie dans Redis")
+        local_cache.set(f"cache:{key}", value, size=len(value_str))
+        await publish_invalidation(f"cache:{key}")
         return {"status": "success", "key": key}
     except Exception as e:
         logger.error(f"Erreur lors de l'écriture dans Redis: {str(e)}", exc_info=True)
@@ -29,28 +137,38 @@ async def set_cache(key: str, value: dict):
 async def get_cache(key: str):
     """Récupérer une valeur du cache"""
     try:
+        # Cache L1 du processus avant l'aller-retour Redis
+        cached = local_cache.get(f"cache:{key}")
+        if cached is not None:
+            return cached
+
         logger.info(f"Tentative de lecture depuis Redis pour la clé: cache:{key}")
         redis = await get_redis()
-        value = await redis.get(f"cache:{key}")
-        
+        async with redis.pipeline(transaction=False) as pipe:
+            pipe.get(f"cache:{key}")
+            pipe.pttl(f"cache:{key}")
+            value, pttl = await pipe.execute()
+
         if value is None:
             logger.warning(f"Clé non trouvée dans Redis: cache:{key}")
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Clé non trouvée dans le cache"
             )
-        
-        logger.info(f"Valeur lue depuis Redis: {value}")
-        
+
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Valeur lue depuis Redis: {value}")
+
         try:
             # Essayer de désérialiser la valeur
             result = json.loads(value)
             logger.info("Valeur désérialisée avec succès")
+            local_cache.set(f"cache:{key}", result, ttl=_l1_ttl(pttl), size=len(value))
             return result
         except json.JSONDecodeError:
             logger.warning("La valeur n'est pas un JSON valide, retour brut")
             return value
-            
+
     except HTTPException:
         logger.warning("Erreur HTTP transmise", exc_info=True)
         raise
@@ -59,4 +177,4 @@ async def get_cache(key: str):
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Erreur lors de la lecture du cache: {str(e)}"
-        )
\ No newline at end of file
+        )
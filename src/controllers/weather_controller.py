@@ -1,16 +1,158 @@
-from fastapi import APIRouter, HTTPException
+import asyncio
+import os
+import time
+from dataclasses import asdict
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Dict, List, Optional
+from fastapi import APIRouter, HTTPException, Query, Request, Response, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import StreamingResponse
+from src.cache.entry import CacheEntry
 from src.services.weather_service import WeatherService
+from src.services.weather_stream import WeatherStream, format_sse
+from src.services.geocoding import geocoder
+from src.models.weather_models import BatchWeatherRequest
 
 router = APIRouter()
 weather_service = WeatherService()
 
+# Réponse rapide : corps JSON sérialisé par orjson et mémorisé avec l'entrée de cache
+fast_response = os.getenv("WEATHER_FAST_RESPONSE", "0").lower() in ("1", "true", "yes")
+
+# Diffusion des changements d'observation (SSE, WebSocket), une boucle de rafraîchissement par ville
+weather_stream = WeatherStream(weather_service)
+STREAM_MAX_CITIES = int(os.getenv("WEATHER_STREAM_MAX_CITIES", "50"))
+STREAM_HEARTBEAT = float(os.getenv("WEATHER_STREAM_HEARTBEAT", "15"))
+
+def _check_stream_cities(cities: List[str]) -> None:
+    if not cities or len(cities) > STREAM_MAX_CITIES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Indiquez entre 1 et {STREAM_MAX_CITIES} villes"
+        )
+
+def _cache_headers(entry: CacheEntry, etag: str, cache_status: str) -> Dict[str, str]:
+    """En-têtes de validation et de fraîcheur alignés sur les TTL de l'entrée de cache"""
+    age = max(0.0, time.time() - entry.fetched_at)
+    # Une entrée périmée n'est plus fraîche pour les clients : revalidation immédiate
+    max_age = 0 if cache_status == "STALE" else max(0, int(entry.soft_ttl - age))
+    stale = max(0, int(entry.hard_ttl - age) - max_age)
+    return {
+        "X-Cache": cache_status,
+        "ETag": etag,
+        "Last-Modified": formatdate(entry.fetched_at, usegmt=True),
+        "Cache-Control": f"public, max-age={max_age}, stale-while-revalidate={stale}",
+    }
+
+def _not_modified(request: Request, entry: CacheEntry, etag: str) -> bool:
+    """Évalue If-None-Match (comparaison faible), sinon If-Modified-Since"""
+    if_none_match: Optional[str] = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in candidates or etag in candidates
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(entry.fetched_at) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+@router.get("/cities/search")
+async def search_cities(q: str, limit: int = Query(10, ge=1, le=50)):
+    """Recherche de villes par préfixe (noms sans accents ni casse) dans le gazetteer local"""
+    return [asdict(place) for place in geocoder.gazetteer.search_prefix(q, limit)]
+
+@router.post("/weather/batch")
+async def get_weather_batch(request: BatchWeatherRequest):
+    """Récupère les données météo de plusieurs villes en une seule requête"""
+    results, errors = await weather_service.get_cached_weather_batch(request.cities)
+    return {
+        "results": results,
+        "errors": {
+            city: {"status_code": error.status_code, "detail": error.detail}
+            for city, error in errors.items()
+        }
+    }
+
+@router.get("/weather/stream")
+async def stream_weather(request: Request, cities: List[str] = Query([])):
+    """Flux Server-Sent Events : observation courante puis chaque changement des villes demandées"""
+    _check_stream_cities(cities)
+    queue = await weather_stream.subscribe(cities)
+
+    async def events():
+        try:
+            while not await request.is_disconnected():
+                try:
+                    message = await asyncio.wait_for(queue.get(), timeout=STREAM_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    # Commentaire SSE : garde la connexion ouverte à travers les proxys
+                    yield b": ping\n\n"
+                    continue
+                yield format_sse(message)
+        finally:
+            await weather_stream.remove(queue)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.websocket("/ws/weather")
+async def weather_socket(websocket: WebSocket):
+    """Flux WebSocket : {"subscribe": [...]} et {"unsubscribe": [...]} modifient les villes suivies
+
+    Au plus STREAM_MAX_CITIES villes par connexion : trop de villes à l'ouverture
+    ferment la connexion (code 1008) ; un abonnement qui dépasserait ce total
+    est refusé en entier, avec un message {"error": ...}.
+    """
+    await websocket.accept()
+    cities = websocket.query_params.getlist("cities")
+    if len(cities) > STREAM_MAX_CITIES:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION,
+                              reason=f"Au plus {STREAM_MAX_CITIES} villes par connexion")
+        return
+    queue = await weather_stream.subscribe(cities)
+
+    async def pump():
+        while True:
+            message = await queue.get()
+            await websocket.send_text(message.decode())
+
+    sender = asyncio.ensure_future(pump())
+    try:
+        while True:
+            message = await websocket.receive_json()
+            if message.get("subscribe"):
+                if not await weather_stream.add(queue, message["subscribe"], max_cities=STREAM_MAX_CITIES):
+                    weather_stream.send(queue, {"error": f"Au plus {STREAM_MAX_CITIES} villes par connexion"})
+            if message.get("unsubscribe"):
+                await weather_stream.remove(queue, message["unsubscribe"])
+    except WebSocketDisconnect:
+        pass
+    finally:
+        sender.cancel()
+        await weather_stream.remove(queue)
+
 @router.get("/weather/{city}")
-async def get_weather(city: str):
-    """Récupère les données météo pour une ville donnée"""
+async def get_weather(city: str, request: Request, response: Response):
+    """Récupère les données météo pour une ville donnée (requêtes conditionnelles ETag / Last-Modified)"""
     try:
-        # Utiliser get_current_weather qui gère déjà la récupération et la fusion
-        weather_data = await weather_service.get_current_weather(city)
-        return weather_data
+        # Lecture à travers le cache Redis, repli sur get_current_weather en cas de miss
+        entry, cache_status = await weather_service.get_cached_entry(city)
+        etag = weather_service.entry_etag(entry)
+        headers = _cache_headers(entry, etag, cache_status)
+        if _not_modified(request, entry, etag):
+            # Le client a déjà cette observation : ni corps ni sérialisation
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        if fast_response:
+            # Octets déjà sérialisés : ni validation, ni jsonable_encoder, ni json stdlib
+            return Response(content=weather_service.entry_body(entry), media_type="application/json", headers=headers)
+
+        response.headers.update(headers)
+        return weather_service.entry_weather(entry)
     except HTTPException as he:
         # Si c'est déjà une HTTPException, on la relance telle quelle
         raise he
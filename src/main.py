@@ -1,10 +1,6 @@
-from fastapi import FastAPI, Request
+from fastapi import FastAPI
 
-import time
-
-from prometheus_fastapi_instrumentator import Instrumentator
-
-from prometheus_client import Counter, Histogram
+from contextlib import asynccontextmanager
 
 import uvicorn
 
@@ -14,83 +10,80 @@ from src.routers.cache_router import router as cache_router
 
 from src.controllers.weather_controller import router as weather_router
 
-# Création des métriques
-
-REQUEST_COUNT = Counter(
+from src.controllers.cache_controller import router as cache_controller_router
 
-    'http_requests_total',
+from src.config.http_client import init_http_clients, close_http_clients
 
-    'Total HTTP Requests',
+from src.config.redis import init_redis, check_redis, close_redis
 
-    ['method', 'endpoint', 'http_status']
+from src.cache.local_cache import listen_invalidations, pubsub_enabled
 
-)
+from src.services.geocoding import geocoder
 
-REQUEST_LATENCY = Histogram(
+from src.services.cache_warmer import CacheWarmer
 
-    'http_request_duration_seconds',
+from src.controllers.weather_controller import weather_service, weather_stream
 
-    'HTTP request latency in seconds',
+from src.monitoring import mark_worker_dead, setup_metrics
 
-    ['method', 'endpoint']
+import asyncio
 
-)
+# Cycle de vie : pools de connexions HTTP partagés vers les fournisseurs, pool Redis,
 
-app = FastAPI()
+# gazetteer local, écoute des invalidations du cache L1 entre workers
 
-# Configuration de l'instrumentation
+# préchauffage périodique des villes les plus demandées et flux de mises à jour ;
+# à l'arrêt, retrait des jauges du worker de la vue Prometheus multiprocessus
 
-instrumentator = Instrumentator(
+@asynccontextmanager
 
-    should_group_status_codes=False,
+async def lifespan(app: FastAPI):
 
-    excluded_handlers=["/metrics", "/health"]
+    init_http_clients()
 
-)
+    await init_redis()
 
-instrumentator.instrument(app).expose(app)
-
-# Enregistrement des routers avec préfixe /api
+    await init_redis(binary=True)
 
-app.include_router(cache_router, prefix="/api")
+    await check_redis()
 
-app.include_router(weather_router, prefix="/api")
+    geocoder.gazetteer.load()
 
-# Middleware pour le suivi des requêtes
+    invalidation_task = asyncio.create_task(listen_invalidations()) if pubsub_enabled else None
 
-@app.middleware("http")
+    cache_warmer = CacheWarmer(weather_service)
 
-async def monitor_requests(request: Request, call_next):
+    warmer_task = asyncio.create_task(cache_warmer.run()) if cache_warmer.enabled else None
 
-    method = request.method
+    yield
 
-    endpoint = request.url.path
+    for task in (invalidation_task, warmer_task):
 
-    start_time = time.time()
+        if task is not None:
 
-    response = await call_next(request)
+            task.cancel()
 
-    process_time = time.time() - start_time
+    await weather_stream.close()
 
-    REQUEST_COUNT.labels(
+    await close_http_clients()
 
-        method=method,
+    await close_redis()
 
-        endpoint=endpoint,
+    mark_worker_dead()
 
-        http_status=response.status_code
+app = FastAPI(lifespan=lifespan)
 
-    ).inc()
+# Métriques Prometheus : requêtes par modèle de route, endpoint /metrics
 
-    REQUEST_LATENCY.labels(
+setup_metrics(app)
 
-        method=method,
+# Enregistrement des routers avec préfixe /api
 
-        endpoint=endpoint
+app.include_router(cache_router, prefix="/api")
 
-    ).observe(process_time)
+app.include_router(cache_controller_router, prefix="/api")
 
-    return response
+app.include_router(weather_router, prefix="/api")
 
 # Routes de base
 
@@ -108,4 +101,5 @@ async def health_check():
 
 if __name__ == "__main__":
 
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
+    # Lancement de développement (rechargement automatique) ; en production, voir gunicorn.conf.py
+    uvicorn.run("src.main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
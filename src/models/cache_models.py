@@ -0,0 +1,13 @@
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Optional
+
+class CacheBulkKeys(BaseModel):
+    keys: List[str] = Field(..., min_length=1, max_length=1000, description="Clés du cache (sans le préfixe cache:)")
+
+class CacheItem(BaseModel):
+    key: str = Field(..., description="Clé du cache (sans le préfixe cache:)")
+    value: Dict[str, Any] = Field(..., description="Valeur à stocker")
+    ttl: Optional[int] = Field(None, ge=1, description="Durée de vie en secondes (aucune expiration par défaut)")
+
+class CacheBulkSetRequest(BaseModel):
+    items: List[CacheItem] = Field(..., min_length=1, max_length=1000, description="Valeurs à écrire")
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import Optional
+from typing import List, Literal, Optional
 
 class Temperature(BaseModel):
     current: float = Field(..., description="Température actuelle en degrés Celsius")
@@ -15,4 +15,15 @@ class WeatherData(BaseModel):
     wind_direction: int = Field(..., ge=0, le=360, description="Direction du vent en degrés")
     weather_description: str = Field(..., description="Description des conditions météorologiques")
     timestamp: datetime = Field(default_factory=datetime.utcnow)
-    source: str = Field(..., description="Source des données météorologiques")
\ No newline at end of file
+    source: str = Field(..., description="Source des données météorologiques")
+
+class BatchWeatherRequest(BaseModel):
+    cities: List[str] = Field(..., min_length=1, max_length=200, description="Liste des villes à interroger")
+
+class CacheInvalidationRequest(BaseModel):
+    mode: Literal["weather", "city", "provider", "pattern"] = Field(..., description="Portée de l'invalidation")
+    city: Optional[str] = Field(None, description="Ville à invalider (mode city)")
+    provider: Optional[str] = Field(None, description="Fournisseur dont les contributions sont invalidées (mode provider)")
+    pattern: Optional[str] = Field(None, description="Motif glob relatif à l'espace de noms (mode pattern)")
+    namespace: Literal["weather", "cache"] = Field("weather", description="Espace de noms du motif")
+    wait: bool = Field(False, description="Attendre la fin de l'invalidation avant de répondre")
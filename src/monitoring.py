@@ -1,8 +1,191 @@
-from fastapi import FastAPI
-from prometheus_fastapi_instrumentator import Instrumentator
+from contextlib import contextmanager
+from fastapi import FastAPI, Request, Response
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from prometheus_client import multiprocess
+from typing import Optional
 import logging
+import os
+import random
+import time
 from pythonjsonlogger import jsonlogger
 
+# Mode multiprocessus (plusieurs workers uvicorn/gunicorn) : chaque worker écrit ses métriques
+# dans des fichiers de PROMETHEUS_MULTIPROC_DIR, /metrics agrège ceux de tous les workers.
+# La variable doit être définie avant le démarrage des workers (lue à l'import de prometheus_client).
+MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR") or None
+
+# Métriques des fournisseurs météo
+
+PROVIDER_REQUESTS = Counter(
+    'weather_provider_requests_total',
+    'Appels aux fournisseurs météo par résultat',
+    ['provider', 'outcome']
+)
+
+PROVIDER_LATENCY = Histogram(
+    'weather_provider_latency_seconds',
+    'Latence des appels aux fournisseurs météo',
+    ['provider'],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 1.5, 2.5, 5.0, 10.0)
+)
+
+PROVIDER_QUOTA_REMAINING = Gauge(
+    'weather_provider_quota_remaining',
+    'Quota restant par fournisseur (window: minute = jetons du seau, day = quota journalier)',
+    ['provider', 'window'],
+    # Quota partagé via Redis : la valeur la plus basse des workers vivants est la plus juste
+    multiprocess_mode='livemin'
+)
+
+PROVIDER_CIRCUIT_STATE = Gauge(
+    'weather_provider_circuit_state',
+    'État du disjoncteur par fournisseur (0 fermé, 1 semi-ouvert, 2 ouvert)',
+    ['provider'],
+    # Un disjoncteur par worker : on expose le plus dégradé parmi les workers vivants
+    multiprocess_mode='livemax'
+)
+
+CACHE_WARMER_REFRESHES = Counter(
+    'weather_cache_warmer_refreshes_total',
+    'Rafraîchissements du préchauffeur de cache (refreshed, ceded, failed)',
+    ['outcome']
+)
+
+# Cache négatif : villes inconnues (city au niveau du service, geocode au niveau du géocodeur)
+# et fournisseurs indisponibles (provider), pour que le trafic invalide n'atteigne pas l'amont
+
+NEGATIVE_CACHE_STORES = Counter(
+    'weather_negative_cache_stores_total',
+    'Entrées de cache négatif enregistrées',
+    ['kind']
+)
+
+NEGATIVE_CACHE_HITS = Counter(
+    'weather_negative_cache_hits_total',
+    'Requêtes résolues par le cache négatif, sans appel amont',
+    ['kind']
+)
+
+# Contrôle d'admission des appels amont (délestage quand les fournisseurs ralentissent)
+
+ADMISSION_IN_FLIGHT = Gauge(
+    'weather_admission_in_flight',
+    'Appels amont admis en cours',
+    ['pool'],
+    multiprocess_mode='livesum'
+)
+
+ADMISSION_QUEUE_DEPTH = Gauge(
+    'weather_admission_queue_depth',
+    "Requêtes en file d'attente d'admission",
+    ['pool'],
+    multiprocess_mode='livesum'
+)
+
+ADMISSION_REJECTIONS = Counter(
+    'weather_admission_rejections_total',
+    "Requêtes refusées par le contrôle d'admission (503) par motif",
+    ['pool', 'reason']
+)
+
+# Métriques HTTP, étiquetées par modèle de route ("/api/weather/{city}") et non par chemin :
+# le nombre de séries reste borné quel que soit le nombre de villes demandées
+
+REQUEST_COUNT = Counter(
+    'http_requests_total',
+    'Total HTTP Requests',
+    ['method', 'endpoint', 'http_status']
+)
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds',
+    'HTTP request latency in seconds',
+    ['method', 'endpoint']
+)
+
+# Durée des étapes d'une requête météo (provider renseigné pour l'étape "provider" seulement)
+
+STAGE_LATENCY = Histogram(
+    'weather_stage_duration_seconds',
+    'Durée des étapes du traitement météo (geocode, provider, merge, cache_get, cache_set, serialize, deserialize)',
+    ['stage', 'provider'],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+)
+
+@contextmanager
+def stage_timer(stage: str, provider: str = ""):
+    """Mesure la durée d'une étape dans weather_stage_duration_seconds, y compris en cas d'erreur"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_LATENCY.labels(stage=stage, provider=provider).observe(time.perf_counter() - started)
+
+def route_template(request: Request) -> str:
+    """Modèle de la route qui a traité la requête ; "unmatched" si aucune ne correspond"""
+    route = request.scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+# Collecteurs d'état propre au processus (cache L1, pool Redis) : leurs valeurs ne passent pas
+# par les fichiers partagés ; en mode multiprocessus, ils décrivent le worker qui répond au scrape
+_process_collectors = []
+_multiprocess_registry: Optional[CollectorRegistry] = None
+
+class _WorkerCollector:
+    """Ajoute l'étiquette worker (pid) aux métriques d'un collecteur propre au processus"""
+
+    def __init__(self, collector):
+        self._collector = collector
+
+    def collect(self):
+        worker = str(os.getpid())
+        for metric in self._collector.collect():
+            metric.samples = [sample._replace(labels={**sample.labels, "worker": worker}) for sample in metric.samples]
+            yield metric
+
+def register_process_collector(collector):
+    """Enregistre un collecteur propre au processus, exposé aussi dans la vue multiprocessus"""
+    REGISTRY.register(collector)
+    _process_collectors.append(collector)
+    if _multiprocess_registry is not None:
+        _multiprocess_registry.register(_WorkerCollector(collector))
+    return collector
+
+def metrics_registry() -> CollectorRegistry:
+    """Registre exposé sur /metrics : celui du processus, ou l'agrégat des workers en mode multiprocessus"""
+    global _multiprocess_registry
+    if not MULTIPROC_DIR:
+        return REGISTRY
+    if _multiprocess_registry is None:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry, path=MULTIPROC_DIR)
+        for collector in _process_collectors:
+            registry.register(_WorkerCollector(collector))
+        _multiprocess_registry = registry
+    return _multiprocess_registry
+
+def mark_worker_dead(pid: Optional[int] = None) -> None:
+    """Supprime les fichiers de jauges "live" d'un worker arrêté (le processus courant par défaut)
+
+    Compteurs et histogrammes du worker restent agrégés : ils ne doivent pas régresser.
+    """
+    if MULTIPROC_DIR:
+        multiprocess.mark_process_dead(pid or os.getpid(), MULTIPROC_DIR)
+
+class SamplingFilter(logging.Filter):
+    """Ne conserve qu'une fraction des messages sous WARNING ; avertissements et erreurs passent toujours"""
+
+    def __init__(self, rate: float = 1.0):
+        super().__init__()
+        self.rate = rate
+
+    @classmethod
+    def from_env(cls, name: str = "LOG_SAMPLE_RATE", default: str = "1.0") -> "SamplingFilter":
+        return cls(float(os.getenv(name, default)))
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno >= logging.WARNING or self.rate >= 1.0 or random.random() < self.rate
+
 def setup_logging():
     """Configure le logging structuré"""
     logger = logging.getLogger()
@@ -20,8 +203,27 @@ def setup_logging():
     return logger
 
 def setup_metrics(app: FastAPI):
-    """Configure les métriques Prometheus"""
-    Instrumentator().instrument(app).expose(app)
+    """Configure les métriques Prometheus : suivi des requêtes par modèle de route et endpoint /metrics"""
+    @app.middleware("http")
+    async def monitor_requests(request: Request, call_next):
+        started = time.perf_counter()
+        response = await call_next(request)
+        # La route n'est connue qu'après le routage, d'où la lecture après call_next
+        endpoint = route_template(request)
+        REQUEST_COUNT.labels(
+            method=request.method,
+            endpoint=endpoint,
+            http_status=response.status_code
+        ).inc()
+        REQUEST_LATENCY.labels(
+            method=request.method,
+            endpoint=endpoint
+        ).observe(time.perf_counter() - started)
+        return response
+
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        return Response(generate_latest(metrics_registry()), media_type=CONTENT_TYPE_LATEST)
 
 def add_health_check(app: FastAPI):
     """Ajoute un endpoint de vérification de santé"""
@@ -1,5 +1,7 @@
-from fastapi import APIRouter, HTTPException
-from src.services.weather_service import WeatherService
+from fastapi import APIRouter, HTTPException, status
+from src.controllers.weather_controller import weather_service
+from src.cache.invalidation import invalidator
+from src.models.weather_models import CacheInvalidationRequest
 
 router = APIRouter(tags=["Cache"])
 
@@ -7,9 +9,33 @@ router = APIRouter(tags=["Cache"])
 async def clear_cache():
     """Vide le cache des données météo"""
     try:
-        # Créé une instance du service
-        weather_service = WeatherService()
+        # Service partagé : fournisseurs, disjoncteurs et files d'admission restent ceux du worker
         await weather_service.clear_cache()
         return {"status": "success", "message": "Cache vidé avec succès"}
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/cache/invalidate", summary="Invalider une partie du cache")
+async def invalidate_cache(request: CacheInvalidationRequest):
+    """Invalide les entrées météo, une ville, les contributions d'un fournisseur ou un motif de clés
+
+    Sans wait, l'invalidation tourne en arrière-plan : sa progression se suit
+    via GET /cache/invalidate/{job_id} sur le même worker.
+    """
+    job = await weather_service.invalidate(
+        request.mode,
+        city=request.city,
+        provider=request.provider,
+        pattern=request.pattern,
+        namespace=request.namespace,
+        wait=request.wait,
+    )
+    return job.to_dict()
+
+@router.get("/cache/invalidate/{job_id}", summary="Progression d'une invalidation")
+async def get_invalidation(job_id: str):
+    """Retourne la progression d'une invalidation lancée par ce worker"""
+    job = invalidator.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Invalidation inconnue")
+    return job.to_dict()
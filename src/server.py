@@ -0,0 +1,24 @@
+# src/server.py
+import os
+
+from uvicorn.workers import UvicornWorker
+
+
+class ProductionWorker(UvicornWorker):
+    """Worker gunicorn pour l'application ASGI : boucle uvloop et parseur HTTP httptools.
+
+    SERVER_LOOP et SERVER_HTTP permettent de revenir à asyncio / h11 ("auto"
+    choisit uvloop et httptools s'ils sont installés).
+    """
+
+    CONFIG_KWARGS = {
+        "loop": os.getenv("SERVER_LOOP", "uvloop"),
+        "http": os.getenv("SERVER_HTTP", "httptools"),
+    }
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Arrêt gracieux (SIGTERM) : les requêtes en cours se terminent, puis les connexions
+        # longues (SSE, WebSocket) sont fermées avant le SIGKILL du maître, ce qui laisse
+        # le temps au lifespan de libérer Redis et les pools HTTP
+        self.config.timeout_graceful_shutdown = max(1, int(self.cfg.graceful_timeout * 0.8))
@@ -0,0 +1,85 @@
+# src/services/admission.py
+import asyncio
+import logging
+import os
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from fastapi import HTTPException, status
+
+from ..monitoring import ADMISSION_IN_FLIGHT, ADMISSION_QUEUE_DEPTH, ADMISSION_REJECTIONS
+
+logger = logging.getLogger(__name__)
+
+
+class AdmissionController:
+    """Contrôle d'admission des appels amont : concurrence bornée et file d'attente courte.
+
+    Au plus max_concurrency appels en cours par worker ; au-delà, jusqu'à
+    max_queue requêtes attendent au plus queue_timeout secondes. File pleine
+    ou attente dépassée : 503 immédiat avec Retry-After, plutôt que
+    d'accumuler des requêtes en mémoire pendant que les fournisseurs rament.
+    Seuls les miss passent par ici : les hits du cache ne sont jamais mis en file.
+    """
+
+    def __init__(self, name: str = "upstream", max_concurrency: Optional[int] = None,
+                 max_queue: Optional[int] = None, queue_timeout: Optional[float] = None,
+                 retry_after: Optional[int] = None):
+        self.name = name
+        self.max_concurrency = max_concurrency or int(os.getenv("WEATHER_UPSTREAM_CONCURRENCY", "32"))
+        self.max_queue = max_queue if max_queue is not None else int(os.getenv("WEATHER_UPSTREAM_QUEUE", "64"))
+        self.queue_timeout = queue_timeout if queue_timeout is not None else \
+            float(os.getenv("WEATHER_UPSTREAM_QUEUE_TIMEOUT_MS", "1000")) / 1000
+        self.retry_after = retry_after or int(os.getenv("WEATHER_UPSTREAM_RETRY_AFTER", "2"))
+        # Créé au premier appel : avant Python 3.10, un Semaphore est lié à la boucle
+        # courante à sa création, or le service est construit à l'import, avant la
+        # boucle du worker (asyncio.run de uvicorn)
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.in_flight = 0
+        self.waiting = 0
+
+    @asynccontextmanager
+    async def admit(self):
+        """Réserve une place pour un appel amont, ou lève une HTTPException 503"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        if self._semaphore.locked():
+            await self._wait()
+        else:
+            await self._semaphore.acquire()
+        self.in_flight += 1
+        ADMISSION_IN_FLIGHT.labels(pool=self.name).inc()
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            ADMISSION_IN_FLIGHT.labels(pool=self.name).dec()
+            self._semaphore.release()
+
+    async def _wait(self) -> None:
+        if self.waiting >= self.max_queue:
+            self._reject("queue_full")
+        self.waiting += 1
+        ADMISSION_QUEUE_DEPTH.labels(pool=self.name).inc()
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._reject("timeout")
+        finally:
+            self.waiting -= 1
+            ADMISSION_QUEUE_DEPTH.labels(pool=self.name).dec()
+
+    def _reject(self, reason: str) -> None:
+        ADMISSION_REJECTIONS.labels(pool=self.name, reason=reason).inc()
+        logger.warning(
+            f"Requête amont refusée ({reason}): {self.in_flight} en cours, {self.waiting} en attente"
+        )
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Service surchargé, réessayez plus tard",
+            headers={"Retry-After": str(self.retry_after)}
+        )
+
+    def stats(self) -> dict:
+        return {"in_flight": self.in_flight, "waiting": self.waiting,
+                "max_concurrency": self.max_concurrency, "max_queue": self.max_queue}
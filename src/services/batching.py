@@ -0,0 +1,62 @@
+# src/services/batching.py
+import asyncio
+from typing import Awaitable, Callable, Dict, Generic, Hashable, List, Optional, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class MicroBatcher(Generic[K, V]):
+    """Regroupe les demandes arrivées dans une courte fenêtre en un seul appel groupé.
+
+    Le lot part à l'expiration de la fenêtre ou dès qu'il atteint max_size.
+    Une même clé soumise plusieurs fois dans la fenêtre n'est demandée qu'une fois.
+    """
+
+    def __init__(self, batch_fn: Callable[[List[K]], Awaitable[Dict[K, V]]],
+                 window: float = 0.005, max_size: int = 100):
+        self._batch_fn = batch_fn
+        self.window = window
+        self.max_size = max_size
+        self._pending: Dict[K, asyncio.Future] = {}
+        self._timer: Optional[asyncio.Task] = None
+        self._dispatches = set()
+
+    async def submit(self, key: K) -> Optional[V]:
+        future = self._pending.get(key)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self._pending[key] = future
+            if len(self._pending) >= self.max_size:
+                self._flush()
+            elif self._timer is None:
+                self._timer = asyncio.ensure_future(self._flush_later())
+        return await asyncio.shield(future)
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.window)
+        self._timer = None
+        self._flush()
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, {}
+        if not batch:
+            return
+        task = asyncio.ensure_future(self._dispatch(batch))
+        self._dispatches.add(task)
+        task.add_done_callback(self._dispatches.discard)
+
+    async def _dispatch(self, batch: Dict[K, asyncio.Future]) -> None:
+        try:
+            results = await self._batch_fn(list(batch))
+        except Exception as e:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for key, future in batch.items():
+            if not future.done():
+                future.set_result(results.get(key))
@@ -0,0 +1,138 @@
+# src/services/cache_warmer.py
+import asyncio
+import logging
+import os
+import random
+import time
+from collections import Counter
+from typing import List
+
+from ..cache.singleflight import RedisLock
+from ..config.redis import get_redis
+from ..monitoring import CACHE_WARMER_REFRESHES
+
+logger = logging.getLogger(__name__)
+
+POPULARITY_KEY = "popularity:cities"
+WARMER_LOCK_KEY = "lock:cache-warmer"
+
+
+class PopularityTracker:
+    """Fréquence des requêtes par ville, à décroissance exponentielle, partagée via Redis.
+
+    Les requêtes sont comptées en mémoire puis poussées par lot (ZINCRBY dans
+    un pipeline) à chaque cycle du préchauffeur : aucun aller-retour Redis
+    supplémentaire sur le chemin des requêtes.
+    """
+
+    def __init__(self, key: str = POPULARITY_KEY, max_tracked: int = 1000):
+        self.key = key
+        self.max_tracked = max_tracked
+        self._pending: Counter = Counter()
+
+    def record(self, city: str) -> None:
+        if len(self._pending) >= self.max_tracked and city not in self._pending:
+            return
+        self._pending[city] += 1
+
+    async def flush(self, redis) -> None:
+        """Ajoute les comptes locaux au classement partagé"""
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, Counter()
+        async with redis.pipeline(transaction=False) as pipe:
+            for city, count in pending.items():
+                pipe.zincrby(self.key, count, city)
+            await pipe.execute()
+
+    async def decay(self, redis, factor: float, min_score: float = 0.01) -> None:
+        """Multiplie tous les scores par factor et borne la taille du classement"""
+        async with redis.pipeline(transaction=True) as pipe:
+            pipe.zunionstore(self.key, {self.key: factor})
+            pipe.zremrangebyscore(self.key, "-inf", min_score)
+            pipe.zremrangebyrank(self.key, 0, -(self.max_tracked + 1))
+            await pipe.execute()
+
+    async def top(self, redis, n: int) -> List[str]:
+        return list(await redis.zrevrange(self.key, 0, n - 1))
+
+
+class CacheWarmer:
+    """Rafraîchit périodiquement les villes les plus demandées avant leur expiration.
+
+    À chaque cycle, un seul worker (verrou Redis) applique la décroissance,
+    lit le top-N et rafraîchit les villes absentes du cache ou dont le TTL
+    doux expire avant le cycle suivant, avec un décalage aléatoire et une
+    concurrence bornée.
+    """
+
+    def __init__(self, service):
+        self.service = service
+        self.tracker: PopularityTracker = service.popularity
+        self.enabled = os.getenv("CACHE_WARMER_ENABLED", "1").lower() in ("1", "true", "yes")
+        self.interval = float(os.getenv("CACHE_WARMER_INTERVAL", "60"))
+        self.top_n = int(os.getenv("CACHE_WARMER_TOP_N", "50"))
+        self.concurrency = int(os.getenv("CACHE_WARMER_CONCURRENCY", "5"))
+        self.jitter = float(os.getenv("CACHE_WARMER_JITTER", "5"))
+        # Demi-vie des compteurs de popularité, en secondes
+        self.half_life = float(os.getenv("CACHE_WARMER_HALF_LIFE", "3600"))
+
+    async def run(self) -> None:
+        logger.info(f"🔥 Préchauffage du cache: top {self.top_n} villes toutes les {self.interval}s")
+        while True:
+            await asyncio.sleep(self.interval + random.uniform(0, self.jitter))
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Échec du cycle de préchauffage du cache: {str(e)}")
+
+    async def run_once(self) -> int:
+        """Exécute un cycle ; retourne le nombre de villes rafraîchies (hors rafraîchissements cédés)"""
+        try:
+            redis = await get_redis()
+        except Exception as e:
+            logger.warning(f"Préchauffage ignoré, Redis indisponible: {str(e)}")
+            return 0
+
+        await self.tracker.flush(redis)
+        lock = RedisLock(redis, WARMER_LOCK_KEY, int(self.interval * 1000))
+        if not await lock.acquire():
+            # Un autre worker préchauffe ce cycle ; le verrou expire de lui-même
+            return 0
+
+        await self.tracker.decay(redis, 0.5 ** (self.interval / self.half_life))
+        cities = await self.tracker.top(redis, self.top_n)
+        due = await self._due_for_refresh(cities)
+        if not due:
+            return 0
+
+        # Mesures recueillies ville par ville (décalage aléatoire, concurrence bornée),
+        # puis une seule fusion vectorisée pour tout le cycle
+        to_load = {self.service._cache_key(city): city for city in due}
+        outcomes = await self.service._load_many(
+            to_load, background=True, concurrency=self.concurrency, jitter=self.jitter
+        )
+        refreshed = 0
+        for cache_key, outcome in outcomes.items():
+            if isinstance(outcome, BaseException):
+                CACHE_WARMER_REFRESHES.labels(outcome="failed").inc()
+                logger.warning(f"Préchauffage impossible pour {to_load[cache_key]}: {str(outcome)}")
+            elif outcome is None:
+                # Déjà en cours de rafraîchissement ici ou sur un autre worker (verrou)
+                CACHE_WARMER_REFRESHES.labels(outcome="ceded").inc()
+            else:
+                CACHE_WARMER_REFRESHES.labels(outcome="refreshed").inc()
+                refreshed += 1
+        return refreshed
+
+    async def _due_for_refresh(self, cities: List[str]) -> List[str]:
+        """Villes absentes du cache ou dont le TTL doux expire avant le prochain cycle"""
+        keys = {city: self.service._cache_key(city) for city in cities}
+        entries = await self.service._read_entries(list(keys.values()))
+        deadline = time.time() + self.interval + self.jitter
+        return [
+            city for city, key in keys.items()
+            if key not in entries or entries[key].fetched_at + entries[key].soft_ttl <= deadline
+        ]
@@ -0,0 +1,74 @@
+# src/services/circuit_breaker.py
+import os
+import time
+
+from ..monitoring import PROVIDER_CIRCUIT_STATE
+
+
+class CircuitBreaker:
+    """Disjoncteur par fournisseur.
+
+    Fermé : les appels passent. Après failure_threshold échecs consécutifs
+    (erreurs ou dépassements de délai), il s'ouvre et les appels sont ignorés.
+    Après recovery_timeout secondes, il passe semi-ouvert et laisse passer un
+    appel de sonde : un succès le referme, un échec le rouvre.
+    """
+
+    CLOSED = "closed"
+    HALF_OPEN = "half_open"
+    OPEN = "open"
+
+    _STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+    def __init__(self, name: str, failure_threshold: int = 5, recovery_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._state = self.CLOSED
+        self._set_state(self.CLOSED)
+
+    @classmethod
+    def from_env(cls, name: str) -> "CircuitBreaker":
+        return cls(
+            name,
+            failure_threshold=int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5")),
+            recovery_timeout=float(os.getenv("BREAKER_RECOVERY_SECONDS", "30")),
+        )
+
+    @property
+    def state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.recovery_timeout:
+            self._set_state(self.HALF_OPEN)
+        return self._state
+
+    def allow_request(self) -> bool:
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        return False
+
+    def release(self) -> None:
+        """Libère la sonde semi-ouverte sans résultat (appel finalement non effectué)"""
+        self._probe_in_flight = False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self._probe_in_flight = False
+        self._set_state(self.CLOSED)
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._probe_in_flight = False
+        if self._state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self._opened_at = time.monotonic()
+            self._set_state(self.OPEN)
+
+    def _set_state(self, state: str) -> None:
+        self._state = state
+        PROVIDER_CIRCUIT_STATE.labels(provider=self.name).set(self._STATE_VALUES[state])
@@ -0,0 +1,236 @@
+# src/services/geocoding.py
+import bisect
+import csv
+import json
+import logging
+import os
+import unicodedata
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from fastapi import HTTPException, status
+
+from ..cache.local_cache import LocalCache
+from ..cache.singleflight import SingleFlight
+from ..config.http_client import get_http_client
+from ..config.redis import get_redis
+from ..monitoring import NEGATIVE_CACHE_HITS, NEGATIVE_CACHE_STORES, stage_timer
+
+logger = logging.getLogger(__name__)
+
+# Marqueur de cache négatif : ville inconnue du géocodage amont
+_NOT_FOUND = object()
+
+DEFAULT_GAZETTEER_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "cities.tsv")
+
+
+def fold_name(name: str) -> str:
+    """Normalise un nom de lieu : accents retirés, casse, tirets et espaces"""
+    decomposed = unicodedata.normalize("NFKD", name)
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(stripped.replace("-", " ").replace("'", " ").split()).lower()
+
+
+@dataclass
+class Place:
+    name: str
+    lat: float
+    lon: float
+    country: str = ""
+    population: int = 0
+
+    def coordinates(self) -> Dict[str, float]:
+        return {"lat": self.lat, "lon": self.lon}
+
+
+class Gazetteer:
+    """Index local de villes chargé une fois depuis un TSV au format GeoNames.
+
+    Colonnes utilisées : name (1), asciiname (2), alternatenames (3),
+    latitude (4), longitude (5), country code (8), population (14).
+    À nom égal, la ville la plus peuplée l'emporte.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.getenv("GAZETTEER_PATH") or DEFAULT_GAZETTEER_PATH
+        self._index: Dict[str, Place] = {}
+        self._sorted_names: List[str] = []
+        self.loaded = False
+
+    def load(self) -> "Gazetteer":
+        index: Dict[str, Place] = {}
+        try:
+            with open(self.path, encoding="utf-8", newline="") as f:
+                for row in csv.reader(f, delimiter="\t", quoting=csv.QUOTE_NONE):
+                    if len(row) < 15:
+                        continue
+                    place = Place(
+                        name=row[1],
+                        lat=float(row[4]),
+                        lon=float(row[5]),
+                        country=row[8],
+                        population=int(row[14] or 0),
+                    )
+                    names = {row[1], row[2], *row[3].split(",")}
+                    for name in names:
+                        key = fold_name(name)
+                        if key and (key not in index or index[key].population < place.population):
+                            index[key] = place
+        except OSError as e:
+            logger.error(f"❌ Impossible de charger le gazetteer {self.path}: {str(e)}")
+        self._index = index
+        self._sorted_names = sorted(index)
+        self.loaded = True
+        logger.info(f"📍 Gazetteer chargé: {len(index)} noms indexés")
+        return self
+
+    def lookup(self, name: str) -> Optional[Place]:
+        if not self.loaded:
+            self.load()
+        return self._index.get(fold_name(name))
+
+    def search_prefix(self, prefix: str, limit: int = 10) -> List[Place]:
+        """Recherche par préfixe (autocomplétion), triée par population décroissante"""
+        if not self.loaded:
+            self.load()
+        folded = fold_name(prefix)
+        if not folded:
+            return []
+        start = bisect.bisect_left(self._sorted_names, folded)
+        places = {}
+        for name in self._sorted_names[start:]:
+            if not name.startswith(folded):
+                break
+            place = self._index[name]
+            places[(place.name, place.country)] = place
+        return sorted(places.values(), key=lambda p: p.population, reverse=True)[:limit]
+
+
+class Geocoder:
+    """Résolution des coordonnées : gazetteer local, cache Redis persistant, puis géocodage amont.
+
+    Un résultat amont est écrit sans expiration dans Redis : une ville n'est
+    géocodée qu'une seule fois. Une ville inconnue de l'amont est mémorisée
+    pendant GEOCODING_NEGATIVE_TTL secondes (mémoire et Redis).
+    """
+
+    def __init__(self, gazetteer: Optional[Gazetteer] = None):
+        self.gazetteer = gazetteer or Gazetteer()
+        self.geocoding_url = os.getenv("GEOCODING_URL", "https://geocoding-api.open-meteo.com/v1/search")
+        self.upstream_enabled = os.getenv("GEOCODING_UPSTREAM", "1").lower() in ("1", "true", "yes")
+        self.negative_ttl = int(os.getenv("GEOCODING_NEGATIVE_TTL", "300"))
+        self._memo = LocalCache(max_entries=10000, default_ttl=86400)
+        self._singleflight = SingleFlight()
+
+    async def resolve(self, city: str) -> Optional[Dict[str, float]]:
+        place = self.gazetteer.lookup(city)
+        if place is not None:
+            return place.coordinates()
+
+        key = fold_name(city)
+        if not key:
+            return None
+        coords = self._memo.get(key)
+        if coords is _NOT_FOUND:
+            NEGATIVE_CACHE_HITS.labels(kind="geocode").inc()
+            return None
+        if coords is not None:
+            return coords
+        return await self._singleflight.do(key, lambda: self._resolve_remote(key, city))
+
+    def known_missing(self, city: str) -> bool:
+        """Vrai si la ville est connue comme introuvable (cache négatif du processus), sans appel"""
+        return self._memo.peek(fold_name(city)) is _NOT_FOUND
+
+    async def _resolve_remote(self, key: str, city: str) -> Optional[Dict[str, float]]:
+        cache_key = f"geo:{key}"
+        redis = None
+        try:
+            redis = await get_redis()
+            cached = await redis.get(cache_key)
+            if cached:
+                coords = json.loads(cached)
+                if coords is None:
+                    # Entrée négative écrite par un autre worker
+                    NEGATIVE_CACHE_HITS.labels(kind="geocode").inc()
+                    self._memo.set(key, _NOT_FOUND, ttl=self.negative_ttl)
+                    return None
+                self._memo.set(key, coords)
+                return coords
+        except Exception as e:
+            logger.warning(f"Cache de géocodage indisponible pour {cache_key}: {str(e)}")
+
+        if not self.upstream_enabled:
+            return None
+        coords = await self._geocode_upstream(city)
+        if coords is None:
+            await self._remember_not_found(redis, key, cache_key)
+            return None
+        self._memo.set(key, coords)
+        if redis is not None:
+            try:
+                await redis.set(cache_key, json.dumps(coords))
+            except Exception as e:
+                logger.warning(f"Écriture impossible dans le cache de géocodage pour {cache_key}: {str(e)}")
+        return coords
+
+    async def remember_not_found(self, city: str) -> None:
+        """Mémorise une ville déclarée inconnue par un fournisseur (sauf si le gazetteer la connaît)"""
+        key = fold_name(city)
+        if not key or self.gazetteer.lookup(city) is not None or self.known_missing(city):
+            return
+        try:
+            redis = await get_redis()
+        except Exception as e:
+            logger.warning(f"Cache de géocodage indisponible pour geo:{key}: {str(e)}")
+            redis = None
+        await self._remember_not_found(redis, key, f"geo:{key}")
+
+    async def _remember_not_found(self, redis, key: str, cache_key: str) -> None:
+        if self.negative_ttl <= 0:
+            return
+        NEGATIVE_CACHE_STORES.labels(kind="geocode").inc()
+        self._memo.set(key, _NOT_FOUND, ttl=self.negative_ttl)
+        if redis is not None:
+            try:
+                await redis.set(cache_key, "null", ex=self.negative_ttl)
+            except Exception as e:
+                logger.warning(f"Écriture impossible dans le cache de géocodage pour {cache_key}: {str(e)}")
+
+    async def _geocode_upstream(self, city: str) -> Optional[Dict[str, float]]:
+        """Géocode via l'API Open-Meteo ; None si la ville est inconnue, exception si le service échoue"""
+        client = get_http_client("open-meteo")
+        response = await client.get(
+            self.geocoding_url,
+            params={"name": city, "count": 1, "language": "fr", "format": "json"}
+        )
+        response.raise_for_status()
+        results = response.json().get("results") or []
+        if not results:
+            return None
+        return {"lat": results[0]["latitude"], "lon": results[0]["longitude"]}
+
+
+# Instance unique, index chargé au démarrage de l'application
+geocoder = Geocoder()
+
+
+async def get_coordinates(city: str) -> Dict[str, float]:
+    """Convertit un nom de ville en coordonnées géographiques
+
+    Gazetteer local en priorité, puis cache Redis persistant et géocodage amont.
+    """
+    try:
+        with stage_timer("geocode"):
+            coords = await geocoder.resolve(city)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Service de géocodage indisponible: {str(e)}"
+        )
+    if coords is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Coordonnées non trouvées pour la ville: {city}"
+        )
+    return coords
@@ -0,0 +1,147 @@
+# src/services/merge.py
+import math
+import statistics
+import warnings
+from datetime import datetime
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from .weather_data import Temperature, WeatherData
+
+# Champs scalaires fusionnés par moyenne pondérée, dans l'ordre des colonnes de la matrice
+NUMERIC_FIELDS = ("temperature", "feels_like", "humidity", "wind_speed")
+
+# Écart minimal toléré à la médiane avant d'écarter une mesure, par champ :
+# évite d'écarter des mesures quasi identiques quand la dispersion est nulle
+OUTLIER_FLOOR = np.array([2.0, 2.0, 10.0, 5.0])
+OUTLIER_THRESHOLD = 3.0  # en écarts absolus médians normalisés
+
+
+def merge_observations(
+    observations: Sequence[Sequence[Optional[WeatherData]]],
+    weights: Sequence[float],
+    outlier_threshold: float = OUTLIER_THRESHOLD,
+) -> List[Optional[WeatherData]]:
+    """Fusionne une matrice villes × fournisseurs d'observations en une passe vectorisée
+
+    observations[i][j] est la mesure du fournisseur j pour la ville i (None si
+    absente) et weights[j] le poids du fournisseur. Par ville : les mesures
+    éloignées de la médiane (écart absolu médian) sont écartées, les champs
+    scalaires sont moyennés avec pondération, la direction du vent est une
+    moyenne vectorielle et la description retenue est celle dont le poids
+    cumulé est le plus élevé. Une ville sans aucune mesure donne None.
+    """
+    n_cities = len(observations)
+    n_providers = len(weights)
+    values = np.full((n_cities, n_providers, len(NUMERIC_FIELDS)), np.nan)
+    directions = np.full((n_cities, n_providers), np.nan)
+    descriptions = np.full((n_cities, n_providers), "", dtype=object)
+    for i, row in enumerate(observations):
+        for j, data in enumerate(row):
+            if data is None:
+                continue
+            values[i, j] = (data.temperature.current, data.temperature.feels_like,
+                            data.humidity, data.wind_speed)
+            directions[i, j] = data.wind_direction
+            descriptions[i, j] = data.weather_description
+
+    present = ~np.isnan(directions)
+    w = np.where(present, np.asarray(weights, dtype=float)[np.newaxis, :], 0.0)
+    # Ville dont tous les fournisseurs ont un poids nul : pondération uniforme
+    w = np.where(w.sum(axis=1, keepdims=True) > 0, w, present.astype(float))
+
+    # Valeurs aberrantes : écart à la médiane au-delà du seuil (MAD normalisée, avec plancher)
+    with np.errstate(all="ignore"), warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # villes sans aucune mesure
+        median = np.nanmedian(values, axis=1, keepdims=True)
+        deviation = np.abs(values - median)
+        mad = np.nanmedian(deviation, axis=1, keepdims=True) * 1.4826
+    tolerance = np.maximum(outlier_threshold * np.nan_to_num(mad), OUTLIER_FLOOR)
+    kept = present[:, :, np.newaxis] & (deviation <= tolerance)
+    field_weights = np.where(kept, w[:, :, np.newaxis], 0.0)
+    total = field_weights.sum(axis=1)
+    with np.errstate(all="ignore"):
+        means = np.nansum(np.where(kept, values, 0.0) * field_weights, axis=1) / total
+
+    # Direction du vent : moyenne des vecteurs unitaires pondérés (350° et 10° donnent 0°)
+    radians = np.deg2rad(np.nan_to_num(directions))
+    angle = np.rad2deg(np.arctan2((np.sin(radians) * w).sum(axis=1), (np.cos(radians) * w).sum(axis=1)))
+    mean_direction = np.mod(np.round(angle), 360.0)
+
+    # Description : poids cumulé par libellé ; à égalité, le premier fournisseur l'emporte
+    labels, codes = np.unique(descriptions.astype(str), return_inverse=True)
+    codes = codes.reshape(descriptions.shape)
+    scores = np.zeros((n_cities, len(labels)))
+    tie_break = w - 1e-9 * np.arange(n_providers)[np.newaxis, :]
+    np.add.at(scores, (np.repeat(np.arange(n_cities), n_providers), codes.ravel()),
+              np.where(present, tie_break, 0.0).ravel())
+    best = labels[scores.argmax(axis=1)]
+
+    timestamp = datetime.utcnow()
+    merged: List[Optional[WeatherData]] = []
+    for i, row in enumerate(observations):
+        if not present[i].any():
+            merged.append(None)
+            continue
+        city = next(data.city for data in row if data is not None)
+        temperature, feels_like, humidity, wind_speed = (round(float(v), 1) for v in means[i])
+        merged.append(WeatherData(
+            city=city,
+            temperature=Temperature(current=temperature, feels_like=feels_like),
+            humidity=humidity,
+            wind_speed=wind_speed,
+            wind_direction=float(mean_direction[i]),
+            weather_description=str(best[i]),
+            source="aggregated",
+            timestamp=timestamp,
+            sources=[data.source for data in row if data is not None]
+        ))
+    return merged
+
+
+def merge_weather(
+    weather_data_list: Sequence[WeatherData],
+    weights: Sequence[float],
+    outlier_threshold: float = OUTLIER_THRESHOLD,
+) -> WeatherData:
+    """Fusionne les mesures de plusieurs fournisseurs pour une seule ville
+
+    Mêmes règles que merge_observations, en Python pur : pour une poignée de
+    mesures, le coût fixe de NumPy dépasserait celui du calcul lui-même.
+    """
+    weights = [float(w) for w in weights]
+    if sum(weights) <= 0:
+        weights = [1.0] * len(weather_data_list)
+    columns = zip(*(
+        (data.temperature.current, data.temperature.feels_like, data.humidity, data.wind_speed)
+        for data in weather_data_list
+    ))
+    means = []
+    for values, floor in zip(columns, OUTLIER_FLOOR.tolist()):
+        median = statistics.median(values)
+        deviations = [abs(value - median) for value in values]
+        tolerance = max(outlier_threshold * statistics.median(deviations) * 1.4826, floor)
+        kept = [(value, w) for value, w, deviation in zip(values, weights, deviations) if deviation <= tolerance]
+        total = sum(w for _, w in kept)
+        means.append(round(sum(value * w for value, w in kept) / total, 1))
+
+    radians = [math.radians(data.wind_direction) for data in weather_data_list]
+    angle = math.degrees(math.atan2(sum(math.sin(r) * w for r, w in zip(radians, weights)),
+                                    sum(math.cos(r) * w for r, w in zip(radians, weights))))
+
+    scores = {}
+    for j, (data, w) in enumerate(zip(weather_data_list, weights)):
+        scores[data.weather_description] = scores.get(data.weather_description, 0.0) + w - 1e-9 * j
+    temperature, feels_like, humidity, wind_speed = means
+    return WeatherData(
+        city=weather_data_list[0].city,
+        temperature=Temperature(current=temperature, feels_like=feels_like),
+        humidity=humidity,
+        wind_speed=wind_speed,
+        wind_direction=float(round(angle) % 360),
+        weather_description=max(sorted(scores), key=scores.get),
+        source="aggregated",
+        timestamp=datetime.utcnow(),
+        sources=[data.source for data in weather_data_list]
+    )
@@ -0,0 +1,5 @@
+from .base import CityNotFound, ProviderUnavailable, WeatherProvider
+from .open_meteo import OpenMeteoProvider
+from .openweathermap import OpenWeatherMapProvider
+from .weatherapi import WeatherAPIProvider
+from .registry import ProviderRegistry, STRATEGIES, build_registry
\ No newline at end of file
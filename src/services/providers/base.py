@@ -0,0 +1,84 @@
+# src/services/providers/base.py
+import asyncio
+import os
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional
+
+from ..circuit_breaker import CircuitBreaker
+from ..rate_limiter import RateLimiter
+from ..weather_data import WeatherData
+
+
+class ProviderUnavailable(Exception):
+    """Fournisseur inutilisable en l'état (clé API absente ou refusée) : inutile de réessayer à chaque requête"""
+
+
+class CityNotFound(Exception):
+    """Ville inconnue du fournisseur : réponse valide, qui ne compte pas comme une panne"""
+
+
+class WeatherProvider(ABC):
+    """Interface d'un fournisseur de données météo.
+
+    Chaque fournisseur déclare son coût relatif par appel, son quota, sa prise
+    en charge des requêtes groupées, sa priorité (plus petite = préférée) et le
+    poids accordé à ses mesures lors de la fusion. Les valeurs déclarées peuvent
+    être surchargées par PROVIDER_<NOM>_COST, _PRIORITY, _WEIGHT, _RATE_LIMIT
+    et _DAILY_QUOTA ; débit et quota sont appliqués par un limiteur partagé via Redis.
+    Un fournisseur qui lève ProviderUnavailable est écarté pendant
+    PROVIDER_UNAVAILABLE_TTL secondes (cache négatif, sans toucher au disjoncteur).
+    """
+
+    name: str = ""
+    cost: float = 0.0                   # coût relatif par appel (0 = gratuit)
+    rate_limit: Optional[int] = None    # appels autorisés par minute
+    daily_quota: Optional[int] = None   # appels autorisés par jour
+    supports_batch: bool = False
+    priority: int = 100
+    weight: float = 1.0
+
+    def __init__(self):
+        self.cost = float(self._setting("COST", self.cost))
+        self.priority = int(self._setting("PRIORITY", self.priority))
+        self.weight = float(self._setting("WEIGHT", self.weight))
+        rate_limit = self._setting("RATE_LIMIT", self.rate_limit)
+        self.rate_limit = int(rate_limit) if rate_limit is not None else None
+        daily_quota = self._setting("DAILY_QUOTA", self.daily_quota)
+        self.daily_quota = int(daily_quota) if daily_quota is not None else None
+        self.breaker = CircuitBreaker.from_env(self.name)
+        self.rate_limiter = RateLimiter(self.name, self.rate_limit, self.daily_quota)
+        self.latency_ewma: Optional[float] = None
+        self.unavailable_ttl = float(self._setting("UNAVAILABLE_TTL", os.getenv("PROVIDER_UNAVAILABLE_TTL", "60")))
+        self.unavailable_reason: Optional[str] = None
+        self._unavailable_until = 0.0
+
+    def _setting(self, key: str, default):
+        prefix = self.name.upper().replace("-", "_")
+        return os.getenv(f"PROVIDER_{prefix}_{key}", default)
+
+    @abstractmethod
+    async def fetch(self, city: str) -> Optional[WeatherData]:
+        """Récupère l'observation courante d'une ville, None si indisponible"""
+
+    async def fetch_batch(self, cities: List[str]) -> Dict[str, Optional[WeatherData]]:
+        """Récupère plusieurs villes ; par défaut un appel par ville en parallèle"""
+        results = await asyncio.gather(*(self.fetch(city) for city in cities), return_exceptions=True)
+        return {
+            city: result if isinstance(result, WeatherData) else None
+            for city, result in zip(cities, results)
+        }
+
+    def mark_unavailable(self, reason: str) -> None:
+        self.unavailable_reason = reason
+        self._unavailable_until = time.monotonic() + self.unavailable_ttl
+
+    def is_unavailable(self) -> bool:
+        return time.monotonic() < self._unavailable_until
+
+    def record_latency(self, seconds: float, alpha: float = 0.2) -> None:
+        """Moyenne mobile exponentielle de la latence, utilisée par la stratégie "fastest" """
+        if self.latency_ewma is None:
+            self.latency_ewma = seconds
+        else:
+            self.latency_ewma = alpha * seconds + (1 - alpha) * self.latency_ewma
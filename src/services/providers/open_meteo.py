@@ -0,0 +1,146 @@
+# src/services/providers/open_meteo.py
+import asyncio
+import logging
+import os
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+
+from ...config.http_client import get_http_client
+from ..batching import MicroBatcher
+from ..geocoding import get_coordinates
+from ..weather_data import Temperature, WeatherData
+from .base import WeatherProvider
+
+logger = logging.getLogger(__name__)
+
+# Convertit le code météo WMO en description lisible
+WEATHER_CODES = {
+    0: "Ciel dégagé",
+    1: "Principalement clair",
+    2: "Partiellement nuageux",
+    3: "Couvert",
+    45: "Brouillard",
+    48: "Brouillard givrant",
+    51: "Bruine légère",
+    53: "Bruine modérée",
+    55: "Bruine dense",
+    56: "Bruine verglaçante légère",
+    57: "Bruine verglaçante dense",
+    61: "Pluie légère",
+    63: "Pluie modérée",
+    65: "Pluie forte",
+    66: "Pluie verglaçante légère",
+    67: "Pluie verglaçante forte",
+    71: "Chute de neige légère",
+    73: "Chute de neige modérée",
+    75: "Chute de neige forte",
+    77: "Grains de neige",
+    80: "Averses de pluie légères",
+    81: "Averses de pluie modérées",
+    82: "Averses de pluie violentes",
+    85: "Averses de neige légères",
+    86: "Averses de neige fortes",
+    95: "Orage modéré ou fort",
+    96: "Orage avec grêle légère",
+    99: "Orage avec grêle forte"
+}
+
+CURRENT_FIELDS = "temperature_2m,relative_humidity_2m,wind_speed_10m,wind_direction_10m,weather_code"
+
+
+class OpenMeteoProvider(WeatherProvider):
+    """Open-Meteo : gratuit, sans clé, requêtes multi-positions.
+
+    Les villes demandées dans une courte fenêtre (OPENMETEO_BATCH_WINDOW_MS)
+    partagent un seul appel /forecast avec des listes de latitudes/longitudes.
+    """
+
+    name = "open-meteo"
+    cost = 0.0
+    rate_limit = 600
+    daily_quota = 10000
+    supports_batch = True
+    priority = 10
+
+    def __init__(self):
+        super().__init__()
+        self.url = os.getenv("OPENMETEO_URL", "https://api.open-meteo.com/v1")
+        self.batch_window = float(os.getenv("OPENMETEO_BATCH_WINDOW_MS", "5")) / 1000
+        self.batch_max = int(os.getenv("OPENMETEO_BATCH_MAX", "100"))
+        self._batcher = MicroBatcher(self.fetch_batch, window=self.batch_window, max_size=self.batch_max)
+
+    async def fetch(self, city: str) -> Optional[WeatherData]:
+        """Récupère les données météo depuis Open-Meteo (regroupées en micro-lots si activé)"""
+        try:
+            if self.batch_window > 0:
+                return await self._batcher.submit(city)
+            return (await self.fetch_batch([city]))[city]
+        except Exception as e:
+            logger.warning(f"Erreur OpenMeteo: {str(e)}")
+            return None
+
+    async def fetch_batch(self, cities: List[str]) -> Dict[str, Optional[WeatherData]]:
+        """Récupère les données Open-Meteo de plusieurs villes en un appel par tranche
+
+        Open-Meteo accepte des listes de latitudes/longitudes séparées par des
+        virgules et renvoie une réponse par position, dans le même ordre.
+        """
+        results: Dict[str, Optional[WeatherData]] = {city: None for city in cities}
+        # Géocodage des villes en parallèle : un lot froid ne paie qu'un aller-retour
+        coordinates = await asyncio.gather(*(get_coordinates(city) for city in cities), return_exceptions=True)
+        located = []
+        for city, coords in zip(cities, coordinates):
+            if isinstance(coords, HTTPException):
+                logger.warning(f"Erreur OpenMeteo: {coords.detail}")
+            elif isinstance(coords, BaseException):
+                raise coords
+            else:
+                located.append((city, coords))
+
+        chunks = [
+            located[i:i + self.batch_max]
+            for i in range(0, len(located), self.batch_max)
+        ]
+        for chunk_results in await asyncio.gather(*(self._fetch_chunk(chunk) for chunk in chunks)):
+            results.update(chunk_results)
+        return results
+
+    async def _fetch_chunk(self, located: List[Tuple[str, Dict[str, float]]]) -> Dict[str, Optional[WeatherData]]:
+        # Paramètres de la requête multi-positions
+        params = {
+            "latitude": ",".join(str(coords["lat"]) for _, coords in located),
+            "longitude": ",".join(str(coords["lon"]) for _, coords in located),
+            "current": CURRENT_FIELDS,
+            "timezone": "auto"
+        }
+        try:
+            # Faire la requête à l'API Open-Meteo via le pool partagé
+            client = get_http_client(self.name)
+            response = await client.get(f"{self.url}/forecast", params=params)
+            response.raise_for_status()
+            data = response.json()
+        except Exception as e:
+            logger.warning(f"Erreur OpenMeteo: {str(e)}")
+            return {city: None for city, _ in located}
+
+        # Une seule position : un objet ; plusieurs : une liste dans l'ordre des coordonnées
+        payloads = data if isinstance(data, list) else [data]
+        return {
+            city: self._parse_current(city, payload.get("current", {}))
+            for (city, _), payload in zip(located, payloads)
+        }
+
+    def _parse_current(self, city: str, current: Dict) -> WeatherData:
+        return WeatherData(
+            city=city.capitalize(),
+            temperature=Temperature(
+                current=current.get("temperature_2m", 0),
+                feels_like=current.get("temperature_2m", 0)  # Open-Meteo ne fournit pas cette donnée
+            ),
+            humidity=current.get("relative_humidity_2m", 0),
+            wind_speed=current.get("wind_speed_10m", 0),
+            wind_direction=current.get("wind_direction_10m", 0),
+            weather_description=WEATHER_CODES.get(current.get("weather_code", 0), "Inconnu"),
+            source=self.name
+        )
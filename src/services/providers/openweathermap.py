@@ -0,0 +1,71 @@
+# src/services/providers/openweathermap.py
+import logging
+import os
+from typing import Optional
+
+from ...config.http_client import get_http_client
+from ..geocoding import get_coordinates
+from ..weather_data import Temperature, WeatherData
+from .base import ProviderUnavailable, WeatherProvider
+
+logger = logging.getLogger(__name__)
+
+
+class OpenWeatherMapProvider(WeatherProvider):
+    """OpenWeatherMap : clé API requise, quota de 60 appels par minute en offre gratuite"""
+
+    name = "openweathermap"
+    cost = 1.0
+    rate_limit = 60
+    daily_quota = 33000
+    priority = 20
+
+    def __init__(self):
+        super().__init__()
+        self.url = "https://api.openweathermap.org/data/2.5/weather"
+
+    async def fetch(self, city: str) -> Optional[WeatherData]:
+        """Récupère les données météo depuis OpenWeatherMap"""
+        api_key = os.getenv("OPENWEATHER_API_KEY")
+        if not api_key or api_key == "votre_cle_openweather":
+            raise ProviderUnavailable("Clé API OpenWeatherMap manquante ou non configurée")
+
+        try:
+            # 1. Géocodage de la ville (gazetteer local ou cache, sans appel OpenWeatherMap)
+            location = await get_coordinates(city)
+
+            # 2. Récupération des données météo
+            client = get_http_client(self.name)
+            response = await client.get(
+                self.url,
+                params={
+                    "lat": location["lat"],
+                    "lon": location["lon"],
+                    "units": "metric",
+                    "lang": "fr",
+                    "appid": api_key
+                }
+            )
+            if response.status_code in (401, 403):
+                raise ProviderUnavailable(f"Clé API OpenWeatherMap refusée ({response.status_code})")
+            response.raise_for_status()
+            data = response.json()
+
+            return WeatherData(
+                city=city.capitalize(),
+                temperature=Temperature(
+                    current=data["main"]["temp"],
+                    feels_like=data["main"]["feels_like"]
+                ),
+                humidity=data["main"]["humidity"],
+                wind_speed=data["wind"]["speed"] * 3.6,  # Conversion en km/h
+                wind_direction=data["wind"].get("deg", 0),
+                weather_description=data["weather"][0]["description"].capitalize(),
+                source=self.name
+            )
+
+        except ProviderUnavailable:
+            raise
+        except Exception as e:
+            logger.warning(f"Erreur OpenWeatherMap: {str(e)}")
+            return None
@@ -0,0 +1,67 @@
+# src/services/providers/registry.py
+import os
+from typing import Dict, Iterator, List, Optional, Type
+
+from .base import WeatherProvider
+from .open_meteo import OpenMeteoProvider
+from .openweathermap import OpenWeatherMapProvider
+from .weatherapi import WeatherAPIProvider
+
+# Fournisseurs disponibles, activés via WEATHER_PROVIDERS (liste séparée par des virgules)
+PROVIDER_CLASSES: Dict[str, Type[WeatherProvider]] = {
+    OpenWeatherMapProvider.name: OpenWeatherMapProvider,
+    WeatherAPIProvider.name: WeatherAPIProvider,
+    OpenMeteoProvider.name: OpenMeteoProvider,
+}
+
+STRATEGIES = ("all", "cheapest", "fastest")
+
+
+class ProviderRegistry:
+    """Registre des fournisseurs météo et choix des fournisseurs à interroger"""
+
+    def __init__(self, providers: Optional[List[WeatherProvider]] = None):
+        self._providers: Dict[str, WeatherProvider] = {}
+        for provider in providers or []:
+            self.register(provider)
+
+    def register(self, provider: WeatherProvider) -> None:
+        self._providers[provider.name] = provider
+
+    def unregister(self, name: str) -> None:
+        self._providers.pop(name, None)
+
+    def get(self, name: str) -> WeatherProvider:
+        return self._providers[name]
+
+    def __iter__(self) -> Iterator[WeatherProvider]:
+        return iter(self._providers.values())
+
+    def __len__(self) -> int:
+        return len(self._providers)
+
+    def select(self, strategy: str = "all") -> List[WeatherProvider]:
+        """Ordonne les fournisseurs candidats selon la stratégie
+
+        - all : tous, par priorité
+        - cheapest : par coût croissant, puis priorité
+        - fastest : par latence moyenne croissante (les fournisseurs jamais mesurés d'abord)
+        """
+        providers = list(self._providers.values())
+        if strategy == "cheapest":
+            return sorted(providers, key=lambda p: (p.cost, p.priority))
+        if strategy == "fastest":
+            return sorted(providers, key=lambda p: (p.latency_ewma or 0.0, p.priority))
+        if strategy == "all":
+            return sorted(providers, key=lambda p: p.priority)
+        raise ValueError(f"Stratégie de sélection inconnue: {strategy}")
+
+
+def build_registry() -> ProviderRegistry:
+    """Construit le registre à partir de WEATHER_PROVIDERS (tous les fournisseurs par défaut)"""
+    names = os.getenv("WEATHER_PROVIDERS", ",".join(PROVIDER_CLASSES))
+    return ProviderRegistry([
+        PROVIDER_CLASSES[name.strip()]()
+        for name in names.split(",")
+        if name.strip() in PROVIDER_CLASSES
+    ])
@@ -0,0 +1,79 @@
+# src/services/providers/weatherapi.py
+import logging
+import os
+from typing import Optional
+
+from ...config.http_client import get_http_client
+from ..weather_data import Temperature, WeatherData
+from .base import CityNotFound, ProviderUnavailable, WeatherProvider
+
+logger = logging.getLogger(__name__)
+
+
+# Code d'erreur WeatherAPI (réponse 400) : aucune localité ne correspond
+_NO_MATCHING_LOCATION = 1006
+
+
+class WeatherAPIProvider(WeatherProvider):
+    """WeatherAPI.com : clé API requise, géocodage fait côté fournisseur"""
+
+    name = "weatherapi"
+    cost = 1.0
+    daily_quota = 33000
+    priority = 30
+
+    def __init__(self):
+        super().__init__()
+        self.url = "http://api.weatherapi.com/v1/current.json"
+
+    async def fetch(self, city: str) -> Optional[WeatherData]:
+        """Récupère les données météo depuis WeatherAPI.com"""
+        api_key = os.getenv("WEATHERAPI_KEY")
+        if not api_key:
+            raise ProviderUnavailable("Clé API WeatherAPI manquante")
+
+        try:
+            client = get_http_client(self.name)
+            response = await client.get(
+                self.url,
+                params={
+                    "key": api_key,
+                    "q": city,
+                    "aqi": "no",
+                    "lang": "fr"
+                }
+            )
+            if response.status_code in (401, 403):
+                raise ProviderUnavailable(f"Clé API WeatherAPI refusée ({response.status_code})")
+            if response.status_code == 400 and self._error_code(response) == _NO_MATCHING_LOCATION:
+                raise CityNotFound(f"Ville inconnue de WeatherAPI: {city}")
+            response.raise_for_status()
+            data = response.json()
+
+            current = data["current"]
+
+            return WeatherData(
+                city=data["location"]["name"],
+                temperature=Temperature(
+                    current=current["temp_c"],
+                    feels_like=current["feelslike_c"]
+                ),
+                humidity=current["humidity"],
+                wind_speed=current["wind_kph"],
+                wind_direction=current["wind_degree"],
+                weather_description=current["condition"]["text"],
+                source=self.name
+            )
+
+        except (ProviderUnavailable, CityNotFound):
+            raise
+        except Exception as e:
+            logger.warning(f"Erreur WeatherAPI: {str(e)}")
+            return None
+
+    @staticmethod
+    def _error_code(response) -> Optional[int]:
+        try:
+            return response.json()["error"]["code"]
+        except Exception:
+            return None
@@ -0,0 +1,142 @@
+# src/services/rate_limiter.py
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from typing import Optional, Tuple
+
+from ..config.redis import get_redis
+from ..monitoring import PROVIDER_QUOTA_REMAINING
+
+logger = logging.getLogger(__name__)
+
+# Seau à jetons + quota journalier, évalués atomiquement côté Redis.
+# Retourne {autorisé (0/1), jetons restants, quota journalier restant (-1 si illimité)}.
+_TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local quota = tonumber(ARGV[4])
+local quota_ttl = tonumber(ARGV[5])
+
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+if capacity > 0 then
+    tokens = math.min(capacity, tokens + math.max(0, now - ts) / 1000 * rate)
+end
+
+local used = tonumber(redis.call('GET', KEYS[2]) or '0')
+local remaining_quota = -1
+if quota >= 0 then
+    remaining_quota = quota - used
+end
+
+local allowed = 1
+if quota >= 0 and remaining_quota <= 0 then
+    allowed = 0
+elseif capacity > 0 and tokens < 1 then
+    allowed = 0
+end
+
+if allowed == 1 then
+    if capacity > 0 then
+        tokens = tokens - 1
+    end
+    used = redis.call('INCR', KEYS[2])
+    if used == 1 then
+        redis.call('EXPIRE', KEYS[2], quota_ttl)
+    end
+    if quota >= 0 then
+        remaining_quota = quota - used
+    end
+end
+
+if capacity > 0 then
+    redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', now)
+    redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000) + 1000)
+end
+return {allowed, math.floor(tokens), remaining_quota}
+"""
+
+
+class RateLimiter:
+    """Limiteur de débit par clé d'API amont, partagé entre les workers via Redis.
+
+    Seau à jetons de rate_limit jetons par minute et quota journalier
+    (jour UTC). Si Redis est indisponible, un seau en mémoire du processus
+    prend le relais avec les mêmes limites.
+    """
+
+    def __init__(self, name: str, rate_limit: Optional[int] = None, daily_quota: Optional[int] = None):
+        self.name = name
+        self.rate_limit = rate_limit
+        self.daily_quota = daily_quota
+        self.enabled = os.getenv("RATE_LIMIT_ENABLED", "1").lower() in ("1", "true", "yes")
+        self._script = None
+        # État du repli en mémoire
+        self._tokens = float(rate_limit or 0)
+        self._updated_at = time.monotonic()
+        self._day = ""
+        self._used_today = 0
+
+    @property
+    def unlimited(self) -> bool:
+        return not self.enabled or (not self.rate_limit and self.daily_quota is None)
+
+    async def acquire(self) -> bool:
+        """Consomme un jeton ; False si le débit ou le quota du fournisseur est épuisé"""
+        if self.unlimited:
+            return True
+        try:
+            allowed, tokens, remaining_quota = await self._acquire_redis()
+        except Exception as e:
+            logger.warning(f"Limiteur Redis indisponible pour {self.name}, repli en mémoire: {str(e)}")
+            allowed, tokens, remaining_quota = self._acquire_local()
+        if self.rate_limit:
+            PROVIDER_QUOTA_REMAINING.labels(provider=self.name, window="minute").set(tokens)
+        if self.daily_quota is not None:
+            PROVIDER_QUOTA_REMAINING.labels(provider=self.name, window="day").set(remaining_quota)
+        return allowed
+
+    async def _acquire_redis(self) -> Tuple[bool, int, int]:
+        redis = await get_redis()
+        if self._script is None:
+            self._script = redis.register_script(_TOKEN_BUCKET_SCRIPT)
+        day = datetime.now(timezone.utc).strftime("%Y%m%d")
+        capacity = self.rate_limit or 0
+        allowed, tokens, remaining_quota = await self._script(
+            keys=[f"ratelimit:{self.name}", f"quota:{self.name}:{day}"],
+            args=[
+                capacity,
+                capacity / 60,
+                int(time.time() * 1000),
+                self.daily_quota if self.daily_quota is not None else -1,
+                2 * 86400,
+            ],
+            client=redis,
+        )
+        return bool(allowed), int(tokens), int(remaining_quota)
+
+    def _acquire_local(self) -> Tuple[bool, int, int]:
+        now = time.monotonic()
+        day = datetime.now(timezone.utc).strftime("%Y%m%d")
+        if day != self._day:
+            self._day, self._used_today = day, 0
+        if self.rate_limit:
+            self._tokens = min(
+                self.rate_limit, self._tokens + (now - self._updated_at) * self.rate_limit / 60
+            )
+        self._updated_at = now
+
+        remaining_quota = -1 if self.daily_quota is None else self.daily_quota - self._used_today
+        if self.daily_quota is not None and remaining_quota <= 0:
+            return False, int(self._tokens), remaining_quota
+        if self.rate_limit and self._tokens < 1:
+            return False, int(self._tokens), remaining_quota
+        if self.rate_limit:
+            self._tokens -= 1
+        self._used_today += 1
+        if self.daily_quota is not None:
+            remaining_quota -= 1
+        return True, int(self._tokens), remaining_quota
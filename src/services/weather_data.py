@@ -0,0 +1,20 @@
+from datetime import datetime
+from typing import List
+from pydantic import BaseModel, Field
+
+# Modèles de données
+class Temperature(BaseModel):
+    current: float
+    feels_like: float
+
+class WeatherData(BaseModel):
+    city: str
+    temperature: Temperature
+    humidity: float
+    wind_speed: float  # en km/h
+    wind_direction: float  # en degrés
+    weather_description: str
+    source: str
+    timestamp: datetime = Field(default_factory=datetime.utcnow)
+    # Fournisseurs ayant contribué à une mesure fusionnée (non exposé, ni mis en cache)
+    sources: List[str] = Field(default_factory=list, exclude=True)
\ No newline at end of file
@@ -1,428 +1,749 @@
 import time  # Ajoutez cette ligne
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional
-import httpx
+from functools import partial
+from typing import Dict, List, Optional, Tuple
+import hashlib
+import logging
 import os
-from pydantic import BaseModel, Field
+import random
 from dotenv import load_dotenv
 from fastapi import HTTPException, status
 import asyncio
-from ..config.redis import get_redis
-
-# Modèles de données
-class Temperature(BaseModel):
-    current: float
-    feels_like: float
-
-class WeatherData(BaseModel):
-    city: str
-    temperature: Temperature
-    humidity: float
-    wind_speed: float  # en km/h
-    wind_direction: float  # en degrés
-    weather_description: str
-    source: str
-    timestamp: datetime = Field(default_factory=datetime.utcnow)
 
 # Charger les variables d'environnement
 load_dotenv(override=True)
 
 from ..config.redis import get_redis
+from ..cache.singleflight import SingleFlight, RedisLock
+from ..cache.entry import CacheEntry
+from ..cache.codec import json_bytes
+from ..cache.local_cache import LocalCache, local_cache, publish_invalidation
+from ..cache.invalidation import InvalidationJob, NAMESPACES, invalidator, provider_index_key
+from .weather_data import Temperature, WeatherData
+from .geocoding import geocoder
+from .providers import CityNotFound, ProviderUnavailable, WeatherProvider, build_registry
+from .cache_warmer import PopularityTracker
+from .admission import AdmissionController
+from .merge import merge_observations, merge_weather
+from ..monitoring import (
+    NEGATIVE_CACHE_HITS, NEGATIVE_CACHE_STORES, PROVIDER_LATENCY, PROVIDER_REQUESTS, STAGE_LATENCY, stage_timer
+)
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_city(city: str) -> str:
+    """Normalise un nom de ville pour les clés de cache (casse et espaces)"""
+    return " ".join(city.split()).lower()
+
 
 class WeatherService:
     def __init__(self):
-        self.open_meteo_url = os.getenv("OPENMETEO_URL", "https://api.open-meteo.com/v1")
-        self.timeout = 10.0
-        self.cache_duration = 600  # 10 minutes
-
-    # Puis dans la classe WeatherService :
-    async def get_cached_weather(self, city: str) -> WeatherData:
-        """Récupère les données météo avec cache Redis"""
-        cache = await get_redis()
-        cache_key = f"weather:{city.lower()}"
-        cached_data = await cache.get(cache_key)
-        
-        if cached_data:
-            return WeatherData(**cached_data)
-            
-        weather_data = await self.get_merged_weather(city)
-        await cache.set(cache_key, weather_data.dict(), ex=self.cache_duration)
-        return weather_data
+        self.timeout = float(os.getenv("WEATHER_TIMEOUT", "10"))
+        # Budget de latence : au-delà, on fusionne les fournisseurs qui ont déjà répondu
+        self.latency_budget = float(os.getenv("WEATHER_LATENCY_BUDGET_MS", "1500")) / 1000
+        # Fournisseurs enregistrés et stratégie de sélection (all, cheapest, fastest)
+        self.registry = build_registry()
+        self.provider_strategy = os.getenv("WEATHER_PROVIDER_STRATEGY", "all")
+        self.provider_fanout = int(os.getenv("WEATHER_PROVIDER_FANOUT", "1"))
+        # TTL doux : durée de fraîcheur ; TTL dur : expiration Redis (valeur servie périmée entre les deux)
+        self.cache_duration = int(os.getenv("CACHE_DURATION", "600"))  # 10 minutes par défaut
+        self.cache_hard_ttl = int(os.getenv("CACHE_HARD_TTL", str(self.cache_duration * 3)))
+        self.early_refresh_beta = float(os.getenv("CACHE_EARLY_REFRESH_BETA", "1.0"))
+        # Cache négatif des villes inconnues (404) : cache du worker distinct du L1, pour
+        # qu'un flot de villes inventées n'évince pas les entrées météo chaudes
+        self.not_found_ttl = int(os.getenv("WEATHER_NOT_FOUND_TTL", "60"))
+        self._not_found = LocalCache(
+            max_entries=int(os.getenv("WEATHER_NOT_FOUND_MAX_ENTRIES", "512")),
+            default_ttl=max(self.not_found_ttl, 0),
+        )
+        # Verrou Redis entre workers : un seul worker rafraîchit une clé à la fois
+        self.distributed_lock = os.getenv("WEATHER_DISTRIBUTED_LOCK", "0").lower() in ("1", "true", "yes")
+        self.lock_ttl_ms = int(os.getenv("WEATHER_LOCK_TTL_MS", "10000"))
+        self.lock_poll_interval = 0.05
+        # Nombre maximal d'appels amont simultanés pour une requête groupée
+        self.batch_concurrency = int(os.getenv("WEATHER_BATCH_CONCURRENCY", "10"))
+        self._singleflight = SingleFlight()
+        self._background_tasks = set()
+        # Fréquence des requêtes par ville, utilisée par le préchauffeur de cache
+        self.popularity = PopularityTracker()
+        # Concurrence bornée des appels amont (miss et rafraîchissements), délestage en 503
+        self.admission = AdmissionController()
 
-    async def clear_cache(self) -> None:
-        """Vide le cache Redis"""
-        cache = await get_redis()
-        try:
-            await cache.flushdb()
-        finally:
-            await cache.aclose()  # Ferme proprement la connexion
-    
-    async def _get_coordinates(self, city: str) -> Dict[str, float]:
-        """Convertit un nom de ville en coordonnées géographiques"""
-        # Pour simplifier, nous utilisons des coordonnées fixes
-        # En production, utilisez un service de géocodage comme Nominatim
-        coordinates = {
-            "paris": {"lat": 48.8566, "lon": 2.3522},
-            "london": {"lat": 51.5074, "lon": -0.1278},
-            "new york": {"lat": 40.7128, "lon": -74.0060},
-            "tokyo": {"lat": 35.6762, "lon": 139.6503},
-        }
-        
-        city_lower = city.lower()
-        if city_lower not in coordinates:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Coordonnées non trouvées pour la ville: {city}"
+    def _cache_key(self, city: str) -> str:
+        return f"weather:{normalize_city(city)}"
+
+    async def get_cached_weather(self, city: str) -> Tuple[WeatherData, str]:
+        """Récupère les données météo avec cache L1 puis Redis (lecture à travers le cache)
+
+        Retourne les données et l'état du cache : "HIT", "STALE" (servi périmé,
+        rafraîchi en arrière-plan) ou "MISS". Si Redis est indisponible, les
+        données sont récupérées directement auprès des fournisseurs.
+        Les miss concurrents sur une même ville partagent un seul appel amont.
+        """
+        cache_key, entry = await self._lookup(city)
+        if entry is not None:
+            return self.entry_weather(entry), self._serve_entry(city, cache_key, entry)
+        return await self._load(city, cache_key), "MISS"
+
+    async def get_cached_entry(self, city: str) -> Tuple[CacheEntry, str]:
+        """Comme get_cached_weather, mais retourne l'entrée de cache (données et métadonnées)
+
+        Sur un miss, l'entrée est celle qui vient d'être écrite, ou une entrée
+        transitoire si Redis est indisponible. Corps JSON, modèle et ETag sont
+        calculés une seule fois puis mémorisés avec l'entrée du cache L1.
+        """
+        cache_key, entry = await self._lookup(city)
+        if entry is not None:
+            return entry, self._serve_entry(city, cache_key, entry)
+        weather_data = await self._load(city, cache_key)
+        entry = local_cache.peek(cache_key)
+        if entry is None or entry.value is not weather_data:
+            weather_data = WeatherData.model_validate(weather_data)
+            entry = CacheEntry(
+                data=weather_data.model_dump(mode="json"),
+                fetched_at=time.time(),
+                soft_ttl=self.cache_duration,
+                hard_ttl=self.cache_hard_ttl,
+                value=weather_data,
             )
-        return coordinates[city_lower]
+        return entry, "MISS"
 
-    
-        """Récupère les données météorologiques actuelles pour une ville donnée"""
-        try:
-            # Obtenir les coordonnées de la ville
-            coords = await self._get_coordinates(city)
-            
-            # Paramètres de la requête
-            params = {
-                "latitude": coords["lat"],
-                "longitude": coords["lon"],
-                "current": "temperature_2m,relative_humidity_2m,wind_speed_10m,wind_direction_10m,weather_code",
-                "timezone": "auto"
-            }
-            
-            # Faire la requête à l'API Open-Meteo
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.get(
-                    f"{self.open_meteo_url}/forecast",
-                    params=params
+    async def _lookup(self, city: str) -> Tuple[str, Optional[CacheEntry]]:
+        """Clé de cache de la ville et entrée trouvée dans le cache L1 puis Redis"""
+        cache_key = self._cache_key(city)
+        self.popularity.record(normalize_city(city))
+        entry = local_cache.get(cache_key)
+        if entry is None:
+            self._check_not_found(cache_key)
+            entry = await self._read_entry(cache_key)
+        return cache_key, entry
+
+    def _check_not_found(self, cache_key: str) -> None:
+        """Lève la 404 mémorisée si la ville est en cache négatif"""
+        detail = self._not_found.get(cache_key)
+        if detail is not None:
+            NEGATIVE_CACHE_HITS.labels(kind="city").inc()
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=detail)
+
+    def _remember_not_found(self, cache_key: str, detail: str) -> None:
+        if self.not_found_ttl > 0:
+            NEGATIVE_CACHE_STORES.labels(kind="city").inc()
+            self._not_found.set(cache_key, detail, ttl=self.not_found_ttl)
+
+    async def get_cached_weather_batch(
+        self, cities: List[str]
+    ) -> Tuple[Dict[str, WeatherData], Dict[str, HTTPException]]:
+        """Récupère les données météo de plusieurs villes en une passe
+
+        Les hits sont résolus par le cache L1 puis un seul MGET Redis ; seuls
+        les miss interrogent les fournisseurs, avec une concurrence bornée, et
+        leurs mesures sont fusionnées en un seul appel vectorisé.
+        Retourne les résultats et les erreurs, indexés par ville demandée.
+        """
+        keys = {city: self._cache_key(city) for city in cities}
+        for city in cities:
+            self.popularity.record(normalize_city(city))
+        entries: Dict[str, CacheEntry] = {}
+        for cache_key in set(keys.values()):
+            entry = local_cache.get(cache_key)
+            if entry is not None:
+                entries[cache_key] = entry
+        missing = [k for k in set(keys.values()) if k not in entries]
+        if missing:
+            entries.update(await self._read_entries(missing))
+
+        results: Dict[str, WeatherData] = {}
+        errors: Dict[str, HTTPException] = {}
+        to_load: Dict[str, str] = {}
+        for city, cache_key in keys.items():
+            if cache_key in entries:
+                results[city] = self.entry_weather(entries[cache_key])
+                self._serve_entry(city, cache_key, entries[cache_key])
+            else:
+                to_load.setdefault(cache_key, city)
+
+        outcomes = await self._load_many(to_load) if to_load else {}
+        for city, cache_key in keys.items():
+            if cache_key not in outcomes:
+                continue
+            outcome = outcomes[cache_key]
+            if isinstance(outcome, HTTPException):
+                errors[city] = outcome
+            elif isinstance(outcome, Exception):
+                errors[city] = HTTPException(
+                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    detail=f"Impossible de récupérer les données météo pour {city}: {str(outcome)}"
                 )
-                response.raise_for_status()
-                data = response.json()
-                
-            current = data.get("current", {})
-            
-            # Convertir le code météo en description lisible
-            weather_codes = {
-                0: "Ciel dégagé",
-                1: "Principalement clair",
-                2: "Partiellement nuageux",
-                3: "Couvert",
-                45: "Brouillard",
-                48: "Brouillard givrant",
-                51: "Bruine légère",
-                53: "Bruine modérée",
-                55: "Bruine dense",
-                56: "Bruine verglaçante légère",
-                57: "Bruine verglaçante dense",
-                61: "Pluie légère",
-                63: "Pluie modérée",
-                65: "Pluie forte",
-                66: "Pluie verglaçante légère",
-                67: "Pluie verglaçante forte",
-                71: "Chute de neige légère",
-                73: "Chute de neige modérée",
-                75: "Chute de neige forte",
-                77: "Grains de neige",
-                80: "Averses de pluie légères",
-                81: "Averses de pluie modérées",
-                82: "Averses de pluie violentes",
-                85: "Averses de neige légères",
-                86: "Averses de neige fortes",
-                95: "Orage modéré ou fort",
-                96: "Orage avec grêle légère",
-                99: "Orage avec grêle forte"
-            }
-            
-            weather_code = current.get("weather_code", 0)
-            description = weather_codes.get(weather_code, "Inconnu")
-            
-            return WeatherData(
-                city=city.capitalize(),
-                temperature=Temperature(
-                    current=current.get("temperature_2m", 0),
-                    feels_like=current.get("temperature_2m", 0)  # Open-Meteo ne fournit pas cette donnée
-                ),
-                humidity=current.get("relative_humidity_2m", 0),
-                wind_speed=current.get("wind_speed_10m", 0),
-                wind_direction=current.get("wind_direction_10m", 0),
-                weather_description=description,
-                source="open-meteo"
-            )
-                
-        except httpx.HTTPStatusError as e:
-            raise HTTPException(
-                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-                detail=f"Erreur lors de l'appel à l'API météo: {str(e)}"
-            )
-        except httpx.RequestError as e:
-            raise HTTPException(
-                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-                detail=f"Impossible de se connecter au service météo: {str(e)}"
-            )
-        except Exception as e:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Erreur inattendue: {str(e)}"
-            )
+            else:
+                results[city] = outcome
+        return results, errors
+
+    def _serve_entry(self, city: str, cache_key: str, entry: CacheEntry) -> str:
+        """Sert une entrée en cache, en planifiant un rafraîchissement si elle est périmée ou proche de l'être
+
+        Retourne l'état du cache : "HIT" ou "STALE".
+        """
+        now = time.time()
+        if entry.is_fresh(now):
+            if entry.should_refresh_early(now, self.early_refresh_beta):
+                self._schedule_refresh(city, cache_key)
+            return "HIT"
+        self._schedule_refresh(city, cache_key)
+        return "STALE"
+
+    @staticmethod
+    def entry_weather(entry: CacheEntry) -> WeatherData:
+        """Modèle de l'entrée, validé une seule fois puis mémorisé avec elle dans le cache L1"""
+        if entry.value is None:
+            entry.value = WeatherData.model_validate(entry.data)
+        return entry.value
+
+    @staticmethod
+    def entry_body(entry: CacheEntry) -> bytes:
+        """Corps JSON de l'entrée, sérialisé une seule fois puis mémorisé avec elle dans le cache L1"""
+        if entry.body is None:
+            with stage_timer("serialize"):
+                entry.body = json_bytes(entry.data)
+        return entry.body
+
+    @classmethod
+    def entry_etag(cls, entry: CacheEntry) -> str:
+        """ETag fort : empreinte du corps JSON, mémorisée avec l'entrée"""
+        if entry.etag is None:
+            entry.etag = f'"{hashlib.blake2b(cls.entry_body(entry), digest_size=16).hexdigest()}"'
+        return entry.etag
+
+    async def _load(self, city: str, cache_key: str) -> WeatherData:
+        """Charge une ville absente du cache ; les miss concurrents partagent un appel amont"""
+        self._check_not_found(cache_key)
+        weather_data = await self._singleflight.do(
+            cache_key, lambda: self._refresh_cache(city, cache_key)
+        )
+        if weather_data is None:
+            # Rafraîchissement d'arrière-plan cédé à un autre worker entre-temps
+            weather_data = await self._fetch_and_store(city, cache_key)
+        return weather_data
 
-    async def _get_weather_from_openmeteo(self, city: str) -> Optional[WeatherData]:
-        """Récupère les données météo depuis Open-Meteo"""
+    async def _get_cache(self):
+        """Retourne le client Redis binaire (valeurs encodées par le codec), ou None s'il est indisponible"""
         try:
-            # Obtenir les coordonnées de la ville
-            coords = await self._get_coordinates(city)
-            
-            # Paramètres de la requête
-            params = {
-                "latitude": coords["lat"],
-                "longitude": coords["lon"],
-                "current": "temperature_2m,relative_humidity_2m,wind_speed_10m,wind_direction_10m,weather_code",
-                "timezone": "auto"
-            }
-            
-            # Faire la requête à l'API Open-Meteo
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.get(
-                    f"{self.open_meteo_url}/forecast",
-                    params=params
-                )
-                response.raise_for_status()
-                data = response.json()
-                
-            current = data.get("current", {})
-            
-            # Convertir le code météo en description lisible
-            weather_codes = {
-                0: "Ciel dégagé",
-                1: "Principalement clair",
-                2: "Partiellement nuageux",
-                3: "Couvert",
-                45: "Brouillard",
-                48: "Brouillard givrant",
-                51: "Bruine légère",
-                53: "Bruine modérée",
-                55: "Bruine dense",
-                56: "Bruine verglaçante légère",
-                57: "Bruine verglaçante dense",
-                61: "Pluie légère",
-                63: "Pluie modérée",
-                65: "Pluie forte",
-                66: "Pluie verglaçante légère",
-                67: "Pluie verglaçante forte",
-                71: "Chute de neige légère",
-                73: "Chute de neige modérée",
-                75: "Chute de neige forte",
-                77: "Grains de neige",
-                80: "Averses de pluie légères",
-                81: "Averses de pluie modérées",
-                82: "Averses de pluie violentes",
-                85: "Averses de neige légères",
-                86: "Averses de neige fortes",
-                95: "Orage modéré ou fort",
-                96: "Orage avec grêle légère",
-                99: "Orage avec grêle forte"
-            }
-            
-            weather_code = current.get("weather_code", 0)
-            description = weather_codes.get(weather_code, "Inconnu")
-            
-            return WeatherData(
-                city=city.capitalize(),
-                temperature=Temperature(
-                    current=current.get("temperature_2m", 0),
-                    feels_like=current.get("temperature_2m", 0)
-                ),
-                humidity=current.get("relative_humidity_2m", 0),
-                wind_speed=current.get("wind_speed_10m", 0),
-                wind_direction=current.get("wind_direction_10m", 0),
-                weather_description=description,
-                source="open-meteo"
-            )
-                
+            return await get_redis(binary=True)
         except Exception as e:
-            print(f"Erreur OpenMeteo: {str(e)}")
+            logger.warning(f"Cache Redis indisponible: {str(e)}")
             return None
 
-    async def _get_weather_from_openweather(self, city: str) -> Optional[WeatherData]:
-        """Récupère les données météo depuis OpenWeatherMap"""
-        api_key = os.getenv("OPENWEATHER_API_KEY")
-        if not api_key or api_key == "votre_cle_openweather":
-            print("Erreur: Clé API OpenWeatherMap manquante ou non configurée")
+    async def _read_entry(self, cache_key: str) -> Optional[CacheEntry]:
+        """Lit une entrée dans Redis et la recopie dans le cache L1"""
+        cache = await self._get_cache()
+        if cache is None:
             return None
-        
         try:
-            # 1. Géocodage de la ville
-            geo_url = "http://api.openweathermap.org/geo/1.0/direct"
-            async with httpx.AsyncClient() as client:
-                geo_response = await client.get(
-                    geo_url,
-                    params={"q": city, "limit": 1, "appid": api_key}
-                )
-                geo_response.raise_for_status()
-                location = geo_response.json()[0]
-                
-                # 2. Récupération des données météo
-                weather_url = "https://api.openweathermap.org/data/2.5/weather"
-                weather_response = await client.get(
-                    weather_url,
-                    params={
-                        "lat": location["lat"],
-                        "lon": location["lon"],
-                        "units": "metric",
-                        "lang": "fr",
-                        "appid": api_key
-                    }
-                )
-                weather_response.raise_for_status()
-                data = weather_response.json()
-                
-                return WeatherData(
-                    city=city.capitalize(),
-                    temperature=Temperature(
-                        current=data["main"]["temp"],
-                        feels_like=data["main"]["feels_like"]
-                    ),
-                    humidity=data["main"]["humidity"],
-                    wind_speed=data["wind"]["speed"] * 3.6,  # Conversion en km/h
-                    wind_direction=data["wind"].get("deg", 0),
-                    weather_description=data["weather"][0]["description"].capitalize(),
-                    source="openweathermap"
-                )
-                
+            with stage_timer("cache_get"):
+                cached_data = await cache.get(cache_key)
         except Exception as e:
-            print(f"Erreur OpenWeatherMap: {str(e)}")
+            logger.warning(f"Lecture impossible dans le cache pour {cache_key}: {str(e)}")
             return None
-    async def _get_weather_from_weatherapi(self, city: str) -> Optional[WeatherData]:
-        """Récupère les données météo depuis WeatherAPI.com"""
-        api_key = os.getenv("WEATHERAPI_KEY")
-        if not api_key:
-            raise ValueError("Clé API WeatherAPI manquante")
-        
+        if not cached_data:
+            return None
+        with stage_timer("deserialize"):
+            entry = CacheEntry.decode(cached_data)
+        local_cache.set(cache_key, entry, ttl=entry.remaining_ttl(), size=len(cached_data))
+        return entry
+
+    async def _read_entries(self, cache_keys: List[str]) -> Dict[str, CacheEntry]:
+        """Lit plusieurs entrées avec un seul MGET Redis et les recopie dans le cache L1"""
+        cache = await self._get_cache()
+        if cache is None:
+            return {}
         try:
-            url = "http://api.weatherapi.com/v1/current.json"
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    url,
-                    params={
-                        "key": api_key,
-                        "q": city,
-                        "aqi": "no",
-                        "lang": "fr"
-                    }
-                )
-                response.raise_for_status()
-                data = response.json()
-                
-                current = data["current"]
-                
-                return WeatherData(
-                    city=data["location"]["name"],
-                    temperature=Temperature(
-                        current=current["temp_c"],
-                        feels_like=current["feelslike_c"]
-                    ),
-                    humidity=current["humidity"],
-                    wind_speed=current["wind_kph"],
-                    wind_direction=current["wind_degree"],
-                    weather_description=current["condition"]["text"],
-                    source="weatherapi"
-                )
-                
+            with stage_timer("cache_get"):
+                values = await cache.mget(cache_keys)
         except Exception as e:
-            print(f"Erreur WeatherAPI: {str(e)}")
-            return None
+            logger.warning(f"Lecture groupée impossible dans le cache: {str(e)}")
+            return {}
+        entries = {}
+        for cache_key, cached_data in zip(cache_keys, values):
+            if cached_data:
+                with stage_timer("deserialize"):
+                    entry = CacheEntry.decode(cached_data)
+                local_cache.set(cache_key, entry, ttl=entry.remaining_ttl(), size=len(cached_data))
+                entries[cache_key] = entry
+        return entries
+
+    def _schedule_refresh(self, city: str, cache_key: str) -> None:
+        """Lance un rafraîchissement en arrière-plan, sauf s'il y en a déjà un pour la clé"""
+        if cache_key in self._singleflight:
+            return
+        task = asyncio.ensure_future(self._singleflight.do(
+            cache_key, lambda: self._refresh_cache(city, cache_key, background=True)
+        ))
+        self._background_tasks.add(task)
+        task.add_done_callback(self._on_background_done)
+
+    def _on_background_done(self, task: asyncio.Task) -> None:
+        self._background_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"Échec du rafraîchissement en arrière-plan: {str(task.exception())}")
 
-    async def get_current_weather(self, city: str) -> WeatherData:
-        """Récupère les données météo agrégées depuis toutes les sources disponibles"""
+    async def _refresh_cache(self, city: str, cache_key: str,
+                             background: bool = False) -> Optional[WeatherData]:
+        """Interroge les fournisseurs et met à jour le cache, sous verrou Redis si activé"""
+        cache = await self._get_cache() if self.distributed_lock else None
+        if cache is None:
+            return await self._fetch_and_store(city, cache_key)
+
+        lock = RedisLock(cache, f"lock:{cache_key}", self.lock_ttl_ms)
         try:
-            # Récupérer les données de toutes les sources en parallèle
-            tasks = [
-                self._get_weather_from_openweather(city),
-                self._get_weather_from_weatherapi(city),
-                self._get_weather_from_openmeteo(city)
-            ]
-            
-            # Exécuter toutes les tâches en parallèle
-            results = await asyncio.gather(*tasks, return_exceptions=True)
-            
-            # Filtrer les résultats valides (ceux qui ne sont pas des exceptions)
-            valid_results = [
-                result for result in results 
-                if isinstance(result, WeatherData) and result is not None
-            ]
-            
-            if not valid_results:
+            acquired = await lock.acquire()
+        except Exception as e:
+            logger.warning(f"Verrou Redis indisponible pour {cache_key}: {str(e)}")
+            return await self._fetch_and_store(city, cache_key)
+
+        if not acquired:
+            if background:
+                # Un autre worker rafraîchit déjà la clé, la valeur périmée reste servie
+                return None
+            # Un autre worker rafraîchit déjà la clé : on attend son résultat
+            cached = await self._wait_for_refresh(cache, cache_key)
+            if cached is not None:
+                return cached
+            return await self._fetch_and_store(city, cache_key)
+
+        try:
+            return await self._fetch_and_store(city, cache_key)
+        finally:
+            try:
+                await lock.release()
+            except Exception as e:
+                logger.warning(f"Libération du verrou impossible pour {cache_key}: {str(e)}")
+
+    async def _wait_for_refresh(self, cache, cache_key: str) -> Optional[WeatherData]:
+        """Attend que le worker détenteur du verrou écrive la clé (au plus la durée du verrou)"""
+        deadline = time.monotonic() + self.lock_ttl_ms / 1000
+        while time.monotonic() < deadline:
+            await asyncio.sleep(self.lock_poll_interval)
+            try:
+                cached_data = await cache.get(cache_key)
+            except Exception:
+                return None
+            if cached_data:
+                return self.entry_weather(CacheEntry.decode(cached_data))
+        return None
+
+    async def _fetch_and_store(self, city: str, cache_key: str) -> WeatherData:
+        """Interroge les fournisseurs puis écrit le résultat dans Redis et dans le cache L1
+
+        L'appel amont passe par le contrôle d'admission (503 si la file est saturée).
+        """
+        try:
+            async with self.admission.admit():
+                started = time.monotonic()
+                weather_data = await self.get_current_weather(city)
+        except HTTPException as e:
+            if e.status_code == status.HTTP_404_NOT_FOUND:
+                self._remember_not_found(cache_key, e.detail)
+            raise
+        await self._store(cache_key, weather_data, time.monotonic() - started)
+        return weather_data
+
+    async def _store(self, cache_key: str, weather_data: WeatherData, delta: float) -> None:
+        """Écrit une mesure fusionnée dans le cache L1 puis dans Redis (delta : durée du calcul)"""
+        try:
+            entry = CacheEntry(
+                data=weather_data.model_dump(mode="json"),
+                fetched_at=time.time(),
+                soft_ttl=self.cache_duration,
+                hard_ttl=self.cache_hard_ttl,
+                delta=delta,
+                value=weather_data,
+            )
+            with stage_timer("serialize"):
+                raw = entry.encode()
+        except Exception as e:
+            logger.warning(f"Sérialisation impossible pour {cache_key}: {str(e)}")
+            return
+        # L1 rempli quel que soit le sort de l'écriture Redis : pendant une panne de Redis,
+        # il continue d'absorber les requêtes répétées (son TTL court borne la fraîcheur)
+        local_cache.set(cache_key, entry, ttl=self.cache_hard_ttl, size=len(raw))
+        cache = await self._get_cache()
+        if cache is None:
+            return
+        try:
+            with stage_timer("cache_set"):
+                await cache.set(cache_key, raw, ex=self.cache_hard_ttl)
+        except Exception as e:
+            logger.warning(f"Écriture impossible dans le cache pour {cache_key}: {str(e)}")
+            return
+        await publish_invalidation(cache_key)
+        await self._index_sources(cache, cache_key, weather_data.sources)
+
+    async def _load_many(self, to_load: Dict[str, str], background: bool = False,
+                         concurrency: Optional[int] = None, jitter: float = 0.0) -> Dict[str, object]:
+        """Charge plusieurs villes absentes du cache (clé -> ville) avec une seule fusion vectorisée
+
+        Les mesures sont recueillies ville par ville (concurrence bornée,
+        contrôle d'admission), puis fusionnées en une matrice villes ×
+        fournisseurs et écrites dans le cache. Une clé déjà en cours de
+        chargement, ou verrouillée par un autre worker, rejoint ce chargement
+        via _load ; en arrière-plan (background), elle est cédée.
+        Retourne par clé les données, l'exception levée, ou None si cédée.
+        """
+        owned = {key: city for key, city in to_load.items() if key not in self._singleflight}
+        locks: Dict[str, RedisLock] = {}
+        if self.distributed_lock and owned:
+            locks, busy = await self._acquire_locks(list(owned))
+            for key in busy:
+                del owned[key]
+        batch = asyncio.ensure_future(self._observe_and_merge(owned, concurrency, jitter))
+
+        async def settle(key: str) -> Optional[WeatherData]:
+            outcome = (await batch)[key]
+            if isinstance(outcome, BaseException):
+                raise outcome
+            return outcome
+
+        async def join(key: str, city: str) -> Optional[WeatherData]:
+            if background:
+                return None
+            return await self._load(city, key)
+
+        keys = list(owned) + [key for key in to_load if key not in owned]
+        try:
+            outcomes = await asyncio.gather(
+                *(self._singleflight.do(key, partial(settle, key)) for key in owned),
+                *(join(key, to_load[key]) for key in keys[len(owned):]),
+                return_exceptions=True
+            )
+        finally:
+            await self._release_locks(locks)
+        return dict(zip(keys, outcomes))
+
+    async def _observe_and_merge(self, to_load: Dict[str, str], concurrency: Optional[int],
+                                 jitter: float) -> Dict[str, object]:
+        semaphore = asyncio.Semaphore(concurrency or self.batch_concurrency)
+
+        async def observe(cache_key: str, city: str) -> Tuple[List[WeatherData], float]:
+            if jitter > 0:
+                await asyncio.sleep(random.uniform(0, jitter))
+            async with semaphore:
+                self._check_not_found(cache_key)
+                try:
+                    async with self.admission.admit():
+                        started = time.monotonic()
+                        observations = await self._observe(city)
+                except HTTPException as e:
+                    if e.status_code == status.HTTP_404_NOT_FOUND:
+                        self._remember_not_found(cache_key, e.detail)
+                    raise
+                return observations, time.monotonic() - started
+
+        observed = await asyncio.gather(
+            *(observe(cache_key, city) for cache_key, city in to_load.items()),
+            return_exceptions=True
+        )
+        outcomes: Dict[str, object] = {}
+        rows: Dict[str, Tuple[List[WeatherData], float]] = {}
+        for cache_key, result in zip(to_load, observed):
+            if isinstance(result, BaseException):
+                outcomes[cache_key] = result
+            else:
+                rows[cache_key] = result
+        if not rows:
+            return outcomes
+        with stage_timer("merge"):
+            merged = self._merge_weather_rows([observations for observations, _ in rows.values()])
+        outcomes.update(zip(rows, merged))
+        await asyncio.gather(*(
+            self._store(cache_key, outcomes[cache_key], delta) for cache_key, (_, delta) in rows.items()
+        ))
+        return outcomes
+
+    async def _acquire_locks(self, cache_keys: List[str]) -> Tuple[Dict[str, RedisLock], List[str]]:
+        """Prend les verrous Redis de plusieurs clés : (verrous obtenus, clés verrouillées ailleurs)
+
+        Sans Redis, les clés sont chargées sans verrou, comme dans _refresh_cache.
+        """
+        cache = await self._get_cache()
+        if cache is None:
+            return {}, []
+        locks = {key: RedisLock(cache, f"lock:{key}", self.lock_ttl_ms) for key in cache_keys}
+        acquired = await asyncio.gather(*(lock.acquire() for lock in locks.values()), return_exceptions=True)
+        held: Dict[str, RedisLock] = {}
+        busy: List[str] = []
+        for (key, lock), result in zip(locks.items(), acquired):
+            if isinstance(result, Exception):
+                logger.warning(f"Verrou Redis indisponible pour {key}: {str(result)}")
+            elif result:
+                held[key] = lock
+            else:
+                busy.append(key)
+        return held, busy
+
+    async def _release_locks(self, locks: Dict[str, RedisLock]) -> None:
+        released = await asyncio.gather(*(lock.release() for lock in locks.values()), return_exceptions=True)
+        for key, result in zip(locks, released):
+            if isinstance(result, Exception):
+                logger.warning(f"Libération du verrou impossible pour {key}: {str(result)}")
+
+    async def _index_sources(self, cache, cache_key: str, sources: List[str]) -> None:
+        """Référence la clé dans l'index de chaque fournisseur contributeur (invalidation par fournisseur)"""
+        if not sources:
+            return
+        try:
+            async with cache.pipeline(transaction=False) as pipe:
+                for source in sources:
+                    pipe.sadd(provider_index_key(source), cache_key)
+                    pipe.expire(provider_index_key(source), self.cache_hard_ttl)
+                await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Indexation par fournisseur impossible pour {cache_key}: {str(e)}")
+
+    async def clear_cache(self) -> None:
+        """Vide les entrées météo du cache Redis et des caches L1 des workers
+
+        Les autres espaces de noms (clés utilisateur, géocodage, quotas) sont conservés.
+        """
+        job = await self.invalidate("weather")
+        if job.status == "failed":
+            raise RuntimeError(f"Échec du vidage du cache: {job.error}")
+
+    async def invalidate(self, mode: str, city: Optional[str] = None, provider: Optional[str] = None,
+                         pattern: Optional[str] = None, namespace: str = "weather",
+                         wait: bool = True) -> InvalidationJob:
+        """Invalide une partie du cache sans FLUSHDB (SCAN + UNLINK par lots)
+
+        Modes : "weather" (toutes les entrées météo), "city" (une ville),
+        "provider" (entrées auxquelles un fournisseur a contribué) et
+        "pattern" (motif glob dans l'espace de noms weather ou cache).
+        Si wait est faux, l'invalidation tourne en arrière-plan et sa
+        progression se consulte via l'identifiant du job retourné.
+        """
+        if mode == "weather":
+            target = f"{NAMESPACES['weather']}*"
+            work = partial(invalidator.unlink_pattern, pattern=target)
+        elif mode == "city":
+            if not city:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Le mode city exige une ville")
+            target = self._cache_key(city)
+            work = partial(invalidator.unlink_keys, keys=[target])
+        elif mode == "provider":
+            if not provider:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Le mode provider exige un fournisseur")
+            target = provider_index_key(provider)
+
+            async def work(job: InvalidationJob) -> None:
+                redis = await get_redis()
+                await invalidator.unlink_keys(job, await redis.smembers(target))
+                await redis.unlink(target)
+        elif mode == "pattern":
+            if not pattern or namespace not in NAMESPACES:
                 raise HTTPException(
-                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-                    detail="Aucune source de données météo n'est disponible"
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Le mode pattern exige un motif et un espace de noms parmi: {', '.join(NAMESPACES)}"
                 )
-                
+            target = f"{NAMESPACES[namespace]}{pattern}"
+            work = partial(invalidator.unlink_pattern, pattern=target)
+        else:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Mode d'invalidation inconnu: {mode}")
+
+        if target.startswith(NAMESPACES["weather"]):
+            # Les 404 mémorisées suivent leurs clés météo (les autres workers attendent le TTL)
+            self._not_found.delete_matching(target)
+        return await invalidator.run(InvalidationJob(mode=mode, target=target), work, wait=wait)
+    
+    async def get_current_weather(self, city: str, strategy: Optional[str] = None) -> WeatherData:
+        """Récupère les données météo agrégées depuis les sources disponibles
+
+        Les fournisseurs sont choisis dans le registre selon la stratégie :
+        "all" les interroge tous, "cheapest" et "fastest" en interrogent
+        WEATHER_PROVIDER_FANOUT à la fois, dans l'ordre, et ne passent aux
+        suivants que si aucun n'a répondu. Chaque vague est attendue dans le
+        budget de latence ; les fournisseurs dont le disjoncteur est ouvert
+        ou dont le débit/quota est épuisé ne sont pas appelés, pas plus que
+        ceux marqués indisponibles. Une ville connue comme introuvable par le
+        géocodage donne une 404 sans appel amont.
+        """
+        try:
+            valid_results = await self._observe(city, strategy)
             # Fusionner les résultats
-            return self._merge_weather_data(valid_results)
-            
+            with stage_timer("merge"):
+                return self._merge_weather_data(valid_results)
+
+        except HTTPException:
+            raise
         except Exception as e:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Erreur lors de la récupération des données météo: {str(e)}"
             )
 
+    async def _observe(self, city: str, strategy: Optional[str] = None) -> List[WeatherData]:
+        """Mesures valides des fournisseurs pour une ville, avant fusion (404 ou 503 si aucune)"""
+        if geocoder.known_missing(city):
+            NEGATIVE_CACHE_HITS.labels(kind="geocode").inc()
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Ville non trouvée: {city}"
+            )
+        strategy = strategy or self.provider_strategy
+        candidates = self.registry.select(strategy)
+        fanout = len(candidates) if strategy == "all" else max(1, self.provider_fanout)
+        deadline = asyncio.get_running_loop().time() + self.timeout
+
+        valid_results: List[WeatherData] = []
+        while candidates and not valid_results:
+            wave = []
+            while candidates and len(wave) < fanout:
+                provider = candidates.pop(0)
+                if provider.is_unavailable():
+                    # Cache négatif : clé absente ou refusée lors d'un appel récent
+                    NEGATIVE_CACHE_HITS.labels(kind="provider").inc()
+                    PROVIDER_REQUESTS.labels(provider=provider.name, outcome="unavailable").inc()
+                    continue
+                if not provider.breaker.allow_request():
+                    PROVIDER_REQUESTS.labels(provider=provider.name, outcome="skipped").inc()
+                    continue
+                if not await provider.rate_limiter.acquire():
+                    # Débit ou quota épuisé : on passe au fournisseur suivant sans échec
+                    provider.breaker.release()
+                    PROVIDER_REQUESTS.labels(provider=provider.name, outcome="rate_limited").inc()
+                    continue
+                wave.append(provider)
+            if not wave:
+                break
+            tasks = {asyncio.ensure_future(self._call_provider(provider, city)) for provider in wave}
+            valid_results = await self._gather_within_budget(tasks, deadline)
+
+        if not valid_results and geocoder.known_missing(city):
+            # Échec des fournisseurs dû à une ville inconnue, pas à une panne
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Ville non trouvée: {city}"
+            )
+        if not valid_results:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Aucune source de données météo n'est disponible"
+            )
+        return valid_results
+
+    async def _gather_within_budget(self, tasks: set, deadline: float) -> List[WeatherData]:
+        """Attend les fournisseurs dans le budget de latence, puis annule les retardataires
+
+        Si aucun n'a répondu dans le budget, attend le premier résultat valide
+        jusqu'à l'échéance globale.
+        """
+        loop = asyncio.get_running_loop()
+
+        def collect(done) -> List[WeatherData]:
+            return [
+                task.result() for task in done
+                if not task.cancelled() and task.exception() is None
+                and isinstance(task.result(), WeatherData)
+            ]
+
+        budget = max(0.0, min(self.latency_budget, deadline - loop.time()))
+        done, pending = await asyncio.wait(tasks, timeout=budget)
+        valid_results = collect(done)
+        while not valid_results and pending:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            done, pending = await asyncio.wait(
+                pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED
+            )
+            valid_results = collect(done)
+
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.wait(pending)
+        return valid_results
+
+    async def _call_provider(self, provider: WeatherProvider, city: str) -> Optional[WeatherData]:
+        """Appelle un fournisseur en mesurant sa latence et en alimentant son disjoncteur"""
+        started = time.monotonic()
+        outcome = "failure"
+        try:
+            result = await provider.fetch(city)
+            if isinstance(result, WeatherData):
+                outcome = "success"
+            elif geocoder.known_missing(city):
+                # Ville inconnue : le fournisseur n'est pas en cause
+                outcome = "not_found"
+            return result
+        except CityNotFound as e:
+            # Réponse explicite du fournisseur : cache négatif partagé avec le géocodage
+            outcome = "not_found"
+            logger.info(f"{provider.name}: {str(e)}")
+            await geocoder.remember_not_found(city)
+            return None
+        except ProviderUnavailable as e:
+            outcome = "unavailable"
+            provider.mark_unavailable(str(e))
+            NEGATIVE_CACHE_STORES.labels(kind="provider").inc()
+            logger.warning(f"{provider.name} indisponible pendant {provider.unavailable_ttl:.0f} s: {str(e)}")
+            return None
+        except asyncio.CancelledError:
+            # Hors budget de latence : compte comme un dépassement de délai
+            outcome = "timeout"
+            raise
+        except Exception as e:
+            logger.warning(f"Erreur {provider.name}: {str(e)}")
+            return None
+        finally:
+            elapsed = time.monotonic() - started
+            provider.record_latency(elapsed)
+            PROVIDER_LATENCY.labels(provider=provider.name).observe(elapsed)
+            STAGE_LATENCY.labels(stage="provider", provider=provider.name).observe(elapsed)
+            PROVIDER_REQUESTS.labels(provider=provider.name, outcome=outcome).inc()
+            if outcome == "success":
+                provider.breaker.record_success()
+            elif outcome in ("unavailable", "not_found"):
+                provider.breaker.release()
+            else:
+                provider.breaker.record_failure()
 
     async def test_apis(self):
         """Teste la connexion aux différentes APIs"""
         print("Test des APIs en cours...")
-        
-        # Test OpenWeatherMap
-        try:
-            print("\nTest OpenWeatherMap...")
-            ow_data = await self._get_weather_from_openweather("Paris")
-            print(f"✓ OpenWeatherMap: {ow_data.temperature.current}°C")
-        except Exception as e:
-            print(f"✗ OpenWeatherMap: {str(e)}")
-        
-        # Test WeatherAPI
-        try:
-            print("\nTest WeatherAPI...")
-            wa_data = await self._get_weather_from_weatherapi("Paris")
-            print(f"✓ WeatherAPI: {wa_data.temperature.current}°C")
-        except Exception as e:
-            print(f"✗ WeatherAPI: {str(e)}")
-        
-        # Test OpenMeteo
-        try:
-            print("\nTest OpenMeteo...")
-            om_data = await self._get_weather_from_openmeteo("Paris")
-            print(f"✓ OpenMeteo: {om_data.temperature.current}°C")
-        except Exception as e:
-            print(f"✗ OpenMeteo: {str(e)}")
+
+        for provider in self.registry:
+            try:
+                print(f"\nTest {provider.name}...")
+                data = await provider.fetch("Paris")
+                print(f"✓ {provider.name}: {data.temperature.current}°C")
+            except Exception as e:
+                print(f"✗ {provider.name}: {str(e)}")
     
     def _merge_weather_data(self, weather_data_list: List[WeatherData]) -> WeatherData:
-        """Fusionne les données météo de différentes sources"""
+        """Fusionne les données météo de différentes sources, pondérées par le poids des fournisseurs"""
         if not weather_data_list:
             raise HTTPException(
                 status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
                 detail="Aucune donnée météo disponible"
             )
+        return merge_weather(weather_data_list, [self._provider_weight(d.source) for d in weather_data_list])
 
-        # Calcul des moyennes
-        avg_temp = sum(d.temperature.current for d in weather_data_list) / len(weather_data_list)
-        avg_feels_like = sum(d.temperature.feels_like for d in weather_data_list) / len(weather_data_list)
-        avg_humidity = sum(d.humidity for d in weather_data_list) / len(weather_data_list)
-        avg_wind_speed = sum(d.wind_speed for d in weather_data_list) / len(weather_data_list)
-        avg_wind_direction = sum(d.wind_direction for d in weather_data_list) / len(weather_data_list)
-
-        # On garde la description de la première source (ou on pourrait en choisir une autre logique)
-        description = weather_data_list[0].weather_description
-
-        return WeatherData(
-            city=weather_data_list[0].city,
-            temperature=Temperature(
-                current=round(avg_temp, 1),
-                feels_like=round(avg_feels_like, 1)
-            ),
-            humidity=round(avg_humidity, 1),
-            wind_speed=round(avg_wind_speed, 1),
-            wind_direction=round(avg_wind_direction),
-            weather_description=description,
-            source="aggregated",
-            timestamp=datetime.utcnow()
-        )
-    
+    def _merge_weather_rows(self, rows: List[List[WeatherData]]) -> List[WeatherData]:
+        """Fusionne les mesures de plusieurs villes en un seul appel vectorisé
+
+        Colonnes de la matrice : les fournisseurs du registre, puis toute autre source rencontrée.
+        """
+        names = [provider.name for provider in self.registry]
+        for row in rows:
+            names.extend(data.source for data in row if data.source not in names)
+        column = {name: j for j, name in enumerate(names)}
+        matrix = []
+        for row in rows:
+            line: List[Optional[WeatherData]] = [None] * len(names)
+            for data in row:
+                line[column[data.source]] = data
+            matrix.append(line)
+        return merge_observations(matrix, [self._provider_weight(name) for name in names])
+
+    def _provider_weight(self, name: str) -> float:
+        try:
+            return self.registry.get(name).weight
+        except KeyError:
+            return 1.0
@@ -0,0 +1,246 @@
+# src/services/weather_stream.py
+import asyncio
+import hashlib
+import logging
+import os
+import random
+from typing import Dict, Iterable, Optional, Set
+
+from ..cache.codec import json_bytes
+from ..cache.singleflight import RedisLock
+from ..config.redis import get_redis
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_PREFIX = "weather-updates:"
+
+
+def _channel(key: str) -> str:
+    return f"{CHANNEL_PREFIX}{key}"
+
+
+def _fingerprint(observation: dict) -> str:
+    """Empreinte d'une observation, horodatage exclu : deux mesures identiques ne sont pas rediffusées"""
+    content = {k: v for k, v in observation.items() if k != "timestamp"}
+    return hashlib.blake2b(json_bytes(content), digest_size=16).hexdigest()
+
+
+class WeatherStream:
+    """Diffusion des changements d'observation aux abonnés (SSE, WebSocket).
+
+    Chaque ville suivie a une boucle de rafraîchissement ; à chaque tour, un
+    seul worker (verrou Redis) relit la ville à travers le cache et publie sur
+    le canal Redis de la ville si l'observation a changé. Chaque worker
+    relaie les messages du canal à ses abonnés locaux. Sans Redis, la
+    diffusion reste locale au worker.
+    """
+
+    def __init__(self, service):
+        self.service = service
+        self.interval = float(os.getenv("WEATHER_STREAM_INTERVAL", "30"))
+        self.queue_size = int(os.getenv("WEATHER_STREAM_QUEUE", "16"))
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self._queue_keys: Dict[asyncio.Queue, Set[str]] = {}  # villes suivies par abonné
+        self._cities: Dict[str, str] = {}
+        self._loops: Dict[str, asyncio.Task] = {}
+        self._fingerprints: Dict[str, str] = {}  # repli local sans Redis
+        self._pubsub = None
+        self._reader: Optional[asyncio.Task] = None
+        self._tasks = set()
+
+    async def subscribe(self, cities: Iterable[str]) -> asyncio.Queue:
+        """Abonne une file aux villes ; elle reçoit l'observation courante puis chaque changement"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        await self.add(queue, cities)
+        return queue
+
+    async def add(self, queue: asyncio.Queue, cities: Iterable[str], max_cities: Optional[int] = None) -> bool:
+        """Abonne la file à des villes supplémentaires ; refuse (False) si le total dépasserait max_cities"""
+        followed = self._queue_keys.setdefault(queue, set())
+        new: Dict[str, str] = {}
+        for city in cities:
+            key = self.service._cache_key(city)
+            if key not in followed:
+                new.setdefault(key, city)
+        if max_cities is not None and len(followed) + len(new) > max_cities:
+            if not followed:
+                del self._queue_keys[queue]
+            return False
+        for key, city in new.items():
+            followed.add(key)
+            self._subscribers.setdefault(key, set()).add(queue)
+            self._cities.setdefault(key, city)
+            if key not in self._loops:
+                await self._listen(key)
+                self._loops[key] = asyncio.ensure_future(self._refresh_loop(key))
+            task = asyncio.ensure_future(self._send_current(queue, key))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        return True
+
+    def send(self, queue: asyncio.Queue, payload: dict) -> None:
+        """Transmet à un abonné un message hors observation (erreur, refus)"""
+        self._put(queue, json_bytes(payload))
+
+    def count(self, queue: asyncio.Queue) -> int:
+        """Nombre de villes suivies par un abonné"""
+        return len(self._queue_keys.get(queue, ()))
+
+    async def remove(self, queue: asyncio.Queue, cities: Optional[Iterable[str]] = None) -> None:
+        """Désabonne une file de certaines villes (de toutes par défaut)"""
+        followed = self._queue_keys.get(queue, set())
+        keys = [self.service._cache_key(city) for city in cities] if cities is not None else list(followed)
+        for key in keys:
+            followed.discard(key)
+            subscribers = self._subscribers.get(key)
+            if not subscribers or queue not in subscribers:
+                continue
+            subscribers.discard(queue)
+            if not subscribers:
+                # Dernier abonné local : arrêt de la boucle et du relais de la ville
+                del self._subscribers[key]
+                self._cities.pop(key, None)
+                self._fingerprints.pop(key, None)
+                loop = self._loops.pop(key, None)
+                if loop is not None:
+                    loop.cancel()
+                await self._unlisten(key)
+        if not followed:
+            self._queue_keys.pop(queue, None)
+
+    async def close(self) -> None:
+        for task in [*self._loops.values(), *self._tasks, self._reader]:
+            if task is not None:
+                task.cancel()
+        self._loops.clear()
+        self._subscribers.clear()
+        self._queue_keys.clear()
+        if self._pubsub is not None:
+            try:
+                await self._pubsub.aclose()
+            except Exception:
+                pass
+            self._pubsub = None
+
+    async def _refresh_loop(self, key: str) -> None:
+        # Le premier tour attend un intervalle : l'abonné a déjà reçu l'observation courante
+        while True:
+            await asyncio.sleep(self.interval + random.uniform(0, self.interval / 10))
+            try:
+                await self._tick(key)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Échec du rafraîchissement diffusé pour {key}: {str(e)}")
+
+    async def _tick(self, key: str) -> bool:
+        """Un tour de rafraîchissement ; retourne True si un changement a été diffusé"""
+        try:
+            redis = await get_redis()
+            if not await RedisLock(redis, f"lock:stream:{key}", int(self.interval * 1000)).acquire():
+                # Un autre worker rafraîchit la ville pendant ce tour
+                return False
+        except Exception as e:
+            logger.warning(f"Diffusion locale pour {key}, Redis indisponible: {str(e)}")
+            redis = None
+
+        weather_data, _ = await self.service.get_cached_weather(self._cities[key])
+        observation = weather_data.model_dump(mode="json")
+        fingerprint = _fingerprint(observation)
+        message = json_bytes({"city": self._cities[key], "data": observation})
+
+        if redis is not None and self._relaying:
+            try:
+                previous = await redis.set(f"stream:last:{key}", fingerprint, get=True, ex=int(self.interval * 10))
+                if previous != fingerprint:
+                    await redis.publish(_channel(key), message)
+                    return True
+                return False
+            except Exception as e:
+                logger.warning(f"Publication impossible pour {key}: {str(e)}")
+
+        if self._fingerprints.get(key) == fingerprint:
+            return False
+        self._fingerprints[key] = fingerprint
+        self._deliver(key, message)
+        return True
+
+    async def _send_current(self, queue: asyncio.Queue, key: str) -> None:
+        """Envoie l'observation courante à un nouvel abonné"""
+        try:
+            weather_data, _ = await self.service.get_cached_weather(self._cities[key])
+        except Exception as e:
+            logger.warning(f"Observation initiale indisponible pour {key}: {str(e)}")
+            return
+        observation = weather_data.model_dump(mode="json")
+        fingerprint = _fingerprint(observation)
+        self._fingerprints.setdefault(key, fingerprint)
+        self._put(queue, json_bytes({"city": self._cities.get(key, key), "data": observation}))
+        if self._relaying:
+            # Empreinte de référence si aucune n'est connue : le premier tour ne republie
+            # pas l'observation que l'abonné vient de recevoir
+            try:
+                redis = await get_redis()
+                await redis.set(f"stream:last:{key}", fingerprint, nx=True, ex=int(self.interval * 10))
+            except Exception as e:
+                logger.warning(f"Empreinte initiale non enregistrée pour {key}: {str(e)}")
+
+    @property
+    def _relaying(self) -> bool:
+        """Vrai si les messages du canal Redis sont relayés aux abonnés de ce worker"""
+        return self._reader is not None and not self._reader.done()
+
+    def _deliver(self, key: str, message: bytes) -> None:
+        for queue in list(self._subscribers.get(key, ())):
+            self._put(queue, message)
+
+    @staticmethod
+    def _put(queue: asyncio.Queue, message: bytes) -> None:
+        if queue.full():
+            # Abonné lent : on abandonne le plus ancien message, seul le dernier état compte
+            queue.get_nowait()
+        queue.put_nowait(message)
+
+    async def _listen(self, key: str) -> None:
+        try:
+            if self._pubsub is None:
+                self._pubsub = (await get_redis()).pubsub()
+            await self._pubsub.subscribe(_channel(key))
+        except Exception as e:
+            logger.warning(f"Abonnement au canal de {key} impossible, diffusion locale: {str(e)}")
+            return
+        if self._reader is None or self._reader.done():
+            self._reader = asyncio.ensure_future(self._read())
+
+    async def _unlisten(self, key: str) -> None:
+        if self._pubsub is None:
+            return
+        try:
+            await self._pubsub.unsubscribe(_channel(key))
+        except Exception as e:
+            logger.warning(f"Désabonnement du canal de {key} impossible: {str(e)}")
+
+    async def _read(self) -> None:
+        """Relaie les messages des canaux Redis vers les abonnés locaux"""
+        try:
+            async for message in self._pubsub.listen():
+                if message.get("type") != "message":
+                    continue
+                channel = message["channel"]
+                data = message["data"]
+                self._deliver(channel[len(CHANNEL_PREFIX):], data.encode() if isinstance(data, str) else data)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Relais des mises à jour météo interrompu: {str(e)}")
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "cities": len(self._subscribers),
+            "subscribers": len({q for queues in self._subscribers.values() for q in queues}),
+        }
+
+
+def format_sse(message: bytes, event: str = "weather") -> bytes:
+    """Formate un message au format Server-Sent Events"""
+    return b"event: " + event.encode() + b"\ndata: " + message + b"\n\n"
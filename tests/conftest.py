@@ -3,6 +3,7 @@ import pytest_asyncio
 from fastapi.testclient import TestClient
 from httpx import AsyncClient
 from src.main import app
+from src.services.weather_data import WeatherData
 
 @pytest.fixture
 def client():
@@ -23,7 +24,33 @@ async def cleanup_redis():
     try:
         from src.config.redis import get_redis
         redis = await get_redis()
-        await redis.flushdb()  # Vide la DB de test
-        await redis.close()
+        await redis.flushdb()  # Vide la DB de test (le client partagé reste ouvert)
     except Exception:
-        pass  # Ignore les erreurs de cleanup
\ No newline at end of file
+        pass  # Ignore les erreurs de cleanup
+
+
+@pytest.fixture(autouse=True)
+def clear_local_cache():
+    """Vide le cache L1 du processus entre les tests"""
+    from src.cache.local_cache import local_cache
+    local_cache.clear()
+    yield
+    local_cache.clear()
+
+
+@pytest.fixture
+def make_weather():
+    """Fabrique d'observations WeatherData ; chaque champ peut être surchargé"""
+    def factory(temperature=20.0, *, city="Paris", feels_like=None, humidity=50.0, wind_speed=10.0,
+                wind_direction=180.0, description="Ciel dégagé", source="aggregated"):
+        return WeatherData(
+            city=city,
+            temperature={"current": temperature,
+                         "feels_like": temperature - 1 if feels_like is None else feels_like},
+            humidity=humidity,
+            wind_speed=wind_speed,
+            wind_direction=wind_direction,
+            weather_description=description,
+            source=source
+        )
+    return factory
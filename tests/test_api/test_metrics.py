@@ -0,0 +1,85 @@
+from unittest.mock import AsyncMock, patch
+from fastapi import status
+from prometheus_client import REGISTRY
+from src.services.weather_data import WeatherData
+
+mock_weather_data = {
+    "city": "Paris",
+    "temperature": {"current": 20.0, "feels_like": 18.0},
+    "humidity": 60.0,
+    "wind_speed": 10.0,
+    "wind_direction": 180,
+    "weather_description": "partiellement nuageux",
+    "source": "test",
+    "timestamp": "2025-01-01T00:00:00"
+}
+
+def _count(endpoint, http_status="200"):
+    return REGISTRY.get_sample_value(
+        "http_requests_total", {"method": "GET", "endpoint": endpoint, "http_status": http_status}
+    ) or 0
+
+def test_requests_labelled_by_route_template(client):
+    before = _count("/api/weather/{city}")
+    with patch('src.controllers.weather_controller.WeatherService.get_current_weather', new_callable=AsyncMock,
+               return_value=WeatherData.model_validate(mock_weather_data)):
+        for city in ("Paris", "Lyon", "Nantes"):
+            assert client.get(f"/api/weather/{city}").status_code == status.HTTP_200_OK
+
+    assert _count("/api/weather/{city}") == before + 3
+    assert _count("/api/weather/Paris") == 0
+    client.get("/inconnu")
+    assert _count("unmatched", "404") >= 1
+
+def test_metrics_endpoint_exposes_stage_histograms(client):
+    with patch('src.controllers.weather_controller.WeatherService.get_current_weather', new_callable=AsyncMock,
+               return_value=WeatherData.model_validate(mock_weather_data)):
+        client.get("/api/weather/Paris")
+
+    response = client.get("/metrics")
+    assert response.status_code == status.HTTP_200_OK
+    assert 'weather_stage_duration_seconds_count{provider="",stage="serialize"}' in response.text
+    assert 'endpoint="/api/weather/{city}"' in response.text
+
+def test_multiprocess_metrics_aggregate_workers(tmp_path):
+    import os
+    import subprocess
+    import sys
+
+    env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": str(tmp_path)}
+    worker = (
+        "import sys\n"
+        "from src.monitoring import REQUEST_COUNT, PROVIDER_CIRCUIT_STATE\n"
+        "REQUEST_COUNT.labels(method='GET', endpoint='/api/weather/{city}', http_status='200').inc()\n"
+        "PROVIDER_CIRCUIT_STATE.labels(provider='openmeteo').set(int(sys.argv[1]))\n"
+        "print(__import__('os').getpid())\n"
+    )
+    pids = [
+        subprocess.run([sys.executable, "-c", worker, str(state)], env=env,
+                       capture_output=True, text=True, check=True).stdout.strip()
+        for state in (0, 2)
+    ]
+    scrape = (
+        "import sys\n"
+        "from prometheus_client import generate_latest\n"
+        "import src.cache.local_cache\n"
+        "from src.monitoring import mark_worker_dead, metrics_registry\n"
+        "for pid in sys.argv[1:]:\n"
+        "    mark_worker_dead(int(pid))\n"
+        "print(generate_latest(metrics_registry()).decode())\n"
+    )
+
+    def metrics(*dead):
+        return subprocess.run([sys.executable, "-c", scrape, *dead], env=env,
+                              capture_output=True, text=True, check=True).stdout
+
+    output = metrics()
+    assert 'http_requests_total{endpoint="/api/weather/{city}",http_status="200",method="GET"} 2.0' in output
+    assert 'weather_provider_circuit_state{provider="openmeteo"} 2.0' in output
+    # Cache L1 du worker qui répond, étiqueté par pid
+    assert 'l1_cache_entries{worker=' in output
+
+    output = metrics(pids[1])
+    # Les compteurs d'un worker arrêté restent, ses jauges "live" disparaissent
+    assert 'http_requests_total{endpoint="/api/weather/{city}",http_status="200",method="GET"} 2.0' in output
+    assert 'weather_provider_circuit_state{provider="openmeteo"} 0.0' in output
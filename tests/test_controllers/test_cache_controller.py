@@ -0,0 +1,94 @@
+# tests/test_controllers/test_cache_controller.py
+import json
+import logging
+from unittest.mock import AsyncMock, MagicMock, patch
+from fastapi import FastAPI, status
+from fastapi.testclient import TestClient
+from src.controllers.cache_controller import router
+from src.cache.local_cache import local_cache
+from src.monitoring import SamplingFilter
+
+app = FastAPI()
+app.include_router(router, prefix="/api")
+
+client = TestClient(app)
+
+def _redis(results=()):
+    """Client Redis simulé avec un pipeline asynchrone"""
+    pipe = MagicMock()
+    pipe.execute = AsyncMock(return_value=list(results))
+    pipe.__aenter__ = AsyncMock(return_value=pipe)
+    pipe.__aexit__ = AsyncMock(return_value=False)
+    redis = MagicMock()
+    redis.pipeline.return_value = pipe
+    redis.mget = AsyncMock()
+    return redis, pipe
+
+def test_bulk_get_uses_l1_then_one_mget():
+    local_cache.set("cache:a", {"v": 1})
+    redis, pipe = _redis([[json.dumps({"v": 2}), None], -1, -2])
+
+    with patch("src.controllers.cache_controller.get_redis", new_callable=AsyncMock, return_value=redis):
+        response = client.post("/api/cache/bulk/get", json={"keys": ["a", "b", "c"]})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"results": {"a": {"v": 1}, "b": {"v": 2}}, "missing": ["c"]}
+    pipe.mget.assert_called_once_with(["cache:b", "cache:c"])
+    pipe.execute.assert_awaited_once()
+
+def test_l1_copy_expires_with_the_redis_key():
+    import time
+    redis, pipe = _redis([[json.dumps({"v": 1}), json.dumps({"v": 2})], 5000, -1])
+
+    with patch("src.controllers.cache_controller.get_redis", new_callable=AsyncMock, return_value=redis):
+        client.post("/api/cache/bulk/get", json={"keys": ["short", "forever"]})
+
+    now = time.monotonic()
+    # TTL de 5 s écrit par bulk/set sur un autre worker : la copie L1 n'y survit pas
+    assert local_cache._data["cache:short"][1] - now <= 5
+    assert local_cache._data["cache:forever"][1] - now > 5
+
+    redis, pipe = _redis([json.dumps({"v": 3}), 2000])
+    with patch("src.controllers.cache_controller.get_redis", new_callable=AsyncMock, return_value=redis):
+        assert client.get("/api/cache/single").json() == {"v": 3}
+    pipe.pttl.assert_called_once_with("cache:single")
+    assert local_cache._data["cache:single"][1] - time.monotonic() <= 2
+
+def test_bulk_set_pipelines_per_key_ttls():
+    redis, pipe = _redis([True, True])
+
+    with patch("src.controllers.cache_controller.get_redis", new_callable=AsyncMock, return_value=redis):
+        response = client.post("/api/cache/bulk/set", json={"items": [
+            {"key": "a", "value": {"v": 1}, "ttl": 60},
+            {"key": "b", "value": {"v": 2}},
+        ]})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"status": "success", "keys": ["a", "b"]}
+    pipe.set.assert_any_call("cache:a", json.dumps({"v": 1}), ex=60)
+    pipe.set.assert_any_call("cache:b", json.dumps({"v": 2}), ex=None)
+    pipe.execute.assert_awaited_once()
+    assert local_cache.get("cache:b") == {"v": 2}
+
+def test_bulk_delete_reports_each_key():
+    local_cache.set("cache:a", {"v": 1})
+    redis, pipe = _redis([1, 0])
+
+    with patch("src.controllers.cache_controller.get_redis", new_callable=AsyncMock, return_value=redis):
+        response = client.post("/api/cache/bulk/delete", json={"keys": ["a", "b"]})
+
+    assert response.json() == {"deleted": {"a": True, "b": False}}
+    assert pipe.unlink.call_count == 2
+    assert local_cache.get("cache:a") is None
+
+def test_bulk_endpoints_validate_payload():
+    assert client.post("/api/cache/bulk/get", json={"keys": []}).status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    response = client.post("/api/cache/bulk/set", json={"items": [{"key": "a", "value": {}, "ttl": 0}]})
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+def test_sampling_filter_keeps_warnings():
+    sampler = SamplingFilter(rate=0.0)
+    info = logging.LogRecord("x", logging.INFO, __file__, 1, "info", None, None)
+    warning = logging.LogRecord("x", logging.WARNING, __file__, 1, "warning", None, None)
+    assert sampler.filter(info) is False
+    assert sampler.filter(warning) is True
@@ -40,6 +40,7 @@ async def test_get_weather_success(mock_weather_data):
         assert data["city"] == "Paris"
         assert data["temperature"]["current"] == 20.0
         assert data["humidity"] == 60.0
+        assert response.headers["X-Cache"] == "MISS"
 
 @pytest.mark.asyncio
 async def test_get_weather_not_found():
@@ -68,4 +69,165 @@ async def test_get_weather_server_error():
         
         # Vérifier la réponse d'erreur
         assert response.status_code == status.HTTP_500_INTERNAL_SERVER_ERROR
-        assert "Impossible de récupérer les données météo" in response.json()["detail"]
\ No newline at end of file
+        assert "Impossible de récupérer les données météo" in response.json()["detail"]
+
+def test_get_weather_overloaded_returns_retry_after():
+    with patch.object(WeatherService, 'get_current_weather', new_callable=AsyncMock,
+                      side_effect=HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                                                detail="Service surchargé, réessayez plus tard",
+                                                headers={"Retry-After": "2"})):
+        response = client.get("/api/weather/Paris")
+
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert response.headers["Retry-After"] == "2"
+
+def test_get_weather_batch(mock_weather_data):
+    from src.services.weather_data import WeatherData
+
+    with patch.object(WeatherService, '_observe', new_callable=AsyncMock) as mock_observe:
+        async def observe(city):
+            if city == "Atlantis":
+                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Ville non trouvée")
+            return [WeatherData.model_validate(mock_weather_data)]
+        mock_observe.side_effect = observe
+
+        response = client.post("/api/weather/batch", json={"cities": ["Paris", "Atlantis"]})
+
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert data["results"]["Paris"]["city"] == "Paris"
+        assert data["errors"]["Atlantis"] == {"status_code": 404, "detail": "Ville non trouvée"}
+
+def test_get_weather_batch_rejects_empty_list():
+    response = client.post("/api/weather/batch", json={"cities": []})
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+def test_get_weather_fast_response_serves_cached_bytes(mock_weather_data):
+    import time
+    from src.cache.entry import CacheEntry
+    from src.cache.local_cache import local_cache
+    from src.services.weather_data import WeatherData
+
+    weather = WeatherData.model_validate(mock_weather_data)
+    entry = CacheEntry(data=weather.model_dump(mode="json"), fetched_at=time.time(),
+                       soft_ttl=600, hard_ttl=1800)
+    local_cache.set("weather:paris", entry)
+
+    standard = client.get("/api/weather/Paris")
+    with patch("src.controllers.weather_controller.fast_response", True):
+        fast = client.get("/api/weather/Paris")
+        body = entry.body
+        again = client.get("/api/weather/Paris")
+
+    assert fast.status_code == status.HTTP_200_OK
+    assert fast.headers["X-Cache"] == "HIT"
+    assert fast.headers["content-type"] == "application/json"
+    assert fast.json() == standard.json()
+    # Corps sérialisé une seule fois puis resservi tel quel
+    assert body is not None and again.content == body
+
+def test_get_weather_fast_response_on_miss(mock_weather_data):
+    from src.services.weather_data import WeatherData
+
+    with patch("src.controllers.weather_controller.fast_response", True), \
+         patch.object(WeatherService, 'get_current_weather', new_callable=AsyncMock,
+                      return_value=WeatherData.model_validate(mock_weather_data)):
+        response = client.get("/api/weather/Paris")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["X-Cache"] == "MISS"
+    assert response.json()["timestamp"] == "2025-01-01T00:00:00"
+
+def test_get_weather_conditional_request(mock_weather_data):
+    import time
+    from src.cache.entry import CacheEntry
+    from src.cache.local_cache import local_cache
+    from src.services.weather_data import WeatherData
+
+    weather = WeatherData.model_validate(mock_weather_data)
+    entry = CacheEntry(data=weather.model_dump(mode="json"), fetched_at=time.time() - 100,
+                       soft_ttl=600, hard_ttl=1800)
+    local_cache.set("weather:lyon", entry)
+
+    response = client.get("/api/weather/Lyon")
+    etag = response.headers["ETag"]
+    assert response.status_code == status.HTTP_200_OK
+    assert etag.startswith('"') and etag.endswith('"')
+    assert response.headers["Last-Modified"].endswith("GMT")
+    cache_control = response.headers["Cache-Control"]
+    max_age = int(cache_control.split("max-age=")[1].split(",")[0])
+    assert 495 <= max_age <= 500
+    assert "stale-while-revalidate=1200" in cache_control
+
+    for if_none_match in (etag, f'"autre", W/{etag}', "*"):
+        not_modified = client.get("/api/weather/Lyon", headers={"If-None-Match": if_none_match})
+        assert not_modified.status_code == status.HTTP_304_NOT_MODIFIED
+        assert not_modified.content == b""
+        assert not_modified.headers["ETag"] == etag
+
+    changed = client.get("/api/weather/Lyon", headers={"If-None-Match": '"autre"'})
+    assert changed.status_code == status.HTTP_200_OK
+    since = client.get("/api/weather/Lyon", headers={"If-Modified-Since": response.headers["Last-Modified"]})
+    assert since.status_code == status.HTTP_304_NOT_MODIFIED
+
+def test_get_weather_etag_on_miss_matches_cached_entry(mock_weather_data):
+    from src.services.weather_data import WeatherData
+
+    with patch.object(WeatherService, 'get_current_weather', new_callable=AsyncMock,
+                      return_value=WeatherData.model_validate(mock_weather_data)):
+        miss = client.get("/api/weather/Nantes")
+        hit = client.get("/api/weather/Nantes", headers={"If-None-Match": miss.headers["ETag"]})
+
+    assert miss.headers["X-Cache"] == "MISS"
+    assert "max-age=" in miss.headers["Cache-Control"]
+    # Même observation, même ETag : l'empreinte ne dépend que du corps
+    assert hit.status_code == status.HTTP_304_NOT_MODIFIED
+
+def test_weather_websocket_sends_current_observation(mock_weather_data):
+    from src.services.weather_data import WeatherData
+
+    with patch("src.services.weather_stream.get_redis", new_callable=AsyncMock, side_effect=ConnectionError("down")), \
+         patch.object(WeatherService, 'get_cached_weather', new_callable=AsyncMock,
+                      return_value=(WeatherData.model_validate(mock_weather_data), "HIT")):
+        with client.websocket_connect("/api/ws/weather?cities=Paris") as websocket:
+            message = websocket.receive_json()
+
+    assert message["city"] == "Paris"
+    assert message["data"]["temperature"]["current"] == 20.0
+
+def test_weather_websocket_caps_cities_per_connection(mock_weather_data):
+    from src.controllers.weather_controller import weather_stream
+    from src.services.weather_data import WeatherData
+
+    with patch("src.controllers.weather_controller.STREAM_MAX_CITIES", 2), \
+         patch("src.services.weather_stream.get_redis", new_callable=AsyncMock, side_effect=ConnectionError("down")), \
+         patch.object(WeatherService, 'get_cached_weather', new_callable=AsyncMock,
+                      return_value=(WeatherData.model_validate(mock_weather_data), "HIT")):
+        with client.websocket_connect("/api/ws/weather?cities=Paris") as websocket:
+            websocket.receive_json()
+            websocket.send_json({"subscribe": ["Lyon"]})
+            websocket.receive_json()
+            # Messages successifs : le plafond porte sur le total de la connexion
+            websocket.send_json({"subscribe": ["Nantes"]})
+            assert websocket.receive_json() == {"error": "Au plus 2 villes par connexion"}
+            assert weather_stream.stats()["cities"] == 2
+
+    assert weather_stream.stats() == {"cities": 0, "subscribers": 0}
+
+def test_weather_websocket_rejects_too_many_initial_cities():
+    from starlette.websockets import WebSocketDisconnect
+    from src.controllers.weather_controller import weather_stream
+
+    with patch("src.controllers.weather_controller.STREAM_MAX_CITIES", 2), \
+         patch.object(WeatherService, 'get_cached_weather', new_callable=AsyncMock) as mock_cached:
+        with client.websocket_connect("/api/ws/weather?cities=Paris&cities=Lyon&cities=Nantes") as websocket:
+            with pytest.raises(WebSocketDisconnect) as exc_info:
+                websocket.receive_json()
+
+    assert exc_info.value.code == status.WS_1008_POLICY_VIOLATION
+    assert exc_info.value.reason == "Au plus 2 villes par connexion"
+    mock_cached.assert_not_awaited()
+    assert weather_stream.stats() == {"cities": 0, "subscribers": 0}
+
+def test_weather_stream_requires_cities():
+    assert client.get("/api/weather/stream").status_code == status.HTTP_400_BAD_REQUEST
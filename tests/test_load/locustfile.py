@@ -30,6 +30,19 @@ class WeatherUser(HttpUser):
         key = f"test-{random.randint(1,100)}"
         self.client.get(f"/api/cache/{key}")
 
+    @task(1)  # Lecture groupée du cache : un seul aller-retour pour plusieurs clés
+    def bulk_get_cached_data(self):
+        keys = [f"test-{random.randint(1,100)}" for _ in range(20)]
+        self.client.post("/api/cache/bulk/get", json={"keys": keys}, name="/api/cache/bulk/get")
+
+    @task(1)  # Écriture groupée avec TTL par clé
+    def bulk_set_cache(self):
+        items = [
+            {"key": f"test-{random.randint(1,1000)}", "value": {"data": "test", "value": random.random()}, "ttl": 600}
+            for _ in range(20)
+        ]
+        self.client.post("/api/cache/bulk/set", json={"items": items}, name="/api/cache/bulk/set")
+
     # Optionnel : appelé au démarrage de chaque utilisateur virtuel
     def on_start(self):
         # Par exemple, s'authentifier ici si nécessaire
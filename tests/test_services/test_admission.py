@@ -0,0 +1,111 @@
+# tests/test_services/test_admission.py
+import asyncio
+import time
+
+import pytest
+from fastapi import HTTPException
+from unittest.mock import AsyncMock, patch
+
+from src.cache.entry import CacheEntry
+from src.cache.local_cache import local_cache
+from src.monitoring import ADMISSION_REJECTIONS
+from src.services.admission import AdmissionController
+from src.services.weather_service import WeatherService
+
+
+async def _hold(controller, release: asyncio.Event):
+    async with controller.admit():
+        await release.wait()
+
+
+@pytest.mark.asyncio
+async def test_rejects_when_queue_is_full():
+    controller = AdmissionController(name="test-full", max_concurrency=1, max_queue=1,
+                                     queue_timeout=5, retry_after=3)
+    release = asyncio.Event()
+    holder = asyncio.ensure_future(_hold(controller, release))
+    queued = asyncio.ensure_future(_hold(controller, release))
+    await asyncio.sleep(0)
+    assert controller.in_flight == 1 and controller.waiting == 1
+
+    with pytest.raises(HTTPException) as exc_info:
+        async with controller.admit():
+            pass
+    assert exc_info.value.status_code == 503
+    assert exc_info.value.headers == {"Retry-After": "3"}
+    assert ADMISSION_REJECTIONS.labels(pool="test-full", reason="queue_full")._value.get() == 1
+
+    # La requête en file est admise dès qu'une place se libère
+    release.set()
+    await asyncio.gather(holder, queued)
+    assert controller.in_flight == 0 and controller.waiting == 0
+
+
+@pytest.mark.asyncio
+async def test_rejects_after_queue_timeout():
+    controller = AdmissionController(name="test-timeout", max_concurrency=1, max_queue=10, queue_timeout=0.01)
+    release = asyncio.Event()
+    holder = asyncio.ensure_future(_hold(controller, release))
+    await asyncio.sleep(0)
+
+    with pytest.raises(HTTPException) as exc_info:
+        async with controller.admit():
+            pass
+    assert exc_info.value.status_code == 503
+    assert controller.waiting == 0
+    assert ADMISSION_REJECTIONS.labels(pool="test-timeout", reason="timeout")._value.get() == 1
+
+    release.set()
+    await holder
+    # Place libérée : nouvelle admission immédiate
+    async with controller.admit():
+        assert controller.in_flight == 1
+
+
+@pytest.mark.asyncio
+async def test_cache_hits_bypass_saturated_admission(make_weather):
+    service = WeatherService()
+    service.admission = AdmissionController(name="test-service", max_concurrency=1, max_queue=0, queue_timeout=1)
+    local_cache.set("weather:paris", CacheEntry(data=make_weather().model_dump(mode="json"), fetched_at=time.time(),
+                                                soft_ttl=600, hard_ttl=1800))
+    release = asyncio.Event()
+
+    async def slow(city):
+        await release.wait()
+        return make_weather(city=city)
+
+    with patch.object(service, "_get_cache", new_callable=AsyncMock, return_value=None), \
+         patch.object(service, "get_current_weather", side_effect=slow):
+        miss = asyncio.ensure_future(service.get_cached_weather("Lyon"))
+        await asyncio.sleep(0.01)
+
+        # Hit servi pendant que l'unique place amont est occupée
+        result, cache_status = await service.get_cached_weather("Paris")
+        assert cache_status == "HIT" and result.city == "Paris"
+
+        # Un autre miss est délesté immédiatement
+        with pytest.raises(HTTPException) as exc_info:
+            await service.get_cached_weather("Nantes")
+        assert exc_info.value.status_code == 503
+
+        release.set()
+        weather_data, cache_status = await miss
+    assert cache_status == "MISS" and weather_data.city == "Lyon"
+
+
+def test_controller_built_outside_event_loop():
+    # Comme le service construit à l'import, avant la boucle du worker
+    controller = AdmissionController(name="test-loop", max_concurrency=1, max_queue=1, queue_timeout=0.01)
+
+    async def contend():
+        release = asyncio.Event()
+        holder = asyncio.ensure_future(_hold(controller, release))
+        await asyncio.sleep(0)
+        with pytest.raises(HTTPException) as exc_info:
+            async with controller.admit():
+                pass
+        release.set()
+        await holder
+        return exc_info.value.status_code
+
+    assert asyncio.run(contend()) == 503
@@ -0,0 +1,117 @@
+import asyncio
+import time
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from src.cache.entry import CacheEntry
+from src.services.cache_warmer import CacheWarmer, PopularityTracker, POPULARITY_KEY
+from src.services.weather_service import WeatherService
+
+
+def _redis(top=()):
+    """Client Redis simulé : pipeline asynchrone, verrou libre et classement fixe"""
+    pipe = MagicMock()
+    pipe.execute = AsyncMock(return_value=[])
+    pipe.__aenter__ = AsyncMock(return_value=pipe)
+    pipe.__aexit__ = AsyncMock(return_value=False)
+    redis = MagicMock()
+    redis.pipeline.return_value = pipe
+    redis.set = AsyncMock(return_value=True)
+    redis.zrevrange = AsyncMock(return_value=list(top))
+    return redis, pipe
+
+
+def _entry(age, soft_ttl=600):
+    return CacheEntry(data={}, fetched_at=time.time() - age, soft_ttl=soft_ttl, hard_ttl=1800)
+
+
+@pytest.mark.asyncio
+async def test_tracker_flushes_local_counts_in_one_pipeline():
+    tracker = PopularityTracker()
+    for city in ["paris", "paris", "tokyo"]:
+        tracker.record(city)
+    redis, pipe = _redis()
+
+    await tracker.flush(redis)
+    await tracker.flush(redis)  # plus rien à pousser
+
+    pipe.zincrby.assert_any_call(POPULARITY_KEY, 2, "paris")
+    pipe.zincrby.assert_any_call(POPULARITY_KEY, 1, "tokyo")
+    pipe.execute.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_warmer_refreshes_only_hot_cities_close_to_expiry(make_weather):
+    service = WeatherService()
+    warmer = CacheWarmer(service)
+    warmer.interval, warmer.jitter = 60, 0
+    redis, _ = _redis(top=["paris", "tokyo", "london"])
+    entries = {
+        "weather:paris": _entry(age=10),      # encore frais au prochain cycle
+        "weather:tokyo": _entry(age=590),     # expire avant le prochain cycle
+    }                                          # london absent du cache
+
+    async def observe(city):
+        return [make_weather(city=city.capitalize())]
+
+    with patch("src.services.cache_warmer.get_redis", new_callable=AsyncMock, return_value=redis), \
+         patch("src.services.weather_service.get_redis", new_callable=AsyncMock, side_effect=ConnectionError("down")), \
+         patch.object(service, "_read_entries", new_callable=AsyncMock, return_value=entries), \
+         patch.object(service, "_observe", side_effect=observe) as mock_observe, \
+         patch.object(service, "_merge_weather_rows", wraps=service._merge_weather_rows) as mock_merge:
+        refreshed = await warmer.run_once()
+
+    assert refreshed == 2
+    warmed = sorted(call.args[0] for call in mock_observe.await_args_list)
+    assert warmed == ["london", "tokyo"]
+    # Un seul appel de fusion vectorisée pour le cycle
+    mock_merge.assert_called_once()
+    assert len(mock_merge.call_args.args[0]) == 2
+
+
+@pytest.mark.asyncio
+async def test_warmer_counts_ceded_refreshes_apart(make_weather):
+    from src.monitoring import CACHE_WARMER_REFRESHES
+    service = WeatherService()
+    service.distributed_lock = True
+    warmer = CacheWarmer(service)
+    warmer.interval, warmer.jitter = 60, 0
+    redis, _ = _redis(top=["paris", "tokyo", "london"])
+    # Verrou de cycle libre ; verrou de tokyo détenu par un autre worker
+    redis.set = AsyncMock(side_effect=lambda key, *args, **kwargs: key != "lock:weather:tokyo")
+    redis.eval = AsyncMock(return_value=1)
+    # Rafraîchissement de london déjà en cours dans ce worker
+    release = asyncio.Event()
+    inflight = asyncio.ensure_future(service._singleflight.do("weather:london", release.wait))
+    await asyncio.sleep(0)
+
+    def count(outcome):
+        return CACHE_WARMER_REFRESHES.labels(outcome=outcome)._value.get()
+
+    before = {outcome: count(outcome) for outcome in ("refreshed", "ceded")}
+    with patch("src.services.cache_warmer.get_redis", new_callable=AsyncMock, return_value=redis), \
+         patch("src.services.weather_service.get_redis", new_callable=AsyncMock, return_value=redis), \
+         patch.object(service, "_read_entries", new_callable=AsyncMock, return_value={}), \
+         patch.object(service, "_store", new_callable=AsyncMock), \
+         patch.object(service, "_observe", new_callable=AsyncMock, return_value=[make_weather()]) as mock_observe:
+        assert await warmer.run_once() == 1
+
+    mock_observe.assert_awaited_once_with("paris")
+    assert count("refreshed") == before["refreshed"] + 1
+    assert count("ceded") == before["ceded"] + 2
+    release.set()
+    await inflight
+
+
+@pytest.mark.asyncio
+async def test_warmer_skips_cycle_when_another_worker_holds_lock():
+    service = WeatherService()
+    warmer = CacheWarmer(service)
+    redis, _ = _redis(top=["paris"])
+    redis.set = AsyncMock(return_value=None)
+
+    with patch("src.services.cache_warmer.get_redis", new_callable=AsyncMock, return_value=redis), \
+         patch.object(service, "_load_many", new_callable=AsyncMock) as mock_load:
+        assert await warmer.run_once() == 0
+
+    redis.zrevrange.assert_not_awaited()
+    mock_load.assert_not_awaited()
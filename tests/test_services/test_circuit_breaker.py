@@ -0,0 +1,28 @@
+from unittest.mock import patch
+from src.services.circuit_breaker import CircuitBreaker
+
+def test_breaker_opens_after_repeated_failures():
+    breaker = CircuitBreaker("test", failure_threshold=3, recovery_timeout=30)
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow_request()
+
+def test_breaker_half_open_probe_closes_or_reopens():
+    breaker = CircuitBreaker("test", failure_threshold=1, recovery_timeout=30)
+    breaker.record_failure()
+    opened_at = breaker._opened_at
+
+    with patch("src.services.circuit_breaker.time.monotonic", return_value=opened_at + 31):
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        assert breaker.allow_request()
+        assert not breaker.allow_request()  # une seule sonde à la fois
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.OPEN
+
+    with patch("src.services.circuit_breaker.time.monotonic", return_value=breaker._opened_at + 31):
+        assert breaker.allow_request()
+        breaker.record_success()
+        assert breaker.state == CircuitBreaker.CLOSED
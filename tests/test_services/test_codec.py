@@ -0,0 +1,68 @@
+import time
+import pytest
+from src.cache import codec
+from src.cache.entry import CacheEntry
+from src.services.weather_data import WeatherData
+
+
+def _entry():
+    weather = WeatherData(
+        city="Paris",
+        temperature={"current": 20.3, "feels_like": 19.1},
+        humidity=60.0,
+        wind_speed=10.5,
+        wind_direction=180.0,
+        weather_description="partiellement nuageux",
+        source="open-meteo",
+    )
+    return CacheEntry(data=weather.model_dump(mode="json"), fetched_at=time.time(),
+                      soft_ttl=600, hard_ttl=1800, delta=0.25)
+
+
+@pytest.mark.parametrize("name", sorted(codec.CODECS))
+def test_entry_round_trip_with_version_byte(name):
+    entry = _entry()
+    raw = entry.encode(codec.get_codec(name))
+
+    assert raw[0] == codec.CODECS[name].version
+    decoded = CacheEntry.decode(raw)
+    assert decoded.data == entry.data
+    assert decoded.fetched_at == entry.fetched_at
+    assert (decoded.soft_ttl, decoded.hard_ttl) == (600, 1800)
+
+
+def test_struct_payload_is_smaller_than_json():
+    entry = _entry()
+    assert len(entry.encode(codec.get_codec("struct"))) < len(entry.to_json()) / 2
+
+
+def test_struct_codec_falls_back_for_other_values():
+    raw = codec.encode({"any": ["value"]}, codec.get_codec("struct"))
+    assert raw[0] != codec.StructCodec.version
+    assert codec.decode(raw) == {"any": ["value"]}
+
+
+def test_legacy_json_entries_are_still_readable():
+    entry = _entry()
+    assert CacheEntry.decode(entry.to_json()).data == entry.data
+    assert CacheEntry.decode(entry.to_json().encode()).data == entry.data
+
+
+def test_unknown_version_is_rejected():
+    with pytest.raises(ValueError):
+        codec.decode(b"\x7f\x00")
+
+
+def test_codec_interface_is_abstract():
+    with pytest.raises(TypeError):
+        codec.Codec()
+
+
+def test_missing_codec_is_reported_once(monkeypatch, caplog):
+    monkeypatch.setenv("CACHE_CODEC", "absent")
+    monkeypatch.setattr(codec, "_missing_reported", set())
+    with caplog.at_level("WARNING", logger="src.cache.codec"):
+        for _ in range(3):
+            raw = codec.encode({"any": "value"})
+    assert raw[0] == codec.JsonCodec.version
+    assert [r.getMessage() for r in caplog.records] == ["Codec de cache indisponible: absent, repli sur json"]
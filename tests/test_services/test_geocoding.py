@@ -0,0 +1,77 @@
+import json
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from src.services.geocoding import Gazetteer, Geocoder, fold_name
+
+def test_fold_name_removes_accents_and_case():
+    assert fold_name("  Saint-Étienne ") == "saint etienne"
+    assert fold_name("NÎMES") == "nimes"
+
+def test_gazetteer_lookup_by_name_ascii_and_alternate():
+    gazetteer = Gazetteer().load()
+    assert gazetteer.lookup("genève").name == "Genève"
+    assert gazetteer.lookup("Geneva").name == "Genève"
+    assert gazetteer.lookup("new york").lat == 40.7128
+    assert gazetteer.lookup("Atlantis") is None
+
+def test_gazetteer_prefix_search_orders_by_population():
+    gazetteer = Gazetteer().load()
+    assert [place.name for place in gazetteer.search_prefix("to")] == ["Tokyo", "Toulouse", "Toulon"]
+    assert [place.name for place in gazetteer.search_prefix("mont")] == ["Montréal", "Montpellier"]
+
+@pytest.mark.asyncio
+async def test_geocoder_uses_persistent_redis_cache():
+    geocoder = Geocoder(Gazetteer().load())
+    redis = AsyncMock()
+    redis.get.return_value = json.dumps({"lat": 1.0, "lon": 2.0})
+
+    with patch("src.services.geocoding.get_redis", new_callable=AsyncMock, return_value=redis), \
+         patch.object(geocoder, "_geocode_upstream", new_callable=AsyncMock) as upstream:
+        assert await geocoder.resolve("Kaolack") == {"lat": 1.0, "lon": 2.0}
+        assert await geocoder.resolve("KAOLACK") == {"lat": 1.0, "lon": 2.0}
+
+    upstream.assert_not_awaited()
+    redis.get.assert_awaited_once_with("geo:kaolack")
+
+@pytest.mark.asyncio
+async def test_geocoder_stores_upstream_result_without_expiry():
+    geocoder = Geocoder(Gazetteer().load())
+    redis = AsyncMock()
+    redis.get.return_value = None
+    response = MagicMock()
+    response.json.return_value = {"results": [{"latitude": 14.15, "longitude": -16.07}]}
+    client = AsyncMock()
+    client.get.return_value = response
+
+    with patch("src.services.geocoding.get_redis", new_callable=AsyncMock, return_value=redis), \
+         patch("src.services.geocoding.get_http_client", return_value=client):
+        assert await geocoder.resolve("Kaolack") == {"lat": 14.15, "lon": -16.07}
+        assert await geocoder.resolve("Kaolack") == {"lat": 14.15, "lon": -16.07}
+
+    client.get.assert_awaited_once()
+    redis.set.assert_awaited_once_with("geo:kaolack", json.dumps({"lat": 14.15, "lon": -16.07}))
+
+@pytest.mark.asyncio
+async def test_geocoder_caches_unknown_city_with_short_ttl():
+    geocoder = Geocoder(Gazetteer().load())
+    geocoder.negative_ttl = 120
+    redis = AsyncMock()
+    redis.get.return_value = None
+
+    with patch("src.services.geocoding.get_redis", new_callable=AsyncMock, return_value=redis), \
+         patch.object(geocoder, "_geocode_upstream", new_callable=AsyncMock, return_value=None) as upstream:
+        assert await geocoder.resolve("Xyzzyville") is None
+        assert await geocoder.resolve("xyzzyville") is None
+
+    upstream.assert_awaited_once()
+    redis.set.assert_awaited_once_with("geo:xyzzyville", "null", ex=120)
+    assert geocoder.known_missing("XYZZYVILLE")
+
+    # Entrée négative écrite par un autre worker : pas d'appel amont
+    other = Geocoder(Gazetteer().load())
+    redis.get.return_value = "null"
+    with patch("src.services.geocoding.get_redis", new_callable=AsyncMock, return_value=redis), \
+         patch.object(other, "_geocode_upstream", new_callable=AsyncMock) as upstream:
+        assert await other.resolve("Xyzzyville") is None
+    upstream.assert_not_awaited()
+    assert other.known_missing("Xyzzyville")
@@ -0,0 +1,28 @@
+import pytest
+from src.config.http_client import get_http_client, init_http_clients, close_http_clients, PROVIDERS
+
+@pytest.mark.asyncio
+async def test_http_client_is_shared_per_provider():
+    """Le même pool est réutilisé entre les appels d'un fournisseur"""
+    clients = init_http_clients()
+    try:
+        assert set(clients) == set(PROVIDERS)
+        assert get_http_client("open-meteo") is get_http_client("open-meteo")
+        assert get_http_client("open-meteo") is not get_http_client("weatherapi")
+    finally:
+        await close_http_clients()
+
+@pytest.mark.asyncio
+async def test_http_client_recreated_after_close(monkeypatch):
+    """Un client fermé est recréé avec les limites configurées"""
+    monkeypatch.setenv("HTTP_WEATHERAPI_MAX_CONNECTIONS", "7")
+    client = get_http_client("weatherapi")
+    await close_http_clients()
+    assert client.is_closed
+
+    new_client = get_http_client("weatherapi")
+    try:
+        assert new_client is not client
+        assert new_client._transport._pool._max_connections == 7
+    finally:
+        await close_http_clients()
@@ -0,0 +1,138 @@
+import pytest
+from fastapi import FastAPI, HTTPException, status
+from fastapi.testclient import TestClient
+from unittest.mock import AsyncMock, patch
+from src.cache.invalidation import InvalidationJob, Invalidator
+from src.cache.local_cache import local_cache
+from src.routers.cache_router import router
+from src.services.weather_service import WeatherService
+
+
+def _redis(pages):
+    """Client simulé : SCAN renvoie les pages données, UNLINK compte les clés"""
+    redis = AsyncMock()
+    redis.scan.side_effect = pages
+    redis.unlink.side_effect = lambda *keys: len(keys)
+    return redis
+
+
+@pytest.mark.asyncio
+async def test_weather_invalidation_scans_and_unlinks_in_batches():
+    redis = _redis([(42, ["weather:paris", "weather:tokyo"]), (0, ["weather:oslo"])])
+    local_cache.set("weather:paris", "x")
+    local_cache.set("cache:user", "y")
+
+    with patch("src.cache.invalidation.get_redis", new_callable=AsyncMock, return_value=redis):
+        job = await WeatherService().invalidate("weather")
+
+    assert job.status == "done"
+    assert (job.scanned, job.deleted, job.batches) == (3, 3, 2)
+    assert redis.scan.await_args_list[1].kwargs["cursor"] == 42
+    assert all(call.kwargs["match"] == "weather:*" for call in redis.scan.await_args_list)
+    redis.flushdb.assert_not_awaited()
+    # Les clés utilisateur du cache L1 sont conservées
+    assert local_cache.get("weather:paris") is None
+    assert local_cache.get("cache:user") == "y"
+
+
+@pytest.mark.asyncio
+async def test_clear_cache_no_longer_flushes_the_database():
+    redis = _redis([(0, ["weather:paris"])])
+    with patch("src.cache.invalidation.get_redis", new_callable=AsyncMock, return_value=redis):
+        await WeatherService().clear_cache()
+    redis.unlink.assert_awaited_once_with("weather:paris")
+    redis.flushdb.assert_not_awaited()
+    redis.aclose.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_city_and_provider_invalidation():
+    service = WeatherService()
+    redis = _redis([])
+    redis.smembers.return_value = {"weather:paris", "weather:lyon"}
+
+    with patch("src.cache.invalidation.get_redis", new_callable=AsyncMock, return_value=redis), \
+         patch("src.services.weather_service.get_redis", new_callable=AsyncMock, return_value=redis):
+        city_job = await service.invalidate("city", city="  New   York ")
+        provider_job = await service.invalidate("provider", provider="weatherapi")
+
+    redis.unlink.assert_any_await("weather:new york")
+    assert city_job.deleted == 1
+    redis.smembers.assert_awaited_once_with("index:provider:weatherapi")
+    assert provider_job.deleted == 2
+    redis.unlink.assert_any_await("index:provider:weatherapi")
+
+
+@pytest.mark.asyncio
+async def test_key_invalidation_publishes_one_message_per_batch():
+    import json
+    redis = _redis([])
+    keys = [f"weather:city{i}" for i in range(5)]
+
+    with patch("src.cache.invalidation.get_redis", new_callable=AsyncMock, return_value=redis), \
+         patch("src.cache.local_cache.get_redis", new_callable=AsyncMock, return_value=redis), \
+         patch("src.cache.local_cache.pubsub_enabled", True):
+        await Invalidator(batch_size=2).unlink_keys(InvalidationJob(mode="provider", target="p"), keys)
+
+    # Un message par lot d'UNLINK : liste JSON, ou clé seule
+    payloads = [call.args[1].partition(":")[2] for call in redis.publish.await_args_list]
+    assert payloads == [json.dumps(keys[0:2]), json.dumps(keys[2:4]), keys[4]]
+
+
+@pytest.mark.asyncio
+async def test_invalidation_requires_its_target():
+    service = WeatherService()
+    with pytest.raises(HTTPException) as exc:
+        await service.invalidate("pattern", pattern="*", namespace="geo")
+    assert exc.value.status_code == status.HTTP_400_BAD_REQUEST
+    with pytest.raises(HTTPException):
+        await service.invalidate("city")
+
+
+def test_invalidate_endpoint_reports_progress():
+    app = FastAPI()
+    app.include_router(router, prefix="/api")
+    client = TestClient(app)
+    redis = _redis([(0, ["cache:user:1", "cache:user:2"])])
+
+    with patch("src.cache.invalidation.get_redis", new_callable=AsyncMock, return_value=redis):
+        response = client.post("/api/cache/invalidate",
+                               json={"mode": "pattern", "namespace": "cache", "pattern": "user:*", "wait": True})
+
+    assert response.status_code == status.HTTP_200_OK
+    job = response.json()
+    assert job["status"] == "done" and job["deleted"] == 2 and job["target"] == "cache:user:*"
+    assert client.get(f"/api/cache/invalidate/{job['job_id']}").json() == job
+    assert client.get("/api/cache/invalidate/inconnu").status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_cache_endpoints_keep_the_shared_service_state():
+    from prometheus_client import REGISTRY
+    from src.controllers.weather_controller import weather_service
+
+    app = FastAPI()
+    app.include_router(router, prefix="/api")
+    client = TestClient(app)
+    breaker = weather_service.registry.get("weatherapi").breaker
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+
+    try:
+        with patch("src.cache.invalidation.get_redis", new_callable=AsyncMock, return_value=_redis([(0, [])] * 2)):
+            assert client.post("/api/cache/clear").status_code == status.HTTP_200_OK
+            assert client.post("/api/cache/invalidate", json={"mode": "weather", "wait": True}).status_code == 200
+
+        # Aucun nouveau service : le disjoncteur ouvert reste exporté comme tel
+        assert REGISTRY.get_sample_value("weather_provider_circuit_state", {"provider": "weatherapi"}) == 2.0
+    finally:
+        breaker.record_success()
+
+
+@pytest.mark.asyncio
+async def test_background_invalidation_failure_is_reported():
+    jobs = Invalidator(batch_size=10)
+    with patch("src.cache.invalidation.get_redis", new_callable=AsyncMock, side_effect=ConnectionError("down")):
+        job = await jobs.run(InvalidationJob(mode="weather", target="weather:*"),
+                             lambda j: jobs.unlink_pattern(j, "weather:*"))
+    assert job.status == "failed" and "down" in job.error
+    assert jobs.get_job(job.job_id) is job
@@ -0,0 +1,105 @@
+import time
+import pytest
+from unittest.mock import patch
+from src.cache.local_cache import LocalCache
+
+def test_local_cache_evicts_least_recently_used():
+    cache = LocalCache(max_entries=2, default_ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "a" devient la plus récente
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.evictions == 1
+
+def test_local_cache_respects_memory_cap():
+    cache = LocalCache(max_entries=100, max_bytes=100, default_ttl=60)
+    cache.set("a", "x", size=60)
+    cache.set("b", "y", size=60)
+
+    assert cache.get("a") is None
+    assert cache.size_bytes == 60
+    cache.set("huge", "z", size=1000)
+    assert cache.get("huge") is None
+
+def test_local_cache_expires_entries():
+    cache = LocalCache(default_ttl=60)
+    now = time.monotonic()
+    cache.set("a", 1, ttl=5)
+    with patch("src.cache.local_cache.time.monotonic", return_value=now + 10):
+        assert cache.get("a") is None
+    assert cache.stats() == {
+        "entries": 0, "bytes": 0, "hits": 0, "misses": 1, "evictions": 0, "expirations": 1
+    }
+
+def _pubsub(messages):
+    """Client Redis factice dont le pub/sub délivre les messages donnés, puis s'arrête"""
+    import asyncio
+    from unittest.mock import AsyncMock, MagicMock
+
+    async def listen():
+        for data in messages:
+            yield {"type": "message", "data": data}
+        raise asyncio.CancelledError
+
+    pubsub = MagicMock(subscribe=AsyncMock(), aclose=AsyncMock(), listen=listen)
+    return MagicMock(pubsub=MagicMock(return_value=pubsub))
+
+@pytest.mark.asyncio
+async def test_forked_workers_accept_each_others_invalidations():
+    import asyncio
+    from unittest.mock import AsyncMock
+    from src.cache import local_cache as module
+
+    # Identifiant calculé dans le maître (preload_app), puis hérité par le fork
+    with patch("src.cache.local_cache.os.getpid", return_value=100):
+        master = module._worker_origin()
+    with patch("src.cache.local_cache.os.getpid", return_value=101):
+        worker = module._worker_origin()
+        assert worker != master
+        assert module._worker_origin() == worker
+
+        cache = LocalCache(default_ttl=60)
+        for i, key in enumerate(["weather:paris", "weather:lyon", "weather:oslo", "weather:rome"]):
+            cache.set(key, i + 1)
+        redis = _pubsub([f"{master}:weather:paris", f"{worker}:weather:lyon",
+                         f'{master}:["weather:oslo", "weather:rome"]'])
+        with patch("src.cache.local_cache.get_redis", new_callable=AsyncMock, return_value=redis):
+            with pytest.raises(asyncio.CancelledError):
+                await module.listen_invalidations(cache)
+
+    # Messages d'un autre worker appliqués (clé seule ou lot), le sien ignoré
+    assert cache.peek("weather:paris") is None
+    assert cache.peek("weather:lyon") == 2
+    assert len(cache) == 1
+
+@pytest.mark.asyncio
+async def test_lost_subscription_clears_once_per_outage():
+    import asyncio
+    from src.cache import local_cache as module
+
+    cache = LocalCache(default_ttl=60)
+    cache.set("weather:paris", 1)
+    attempts = 0
+
+    async def get_redis():
+        nonlocal attempts
+        attempts += 1
+        if attempts == 2:
+            # Purge au premier échec, puis le L1 se remplit de nouveau pendant la coupure
+            assert cache.peek("weather:paris") is None
+            cache.set("weather:lyon", 2)
+        elif attempts == 4:
+            return _pubsub([])
+        raise ConnectionError("down")
+
+    with patch("src.cache.local_cache.get_redis", side_effect=get_redis):
+        with pytest.raises(asyncio.CancelledError):
+            await module.listen_invalidations(cache, retry_delay=0)
+
+    # Les nouvelles tentatives n'ont pas repurgé le L1
+    assert attempts == 4
+    assert cache.peek("weather:lyon") == 2
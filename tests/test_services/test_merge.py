@@ -0,0 +1,57 @@
+from src.services.merge import merge_observations, merge_weather
+
+
+def test_wind_direction_uses_vector_mean_near_north(make_weather):
+    merged = merge_weather([make_weather(wind_direction=350.0), make_weather(wind_direction=10.0)], [1.0, 1.0])
+    assert merged.wind_direction == 0.0
+
+
+def test_weighted_mean_of_numeric_fields(make_weather):
+    merged = merge_weather([make_weather(10.0, humidity=40.0), make_weather(12.0, humidity=60.0)], [3.0, 1.0])
+    assert merged.temperature.current == 10.5
+    assert merged.temperature.feels_like == 9.5
+    assert merged.humidity == 45.0
+
+
+def test_outlier_is_dropped(make_weather):
+    merged = merge_weather([make_weather(20.0), make_weather(21.0), make_weather(35.0)], [1.0, 1.0, 1.0])
+    assert merged.temperature.current == 20.5
+
+
+def test_description_picked_by_cumulated_weight(make_weather):
+    observations = [make_weather(20.0, description="Pluie"), make_weather(20.0, description="Couvert"),
+                    make_weather(20.0, description="Couvert")]
+    assert merge_weather(observations, [1.5, 1.0, 1.0]).weather_description == "Couvert"
+    assert merge_weather(observations, [2.5, 1.0, 1.0]).weather_description == "Pluie"
+
+
+def test_matrix_merge_handles_missing_providers(make_weather):
+    merged = merge_observations(
+        [
+            [make_weather(20.0, city="Paris"), None],
+            [None, None],
+            [make_weather(5.0, city="Oslo"), make_weather(7.0, city="Oslo")],
+        ],
+        [1.0, 1.0]
+    )
+    assert merged[0].city == "Paris" and merged[0].temperature.current == 20.0
+    assert merged[1] is None
+    assert merged[2].temperature.current == 6.0
+    assert merged[2].source == "aggregated"
+
+
+def test_single_city_path_matches_vectorized_merge(make_weather):
+    import random
+    rng = random.Random(42)
+    for _ in range(200):
+        n = rng.randint(1, 4)
+        observations = [
+            make_weather(round(rng.uniform(-10, 40), 1), humidity=round(rng.uniform(0, 100)),
+                         wind_speed=round(rng.uniform(0, 60), 1), wind_direction=rng.choice([0.0, 10.0, 180.0, 350.0]),
+                         description=rng.choice(["Pluie", "Couvert", "Ciel dégagé"]), source=f"p{j}")
+            for j in range(n)
+        ]
+        weights = [rng.choice([0.0, 0.5, 1.0, 2.0]) for _ in range(n)]
+        scalar = merge_weather(observations, weights)
+        vectorized = merge_observations([observations], weights)[0]
+        assert scalar.model_dump(exclude={"timestamp"}) == vectorized.model_dump(exclude={"timestamp"})
@@ -0,0 +1,40 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from src.services.rate_limiter import RateLimiter
+
+@pytest.mark.asyncio
+async def test_local_fallback_enforces_rate_limit():
+    limiter = RateLimiter("test", rate_limit=3)
+    with patch("src.services.rate_limiter.get_redis", new_callable=AsyncMock, side_effect=ConnectionError("down")):
+        results = [await limiter.acquire() for _ in range(4)]
+    assert results == [True, True, True, False]
+
+@pytest.mark.asyncio
+async def test_local_fallback_enforces_daily_quota():
+    limiter = RateLimiter("test", daily_quota=2)
+    with patch("src.services.rate_limiter.get_redis", new_callable=AsyncMock, side_effect=ConnectionError("down")):
+        results = [await limiter.acquire() for _ in range(3)]
+    assert results == [True, True, False]
+
+@pytest.mark.asyncio
+async def test_redis_script_decides_and_receives_limits():
+    limiter = RateLimiter("openweathermap", rate_limit=60, daily_quota=1000)
+    script = AsyncMock(return_value=[0, 0, 0])
+    redis = MagicMock()
+    redis.register_script.return_value = script
+
+    with patch("src.services.rate_limiter.get_redis", new_callable=AsyncMock, return_value=redis):
+        assert await limiter.acquire() is False
+
+    keys = script.await_args.kwargs["keys"]
+    args = script.await_args.kwargs["args"]
+    assert keys[0] == "ratelimit:openweathermap"
+    assert keys[1].startswith("quota:openweathermap:")
+    assert args[0] == 60 and args[1] == 1 and args[3] == 1000
+
+@pytest.mark.asyncio
+async def test_unlimited_provider_never_touches_redis():
+    limiter = RateLimiter("free")
+    with patch("src.services.rate_limiter.get_redis", new_callable=AsyncMock) as mock_redis:
+        assert await limiter.acquire() is True
+    mock_redis.assert_not_awaited()
@@ -0,0 +1,53 @@
+import pytest
+from redis.asyncio import BlockingConnectionPool
+from src.config.redis import get_redis, close_redis, RedisPoolCollector, POOL_IDLE_ATTR, POOL_IN_USE_ATTR
+
+@pytest.mark.asyncio
+async def test_redis_client_uses_configured_blocking_pool(monkeypatch):
+    """Le client partagé repose sur un pool bloquant réglé par l'environnement"""
+    monkeypatch.setenv("REDIS_MAX_CONNECTIONS", "7")
+    monkeypatch.setenv("REDIS_HEALTH_CHECK_INTERVAL", "15")
+    await close_redis()
+    try:
+        redis = await get_redis()
+        pool = redis.connection_pool
+        assert isinstance(pool, BlockingConnectionPool)
+        assert pool.max_connections == 7
+        assert pool.connection_kwargs["health_check_interval"] == 15
+        assert pool.connection_kwargs["retry"] is not None
+        assert await get_redis() is redis
+        assert await get_redis(binary=True) is not redis
+    finally:
+        await close_redis()
+
+@pytest.mark.asyncio
+async def test_pool_metrics_report_saturation():
+    await close_redis()
+    try:
+        await get_redis()
+        metrics = {m.name: m for m in RedisPoolCollector().collect()}
+        samples = {s.labels["pool"]: s.value for s in metrics["redis_pool_saturation"].samples}
+        assert samples == {"text": 0}
+    finally:
+        await close_redis()
+
+def test_pool_still_exposes_the_attributes_read_by_the_collector():
+    """Échoue si une version de redis-py renomme les attributs privés lus par les jauges"""
+    pool = BlockingConnectionPool(max_connections=3)
+    for attr in (POOL_IN_USE_ATTR, POOL_IDLE_ATTR):
+        assert hasattr(pool, attr), f"BlockingConnectionPool.{attr} a disparu : adapter RedisPoolCollector"
+        assert len(getattr(pool, attr)) == 0
+
+def test_pool_metrics_tolerate_missing_attributes(monkeypatch):
+    from src.config import redis as module
+
+    class Pool:
+        max_connections = 4
+
+    class Client:
+        connection_pool = Pool()
+
+    monkeypatch.setattr(module, "_clients", {"text": Client()})
+    metrics = {m.name: m for m in RedisPoolCollector().collect()}
+    assert [s.value for s in metrics["redis_pool_connections"].samples] == [0, 0]
+    assert [s.value for s in metrics["redis_pool_max_connections"].samples] == [4]
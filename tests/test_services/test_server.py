@@ -0,0 +1,38 @@
+# tests/test_services/test_server.py
+import os
+import runpy
+
+import pytest
+
+CONFIG = os.path.join(os.path.dirname(__file__), "..", "..", "gunicorn.conf.py")
+
+
+def _load(monkeypatch, **env):
+    for name in ("WEB_CONCURRENCY", "WORKERS_PER_CORE", "MAX_WORKERS", "KEEP_ALIVE", "BACKLOG"):
+        monkeypatch.delenv(name, raising=False)
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+    return runpy.run_path(CONFIG)
+
+
+def test_workers_follow_cpu_count(monkeypatch):
+    monkeypatch.setattr("multiprocessing.cpu_count", lambda: 8)
+    assert _load(monkeypatch)["workers"] == 8
+    assert _load(monkeypatch, WORKERS_PER_CORE="2", MAX_WORKERS="12")["workers"] == 12
+    assert _load(monkeypatch, WEB_CONCURRENCY="3")["workers"] == 3
+    # Une valeur vide (docker-compose) revient au calcul par cœur
+    assert _load(monkeypatch, WEB_CONCURRENCY="")["workers"] == 8
+
+
+def test_production_settings_from_environment(monkeypatch):
+    config = _load(monkeypatch, KEEP_ALIVE="15", BACKLOG="4096")
+    assert config["keepalive"] == 15
+    assert config["backlog"] == 4096
+    assert config["preload_app"] is True
+    assert config["worker_class"] == "src.server.ProductionWorker"
+
+
+def test_production_worker_uses_uvloop_and_httptools():
+    pytest.importorskip("uvloop")
+    from src.server import ProductionWorker
+    assert ProductionWorker.CONFIG_KWARGS == {"loop": "uvloop", "http": "httptools"}
@@ -1,35 +1,31 @@
 import pytest
 from unittest.mock import patch, AsyncMock
-from src.services.weather_service import WeatherService, WeatherData
-from datetime import datetime
+from src.services.weather_service import WeatherService, Temperature
+from src.services.merge import merge_observations
+import time
+from src.cache.entry import CacheEntry
+from src.cache.local_cache import local_cache
+
+
+def _entry(weather_data, age=0.0, soft_ttl=600, hard_ttl=1800):
+    """Construit une entrée de cache telle qu'écrite par le service"""
+    return CacheEntry(
+        data=weather_data.model_dump(mode="json"),
+        fetched_at=time.time() - age,
+        soft_ttl=soft_ttl,
+        hard_ttl=hard_ttl,
+    )
 
 @pytest.mark.asyncio
-async def test_get_weather():
+async def test_get_weather(make_weather):
     service = WeatherService()
     
-    # Créer un mock pour les données de température
-    temperature = {
-        "current": 20.0,
-        "feels_like": 18.0,
-        "min": 15.0,
-        "max": 22.0
-    }
-    
     # Créer un objet WeatherData valide
-    mock_weather_data = WeatherData(
-        city="Paris",
-        temperature=temperature,
-        humidity=60.0,
-        wind_speed=10.0,
-        wind_direction=180,
-        weather_description="partiellement nuageux",
-        source="test",
-        timestamp=datetime.now().isoformat()
-    )
+    mock_weather_data = make_weather(humidity=60.0, description="partiellement nuageux", source="test")
     
-    with patch.object(service, '_get_weather_from_openweather', new_callable=AsyncMock) as mock_ow, \
-         patch.object(service, '_get_weather_from_weatherapi', new_callable=AsyncMock) as mock_wa, \
-         patch.object(service, '_get_weather_from_openmeteo', new_callable=AsyncMock) as mock_om:
+    with patch.object(service.registry.get("openweathermap"), 'fetch', new_callable=AsyncMock) as mock_ow, \
+         patch.object(service.registry.get("weatherapi"), 'fetch', new_callable=AsyncMock) as mock_wa, \
+         patch.object(service.registry.get("open-meteo"), 'fetch', new_callable=AsyncMock) as mock_om:
         
         # Configurer les mocks pour retourner des données valides
         mock_ow.return_value = mock_weather_data
@@ -42,4 +38,440 @@ async def test_get_weather():
         # Vérifier les résultats
         assert result.city == "Paris"
         assert result.temperature.current == 20.0
-        assert result.humidity == 60.0
\ No newline at end of file
+        assert result.humidity == 60.0
+
+@pytest.mark.asyncio
+async def test_get_cached_weather_hit_skips_upstream(make_weather):
+    service = WeatherService()
+    cached = make_weather(21.0)
+    redis = AsyncMock()
+    redis.get.return_value = _entry(cached).to_json()
+
+    with patch("src.services.weather_service.get_redis", new_callable=AsyncMock, return_value=redis), \
+         patch.object(service, "get_current_weather", new_callable=AsyncMock) as mock_current:
+        result, cache_status = await service.get_cached_weather("  PARIS ")
+
+    assert cache_status == "HIT"
+    assert result.temperature.current == 21.0
+    redis.get.assert_awaited_once_with("weather:paris")
+    mock_current.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_get_cached_weather_miss_populates_cache(make_weather):
+    service = WeatherService()
+    fresh = make_weather(19.0)
+    redis = AsyncMock()
+    redis.get.return_value = None
+
+    misses = local_cache.misses
+    with patch("src.services.weather_service.get_redis", new_callable=AsyncMock, return_value=redis), \
+         patch.object(service, "get_current_weather", new_callable=AsyncMock, return_value=fresh):
+        result, cache_status = await service.get_cached_weather("Paris")
+
+    assert cache_status == "MISS"
+    assert result is fresh
+    # Un miss L1 par requête : la sonde du cache négatif n'est pas comptée
+    assert local_cache.misses == misses + 1
+    key, raw = redis.set.await_args.args
+    assert key == "weather:paris"
+    assert redis.set.await_args.kwargs == {"ex": service.cache_hard_ttl}
+    entry = CacheEntry.decode(raw)
+    assert entry.soft_ttl == service.cache_duration
+    assert entry.data["temperature"]["current"] == 19.0
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_share_one_upstream_call(make_weather):
+    import asyncio
+    service = WeatherService()
+    fresh = make_weather(19.0)
+    redis = AsyncMock()
+    redis.get.return_value = None
+
+    async def slow_fetch(city):
+        await asyncio.sleep(0.05)
+        return fresh
+
+    with patch("src.services.weather_service.get_redis", new_callable=AsyncMock, return_value=redis), \
+         patch.object(service, "get_current_weather", new_callable=AsyncMock, side_effect=slow_fetch) as mock_current:
+        results = await asyncio.gather(*(service.get_cached_weather("Paris") for _ in range(10)))
+
+    assert mock_current.await_count == 1
+    assert all(data is fresh and cache_status == "MISS" for data, cache_status in results)
+    redis.set.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_distributed_lock_waits_for_other_worker(make_weather):
+    service = WeatherService()
+    service.distributed_lock = True
+    service.lock_poll_interval = 0.001
+    cached = make_weather(21.0)
+    redis = AsyncMock()
+    # Miss initial, puis la clé est écrite par le worker qui détient le verrou
+    redis.get.side_effect = [None, None, _entry(cached).to_json()]
+    redis.set.return_value = None  # SET NX échoue : verrou déjà pris
+
+    with patch("src.services.weather_service.get_redis", new_callable=AsyncMock, return_value=redis), \
+         patch.object(service, "get_current_weather", new_callable=AsyncMock) as mock_current:
+        result, cache_status = await service.get_cached_weather("Paris")
+
+    assert cache_status == "MISS"
+    assert result.temperature.current == 21.0
+    mock_current.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_stale_entry_served_and_refreshed_in_background(make_weather):
+    import asyncio
+    service = WeatherService()
+    stale = make_weather(15.0)
+    fresh = stale.model_copy(update={"temperature": Temperature(current=17.0, feels_like=16.0)})
+    redis = AsyncMock()
+    redis.get.return_value = _entry(stale, age=700).to_json()
+
+    with patch("src.services.weather_service.get_redis", new_callable=AsyncMock, return_value=redis), \
+         patch.object(service, "get_current_weather", new_callable=AsyncMock, return_value=fresh) as mock_current:
+        result, cache_status = await service.get_cached_weather("Paris")
+        assert cache_status == "STALE"
+        assert result.temperature.current == 15.0
+        await asyncio.gather(*service._background_tasks)
+
+    mock_current.assert_awaited_once_with("Paris")
+    redis.set.assert_awaited_once()
+
+
+def test_early_refresh_probability_grows_near_expiry():
+    now = time.time()
+    entry = CacheEntry(data={}, fetched_at=now - 599.9, soft_ttl=600, hard_ttl=1800, delta=2.0)
+    assert sum(entry.should_refresh_early(now) for _ in range(1000)) > 900
+    entry.fetched_at = now
+    assert not any(entry.should_refresh_early(now) for _ in range(1000))
+
+
+@pytest.mark.asyncio
+async def test_local_cache_hit_skips_redis(make_weather):
+    service = WeatherService()
+    cached = make_weather(21.0)
+    raw = _entry(cached).to_json()
+    redis = AsyncMock()
+    redis.get.return_value = raw
+
+    with patch("src.services.weather_service.get_redis", new_callable=AsyncMock, return_value=redis):
+        await service.get_cached_weather("Paris")
+        result, cache_status = await service.get_cached_weather("Paris")
+
+    assert cache_status == "HIT"
+    assert result.temperature.current == 21.0
+    redis.get.assert_awaited_once_with("weather:paris")
+
+
+@pytest.mark.asyncio
+async def test_local_cache_absorbs_repeats_while_redis_is_down(make_weather):
+    service = WeatherService()
+    fresh = make_weather()
+
+    with patch("src.services.weather_service.get_redis", new_callable=AsyncMock, side_effect=ConnectionError("down")), \
+         patch.object(service, "get_current_weather", new_callable=AsyncMock, return_value=fresh) as mock_current:
+        results = [await service.get_cached_weather("Paris") for _ in range(5)]
+
+    mock_current.assert_awaited_once()
+    assert [cache_status for _, cache_status in results] == ["MISS"] + ["HIT"] * 4
+
+
+@pytest.mark.asyncio
+async def test_batch_resolves_hits_with_one_mget_and_fetches_misses(make_weather):
+    from fastapi import HTTPException
+    service = WeatherService()
+    paris = make_weather(21.0)
+    redis = AsyncMock()
+    redis.mget.side_effect = lambda keys: [
+        _entry(paris).to_json() if key == "weather:paris" else None for key in keys
+    ]
+
+    async def observe(city):
+        if city == "Atlantis":
+            raise HTTPException(status_code=404, detail="Ville inconnue")
+        return [make_weather(city=city, source="open-meteo"), make_weather(22.0, city=city, source="weatherapi")]
+
+    with patch("src.services.weather_service.get_redis", new_callable=AsyncMock, return_value=redis), \
+         patch.object(service, "_observe", new_callable=AsyncMock, side_effect=observe) as mock_observe, \
+         patch("src.services.weather_service.merge_observations", wraps=merge_observations) as mock_merge, \
+         patch.object(service, "_index_sources", new_callable=AsyncMock):
+        results, errors = await service.get_cached_weather_batch(["Paris", "paris", "Tokyo", "Lima", "Atlantis"])
+
+    redis.mget.assert_awaited_once()
+    assert set(redis.mget.await_args.args[0]) == {"weather:paris", "weather:tokyo", "weather:lima", "weather:atlantis"}
+    assert results["Paris"].temperature.current == 21.0
+    assert results["paris"].temperature.current == 21.0
+    assert results["Tokyo"].city == "Tokyo" and results["Lima"].city == "Lima"
+    assert results["Tokyo"].temperature.current == 21.0
+    assert errors["Atlantis"].status_code == 404
+    assert mock_observe.await_count == 3
+    # Une seule fusion vectorisée pour toutes les villes chargées
+    mock_merge.assert_called_once()
+    assert len(mock_merge.call_args.args[0]) == 2
+    assert redis.set.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_openmeteo_micro_batch_uses_one_upstream_call():
+    import asyncio
+    from unittest.mock import MagicMock
+    service = WeatherService()
+    response = MagicMock()
+    response.json.return_value = [
+        {"current": {"temperature_2m": 18.0, "relative_humidity_2m": 60, "weather_code": 3}},
+        {"current": {"temperature_2m": 12.0, "relative_humidity_2m": 80, "weather_code": 61}},
+    ]
+    client = AsyncMock()
+    client.get.return_value = response
+
+    provider = service.registry.get("open-meteo")
+    with patch("src.services.providers.open_meteo.get_http_client", return_value=client):
+        paris, london = await asyncio.gather(
+            provider.fetch("Paris"),
+            provider.fetch("London"),
+        )
+
+    client.get.assert_awaited_once()
+    params = client.get.await_args.kwargs["params"]
+    assert params["latitude"] == "48.8566,51.5074"
+    assert params["longitude"] == "2.3522,-0.1278"
+    assert paris.temperature.current == 18.0
+    assert paris.weather_description == "Couvert"
+    assert london.temperature.current == 12.0
+    assert london.weather_description == "Pluie légère"
+
+
+@pytest.mark.asyncio
+async def test_openmeteo_batch_geocodes_cities_concurrently():
+    import asyncio
+    from unittest.mock import MagicMock
+    from fastapi import HTTPException
+    service = WeatherService()
+    provider = service.registry.get("open-meteo")
+    response = MagicMock()
+    response.json.return_value = [{"current": {"temperature_2m": t}} for t in (18.0, 12.0)]
+    client = AsyncMock()
+    client.get.return_value = response
+    pending = 0
+    peak = 0
+
+    async def get_coordinates(city):
+        nonlocal pending, peak
+        pending += 1
+        peak = max(peak, pending)
+        await asyncio.sleep(0.01)
+        pending -= 1
+        if city == "Atlantis":
+            raise HTTPException(status_code=404, detail="Ville non trouvée")
+        return {"lat": 1.0, "lon": 2.0}
+
+    with patch("src.services.providers.open_meteo.get_coordinates", side_effect=get_coordinates), \
+         patch("src.services.providers.open_meteo.get_http_client", return_value=client):
+        results = await provider.fetch_batch(["Paris", "Atlantis", "London"])
+
+    assert peak == 3
+    assert results["Atlantis"] is None
+    assert results["Paris"].temperature.current == 18.0
+    assert results["London"].temperature.current == 12.0
+    client.get.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_slow_provider_is_dropped_after_latency_budget(make_weather):
+    import asyncio
+    service = WeatherService()
+    service.latency_budget = 0.05
+    fast = make_weather(source="open-meteo")
+
+    async def slow(city):
+        await asyncio.sleep(5)
+
+    with patch.object(service.registry.get("openweathermap"), 'fetch', side_effect=slow), \
+         patch.object(service.registry.get("weatherapi"), 'fetch', new_callable=AsyncMock, return_value=None), \
+         patch.object(service.registry.get("open-meteo"), 'fetch', new_callable=AsyncMock, return_value=fast):
+        result = await asyncio.wait_for(service.get_current_weather("Paris"), timeout=1)
+
+    assert result.temperature.current == 20.0
+    assert service.registry.get("openweathermap").breaker.failures == 1
+    assert service.registry.get("open-meteo").breaker.failures == 0
+
+
+@pytest.mark.asyncio
+async def test_open_breaker_skips_provider(make_weather):
+    service = WeatherService()
+    fast = make_weather(source="open-meteo")
+    breaker = service.registry.get("weatherapi").breaker
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+
+    with patch.object(service.registry.get("openweathermap"), 'fetch', new_callable=AsyncMock, return_value=fast), \
+         patch.object(service.registry.get("weatherapi"), 'fetch', new_callable=AsyncMock) as mock_wa, \
+         patch.object(service.registry.get("open-meteo"), 'fetch', new_callable=AsyncMock, return_value=fast):
+        await service.get_current_weather("Paris")
+
+    mock_wa.assert_not_awaited()
+
+
+
+@pytest.mark.asyncio
+async def test_cheapest_strategy_skips_paid_providers_when_free_one_answers(make_weather):
+    service = WeatherService()
+    fast = make_weather(source="open-meteo")
+
+    with patch.object(service.registry.get("openweathermap"), 'fetch', new_callable=AsyncMock, return_value=fast) as mock_ow, \
+         patch.object(service.registry.get("weatherapi"), 'fetch', new_callable=AsyncMock, return_value=fast) as mock_wa, \
+         patch.object(service.registry.get("open-meteo"), 'fetch', new_callable=AsyncMock, return_value=None) as mock_om:
+        # Open-Meteo (gratuit) échoue : on passe au fournisseur payant suivant uniquement
+        result = await service.get_current_weather("Paris", strategy="cheapest")
+
+    assert result.temperature.current == 20.0
+    mock_om.assert_awaited_once()
+    mock_ow.assert_awaited_once()
+    mock_wa.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_rate_limited_provider_is_skipped_gracefully(make_weather):
+    service = WeatherService()
+    fast = make_weather(source="open-meteo")
+    limited = service.registry.get("openweathermap")
+
+    with patch.object(limited.rate_limiter, 'acquire', new_callable=AsyncMock, return_value=False), \
+         patch.object(limited, 'fetch', new_callable=AsyncMock) as mock_ow, \
+         patch.object(service.registry.get("weatherapi"), 'fetch', new_callable=AsyncMock, return_value=fast), \
+         patch.object(service.registry.get("open-meteo"), 'fetch', new_callable=AsyncMock, return_value=fast):
+        result = await service.get_current_weather("Paris")
+
+    assert result.temperature.current == 20.0
+    mock_ow.assert_not_awaited()
+    assert limited.breaker.failures == 0
+
+
+@pytest.mark.asyncio
+async def test_unknown_city_is_negatively_cached():
+    from fastapi import HTTPException
+    from src.services.geocoding import geocoder
+
+    service = WeatherService()
+    providers = [service.registry.get(name) for name in ("openweathermap", "weatherapi", "open-meteo")]
+
+    async def fetch(city):
+        await geocoder.resolve(city)
+        return None
+
+    try:
+        with patch("src.services.geocoding.get_redis", new_callable=AsyncMock, side_effect=ConnectionError("down")), \
+             patch.object(geocoder, "_geocode_upstream", new_callable=AsyncMock, return_value=None) as upstream, \
+             patch.object(service, "_get_cache", new_callable=AsyncMock, return_value=None), \
+             patch.object(providers[0], 'fetch', side_effect=fetch) as mock_ow, \
+             patch.object(providers[1], 'fetch', new_callable=AsyncMock, return_value=None), \
+             patch.object(providers[2], 'fetch', side_effect=fetch):
+            for _ in range(3):
+                with pytest.raises(HTTPException) as exc_info:
+                    await service.get_cached_weather("Qwertzburg")
+                assert exc_info.value.status_code == 404
+
+        # Un seul passage par les fournisseurs et le géocodage amont
+        assert mock_ow.await_count == 1
+        upstream.assert_awaited_once()
+        # Une ville inconnue n'est pas une panne de fournisseur
+        assert all(provider.breaker.failures == 0 for provider in (providers[0], providers[2]))
+    finally:
+        geocoder._memo.clear()
+
+
+@pytest.mark.asyncio
+async def test_unknown_city_flood_keeps_hot_entries(monkeypatch, make_weather):
+    from fastapi import HTTPException
+    monkeypatch.setenv("WEATHER_NOT_FOUND_TTL", "120")  # au-delà du TTL du L1 (30 s)
+    service = WeatherService()
+    local_cache.set("weather:paris", _entry(make_weather()), ttl=30)
+
+    async def unknown(city):
+        raise HTTPException(status_code=404, detail=f"Ville inconnue: {city}")
+
+    with patch.object(service, "_get_cache", new_callable=AsyncMock, return_value=None), \
+         patch.object(service, "get_current_weather", side_effect=unknown) as mock_current:
+        for i in range(local_cache.max_entries + 100):
+            with pytest.raises(HTTPException):
+                await service.get_cached_weather(f"Bot{i}ville")
+
+        # Les 404 ont leur propre cache borné : l'entrée chaude reste dans le L1
+        assert local_cache.peek("weather:paris") is not None
+        assert len(service._not_found) == service._not_found.max_entries
+
+        now = time.monotonic()
+        calls = mock_current.await_count
+        with patch("src.cache.local_cache.time.monotonic", return_value=now + 90):
+            with pytest.raises(HTTPException):
+                await service.get_cached_weather(f"Bot{local_cache.max_entries + 99}ville")
+        assert mock_current.await_count == calls  # TTL configuré respecté
+        with patch("src.cache.local_cache.time.monotonic", return_value=now + 121):
+            with pytest.raises(HTTPException):
+                await service.get_cached_weather(f"Bot{local_cache.max_entries + 99}ville")
+        assert mock_current.await_count == calls + 1
+
+
+@pytest.mark.asyncio
+async def test_unavailable_provider_is_skipped_until_ttl_expires(monkeypatch, make_weather):
+    monkeypatch.delenv("WEATHERAPI_KEY", raising=False)
+    service = WeatherService()
+    weatherapi = service.registry.get("weatherapi")
+    fast = make_weather(source="open-meteo")
+
+    with patch.object(service.registry.get("openweathermap"), 'fetch', new_callable=AsyncMock, return_value=None), \
+         patch.object(service.registry.get("open-meteo"), 'fetch', new_callable=AsyncMock, return_value=fast), \
+         patch.object(weatherapi, 'fetch', wraps=weatherapi.fetch) as mock_wa:
+        await service.get_current_weather("Paris")
+        assert weatherapi.is_unavailable()
+        assert "WeatherAPI" in weatherapi.unavailable_reason
+        await service.get_current_weather("Paris")
+        assert mock_wa.await_count == 1
+
+        weatherapi._unavailable_until = 0.0
+        await service.get_current_weather("Paris")
+        assert mock_wa.await_count == 2
+
+    assert weatherapi.breaker.failures == 0
+
+
+@pytest.mark.asyncio
+async def test_weatherapi_unknown_city_releases_breaker(monkeypatch):
+    from unittest.mock import MagicMock
+    from fastapi import HTTPException
+    from src.services.geocoding import geocoder
+
+    monkeypatch.setenv("WEATHERAPI_KEY", "test")
+    service = WeatherService()
+    weatherapi = service.registry.get("weatherapi")
+    response = MagicMock(status_code=400)
+    response.json.return_value = {"error": {"code": 1006, "message": "No matching location found."}}
+    client = AsyncMock()
+    client.get.return_value = response
+
+    try:
+        with patch("src.services.providers.weatherapi.get_http_client", return_value=client), \
+             patch("src.services.geocoding.get_redis", new_callable=AsyncMock, side_effect=ConnectionError("down")), \
+             patch.object(service.registry.get("openweathermap"), 'fetch', new_callable=AsyncMock, return_value=None), \
+             patch.object(service.registry.get("open-meteo"), 'fetch', new_callable=AsyncMock, return_value=None):
+            for i in range(weatherapi.breaker.failure_threshold + 1):
+                with pytest.raises(HTTPException) as exc_info:
+                    await service.get_current_weather(f"Bot{i}ville")
+                assert exc_info.value.status_code == 404
+                assert geocoder.known_missing(f"Bot{i}ville")
+
+            # Ville du gazetteer : la réponse de WeatherAPI ne la rend pas introuvable
+            geocoder.gazetteer.load()
+            with pytest.raises(HTTPException) as exc_info:
+                await service.get_current_weather("Paris")
+            assert exc_info.value.status_code == 503
+            assert not geocoder.known_missing("Paris")
+
+        assert weatherapi.breaker.failures == 0
+        assert weatherapi.breaker.state == "closed"
+    finally:
+        geocoder._memo.clear()
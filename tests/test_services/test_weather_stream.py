@@ -0,0 +1,83 @@
+import asyncio
+import json
+import pytest
+from unittest.mock import AsyncMock, patch
+from src.services.weather_service import WeatherService
+from src.services.weather_stream import WeatherStream, format_sse
+
+
+@pytest.mark.asyncio
+async def test_local_stream_pushes_only_changes(make_weather):
+    service = WeatherService()
+    stream = WeatherStream(service)
+    stream.interval = 3600
+    observations = [make_weather(20.0), make_weather(20.0), make_weather(21.0)]
+
+    with patch("src.services.weather_stream.get_redis", new_callable=AsyncMock, side_effect=ConnectionError("down")), \
+         patch.object(service, "get_cached_weather", new_callable=AsyncMock,
+                      side_effect=[(data, "HIT") for data in observations]):
+        queue = await stream.subscribe(["Paris", "paris "])
+        initial = json.loads(await asyncio.wait_for(queue.get(), 1))
+        assert await stream._tick("weather:paris") is False  # même observation (horodatage ignoré)
+        assert await stream._tick("weather:paris") is True
+        update = json.loads(queue.get_nowait())
+        await stream.remove(queue)
+
+    assert initial["city"] == "Paris" and initial["data"]["temperature"]["current"] == 20.0
+    assert update["data"]["temperature"]["current"] == 21.0
+    assert queue.empty()
+    assert stream.stats() == {"cities": 0, "subscribers": 0}
+    await stream.close()
+
+
+@pytest.mark.asyncio
+async def test_redis_stream_publishes_once_per_change(make_weather):
+    service = WeatherService()
+    stream = WeatherStream(service)
+    stream._cities["weather:paris"] = "Paris"
+    stream._reader = asyncio.get_running_loop().create_future()  # relais Redis actif
+    redis = AsyncMock()
+
+    with patch("src.services.weather_stream.get_redis", new_callable=AsyncMock, return_value=redis), \
+         patch.object(service, "get_cached_weather", new_callable=AsyncMock, return_value=(make_weather(20.0), "HIT")):
+        redis.set.side_effect = [True, None]
+        assert await stream._tick("weather:paris") is True
+        fingerprint = redis.set.await_args_list[1].args[1]
+        redis.set.side_effect = [True, fingerprint]
+        assert await stream._tick("weather:paris") is False
+        redis.set.side_effect = [None]  # verrou détenu par un autre worker
+        assert await stream._tick("weather:paris") is False
+
+    redis.publish.assert_awaited_once()
+    channel, message = redis.publish.await_args.args
+    assert channel == "weather-updates:weather:paris"
+    assert json.loads(message)["city"] == "Paris"
+    stream._reader.cancel()
+
+
+@pytest.mark.asyncio
+async def test_new_subscriber_is_not_pushed_the_same_observation_twice(make_weather):
+    service = WeatherService()
+    stream = WeatherStream(service)
+    stream._cities["weather:paris"] = "Paris"
+    stream._reader = asyncio.get_running_loop().create_future()  # relais Redis actif
+    redis = AsyncMock()
+    queue = asyncio.Queue()
+
+    with patch("src.services.weather_stream.get_redis", new_callable=AsyncMock, return_value=redis), \
+         patch.object(service, "get_cached_weather", new_callable=AsyncMock, return_value=(make_weather(20.0), "HIT")):
+        await stream._send_current(queue, "weather:paris")
+        key, fingerprint = redis.set.await_args.args
+        assert key == "stream:last:weather:paris"
+        assert redis.set.await_args.kwargs["nx"] is True
+        # Premier tour : l'empreinte amorcée correspond, rien n'est republié
+        redis.set.side_effect = [True, fingerprint]
+        assert await stream._tick("weather:paris") is False
+
+    assert queue.qsize() == 1
+    redis.publish.assert_not_awaited()
+    stream._reader.cancel()
+
+
+def test_format_sse():
+    assert format_sse(b'{"a":1}') == b'event: weather\ndata: {"a":1}\n\n'